@@ -23,6 +23,8 @@ MONGO_URI = os.environ.get('MONGODB_URL', 'mongodb://165.229.86.157:8080/PortSoo
 DATABASE_NAME = os.environ.get('MONGODB_DB', 'PortSookhee')
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your_jwt_secret_key')
 JWT_EXPIRATION = int(os.environ.get('JWT_EXPIRATION', 86400))  # 24시간 (초)
+SSE_TOKEN_EXPIRATION = int(os.environ.get('SSE_TOKEN_EXPIRATION', 60))  # 스캔 이벤트 스트림 전용 토큰 유효 시간 (초)
+SSE_TOKEN_PURPOSE = 'scan_events'
 
 # 글로벌 변수 - 메모리 기반 임시 데이터 (삭제)
 memory_db = None
@@ -131,6 +133,14 @@ def create_app(config_class=Config):
             # Setup database indexes
             setup_database(mongo.db)
             
+            # 스캔 엔진이 메모리에서 제거한 결과를 MongoDB에 저장/조회하도록 등록
+            from .scan import set_scan_database
+            set_scan_database(mongo.db)
+            
+            # 반복 스캔 예약 실행기 시작 (여러 인스턴스에서 실행해도 예약은 한 번만 실행됨)
+            from .scan_schedules import start_schedule_runner
+            start_schedule_runner(mongo.db)
+            
             # 앱에 MongoDB 설정 추가 (향후 접근용)
             app.config['MONGO'] = mongo
             app.config['MONGO_DB'] = mongo.db
@@ -156,6 +166,14 @@ def create_app(config_class=Config):
     app.register_blueprint(openvpn_bp, url_prefix='/api/openvpn')
     # app.register_blueprint(virtual_fit_bp, url_prefix='/api/virtual-fit')
     
+    # 스캐너 기능(nmap 경로/버전, 권한, NSE) 확인 - 요청마다 확인하지 않도록 시작 시 한 번만 수행
+    from .scan import init_scanner_capabilities
+    init_scanner_capabilities()
+    
+    # 오프라인 취약점 색인 로드 (첫 스캔 결과 파싱 시 지연되지 않도록 미리 로드)
+    from .vuln_db import get_vuln_db
+    get_vuln_db()
+    
     # 모든 응답에 CORS 헤더 추가하는 after_request 핸들러
     @app.after_request
     def add_cors_headers(response):
@@ -173,26 +191,39 @@ def create_app(config_class=Config):
         
         g.mongodb_available = mongodb_available
 
-        # 인증이 필요하지 않은 경로 목록
-        public_paths = [
-            '/api/',
+        # 인증이 필요하지 않은 경로 목록 (정확히 일치하는 경로만 허용.
+        # 접두사로 비교하면 '/api/'가 모든 API 경로와 일치해 인증 검사가 실행되지 않음)
+        public_paths = {
+            '/api',
+            '/api/',  # 서버 상태 확인
             '/api/auth/login',
             '/api/auth/register',
             '/api/auth/anonymous',
             '/api/openvpn/install-guide',
             '/api/scan/test'  # 테스트 스캔은 인증 없이 사용 가능
-        ]
+        }
 
         # OPTIONS 요청은 항상 허용 (CORS preflight)
         if request.method == 'OPTIONS':
             return
 
         # 공개 경로는 인증 검사 패스
-        if any(request.path.startswith(path) for path in public_paths):
+        if request.path in public_paths:
             return
 
         # Authorization 헤더에서 토큰 추출
         auth_header = request.headers.get('Authorization')
+        
+        # EventSource(SSE)는 헤더를 지정할 수 없으므로 쿼리 문자열의 토큰도 허용
+        # 쿼리 문자열은 접근 로그에 남으므로 해당 스캔의 이벤트 스트림 전용 단기 토큰만 받음
+        if not auth_header and request.path.startswith('/api/scan/') and request.path.endswith('/events') \
+                and request.args.get('token'):
+            payload = verify_token(request.args.get('token'))
+            scan_id = request.path.rsplit('/', 2)[-2]
+            if not payload or payload.get('purpose') != SSE_TOKEN_PURPOSE or payload.get('scan_id') != scan_id:
+                return jsonify({'error': 'Unauthorized', 'message': '유효하지 않은 이벤트 스트림 토큰입니다.'}), 403
+            g.user = payload
+            return
         if not auth_header or not auth_header.startswith('Bearer '):
             # 디버깅을 위해 임시로 인증 검증 건너뛰기 (개발 환경에서만)
             if os.environ.get('FLASK_ENV') == 'development':
@@ -204,7 +235,8 @@ def create_app(config_class=Config):
         token = auth_header.split(' ')[1]
         payload = verify_token(token)
         
-        if not payload:
+        # 이벤트 스트림 전용 토큰은 다른 API 인증에 사용할 수 없음
+        if not payload or payload.get('purpose'):
             return jsonify({'error': 'Unauthorized', 'message': '유효하지 않은 토큰입니다.'}), 403
             
         # 인증 정보를 g 객체에 저장
@@ -255,6 +287,58 @@ def setup_database(db):
         if 'anonymous_id_1' not in user_indexes:
             db.users.create_index('anonymous_id', unique=True, partialFilterExpression={'anonymous_id': {'$exists': True}})
             logger.info("Created unique index on users.anonymous_id")
+        
+        # scans 컬렉션 인덱스 (기록 목록의 커서 페이지네이션/필터, 증분 스캔 기준 결과 조회)
+        scan_indexes = db.scans.index_information()
+        for name, keys in [
+            ('created_at_id', [('created_at', -1), ('_id', -1)]),
+            ('target_key_created_at_id', [('target_key', 1), ('created_at', -1), ('_id', -1)]),
+            ('mode_created_at_id', [('mode', 1), ('created_at', -1), ('_id', -1)]),
+            ('status_created_at_id', [('status', 1), ('created_at', -1), ('_id', -1)]),
+            ('owner_created_at_id', [('owner', 1), ('created_at', -1), ('_id', -1)]),
+            ('target_key_status_completed_at', [('target_key', 1), ('status', 1), ('completed_at', -1)]),
+        ]:
+            if name not in scan_indexes:
+                db.scans.create_index(keys, name=name)
+                logger.info(f"Created index {name} on scans")
+        
+        # 큰 스캔 결과 조각 컬렉션 인덱스
+        if 'scan_id_field_n' not in db.scan_result_chunks.index_information():
+            db.scan_result_chunks.create_index([('scan_id', 1), ('field', 1), ('n', 1)], name='scan_id_field_n')
+            logger.info("Created index scan_id_field_n on scan_result_chunks")
+        
+        # host_ports 인벤토리 컬렉션 인덱스 (IP/포트/서비스별 조회, 최신순 정렬)
+        host_port_indexes = db.host_ports.index_information()
+        for name, keys in [
+            ('ip_scanned_at', [('ip', 1), ('scanned_at', -1)]),
+            ('port_protocol_state_scanned_at', [('port', 1), ('protocol', 1), ('state', 1), ('scanned_at', -1)]),
+            ('service_scanned_at', [('service', 1), ('scanned_at', -1)]),
+            ('scan_id', [('scan_id', 1)]),
+        ]:
+            if name not in host_port_indexes:
+                db.host_ports.create_index(keys, name=name)
+                logger.info(f"Created index {name} on host_ports")
+
+        # scan_jobs 공유 대기열 인덱스 (작업 점유, 만료된 점유 회수, 동일 스캔 연결)
+        job_indexes = db.scan_jobs.index_information()
+        for name, keys in [
+            ('status_priority_enqueued_at', [('status', 1), ('priority', 1), ('enqueued_at', 1)]),
+            ('status_lease_expires_at', [('status', 1), ('lease_expires_at', 1)]),
+            ('cache_key_status', [('cache_key', 1), ('status', 1)]),
+        ]:
+            if name not in job_indexes:
+                db.scan_jobs.create_index(keys, name=name)
+                logger.info(f"Created index {name} on scan_jobs")
+        
+        # scan_schedules 인덱스 (실행할 예약 조회, 사용자별 목록)
+        schedule_indexes = db.scan_schedules.index_information()
+        for name, keys in [
+            ('enabled_next_run_at', [('enabled', 1), ('next_run_at', 1)]),
+            ('owner_next_run_at', [('owner', 1), ('next_run_at', 1)]),
+        ]:
+            if name not in schedule_indexes:
+                db.scan_schedules.create_index(keys, name=name)
+                logger.info(f"Created index {name} on scan_schedules")
 
     except Exception as e:
         logger.error(f"Error creating MongoDB indexes: {str(e)}")
@@ -269,6 +353,17 @@ def generate_token(user):
         'exp': datetime.utcnow() + timedelta(seconds=JWT_EXPIRATION)
     }, JWT_SECRET, algorithm='HS256')
 
+def generate_event_token(user, scan_id):
+    """스캔 하나의 이벤트 스트림(SSE) 연결에만 사용할 수 있는 단기 토큰 생성"""
+    return jwt.encode({
+        'id': user.get('id'),
+        'username': user.get('username'),
+        'role': user.get('role', 'user'),
+        'purpose': SSE_TOKEN_PURPOSE,
+        'scan_id': scan_id,
+        'exp': datetime.utcnow() + timedelta(seconds=SSE_TOKEN_EXPIRATION)
+    }, JWT_SECRET, algorithm='HS256')
+
 def verify_token(token):
     """토큰 검증 및 디코딩"""
     try:
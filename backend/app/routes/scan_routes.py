@@ -1,18 +1,42 @@
-from flask import Blueprint, jsonify, request, g, current_app
+from flask import Blueprint, jsonify, request, g, current_app, Response, stream_with_context
+import json
+import base64
 import logging
+import re
+import time
 import uuid
+import threading
 import traceback
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from ..scan import (
-    ScanMode, ScanStatus, is_valid_target,
+    ScanMode, ScanStatus, ScanEngine, SCAN_QUICK_ENGINE, is_valid_target,
     start_scan_task, get_scan_status, check_nmap_installed,
-    NMAP_AVAILABLE, test_scan, generate_test_data
+    NMAP_AVAILABLE, generate_test_data,
+    ScanQueueFullError, get_scan_queue_stats,
+    find_baseline_result, find_stored_baseline, normalize_target, get_scanner_capabilities,
+    get_task_store_stats, read_scan_events, is_scan_finished, cancel_scan,
+    SCAN_STREAM_RESPONSE_MIN_HOSTS, count_status_hosts, to_json_shape, iter_json_chunks,
+    SCAN_QUEUE_BACKEND, enqueue_scan_job, request_scan_job_cancel
 )
+from .. import generate_event_token, SSE_TOKEN_EXPIRATION
+from ..vuln_db import get_vuln_db
+from ..topology import get_scan_topology, parse_topology_layers
+from ..scan_simulator import SCAN_SIMULATION_ENABLED, parse_simulation_options
+from ..scan_schedules import create_schedule, update_schedule, count_active_scheduled_scans, SCAN_SCHEDULE_MAX_CONCURRENT
 from bson.objectid import ObjectId
 from bson.json_util import dumps, loads
 
 scan_bp = Blueprint('scan', __name__)
 logger = logging.getLogger('app.scan')
 
+# 로그에 남기지 않을 요청 헤더 (인증 정보)
+SENSITIVE_HEADERS = ('authorization', 'cookie')
+
+def loggable_headers():
+    """인증 정보를 제외한 요청 헤더를 반환합니다. (요청 로깅용)"""
+    return {key: value for key, value in request.headers.items() if key.lower() not in SENSITIVE_HEADERS}
+
 # 스캔 작업 시작 API
 @scan_bp.route('/', methods=['POST'])
 def start_scan():
@@ -20,7 +44,7 @@ def start_scan():
     try:
         # 요청 로깅
         logger.info(f"스캔 요청 받음: {request.method} {request.path}")
-        logger.info(f"요청 헤더: {dict(request.headers)}")
+        logger.info(f"요청 헤더: {loggable_headers()}")
         
         # JSON 요청 검증
         if not request.is_json:
@@ -51,14 +75,28 @@ def start_scan():
             }), 400
             
         # 스캔 모드 검증
-        if mode not in [ScanMode.QUICK, ScanMode.FULL, ScanMode.CUSTOM, ScanMode.TEST]:
+        if mode not in [ScanMode.QUICK, ScanMode.FULL, ScanMode.CUSTOM, ScanMode.DIFF, ScanMode.TEST, ScanMode.SIMULATED]:
             return jsonify({
                 'error': 'Bad Request',
-                'message': f'지원하지 않는 스캔 모드: {mode}. 지원되는 모드: quick, full, custom, test'
+                'message': f'지원하지 않는 스캔 모드: {mode}. 지원되는 모드: quick, full, custom, diff, test, simulated'
+            }), 400
+        if mode == ScanMode.SIMULATED and not SCAN_SIMULATION_ENABLED:
+            return jsonify({
+                'error': 'Bad Request',
+                'message': '시뮬레이션 스캔이 비활성화되어 있습니다. (SCAN_SIMULATION_ENABLED=true로 활성화)'
             }), 400
             
-        # nmap 설치 확인 (테스트 모드는 제외)
-        if mode != ScanMode.TEST and not check_nmap_installed():
+        # 빠른 스캔 엔진 선택 (nmap 또는 native)
+        engine = data.get('engine')
+        if engine is not None and engine not in [ScanEngine.NMAP, ScanEngine.NATIVE]:
+            return jsonify({
+                'error': 'Bad Request',
+                'message': f'지원하지 않는 스캔 엔진: {engine}. 지원되는 엔진: nmap, native'
+            }), 400
+        uses_native = mode == ScanMode.QUICK and (engine or SCAN_QUICK_ENGINE) == ScanEngine.NATIVE
+            
+        # nmap 설치 확인 (테스트/시뮬레이션 모드와 native 엔진은 제외)
+        if mode not in (ScanMode.TEST, ScanMode.SIMULATED) and not uses_native and not check_nmap_installed():
             logger.warning(f"nmap이 설치되어 있지 않아 테스트 모드로 변경합니다: {target}")
             mode = ScanMode.TEST
             # 경고 메시지는 반환하되 오류는 반환하지 않음
@@ -84,56 +122,105 @@ def start_scan():
             if 'arguments' in data:
                 kwargs['arguments'] = data['arguments']
         
-        # MongoDB에 스캔 기록 저장 (optional)
-        if hasattr(g, 'mongodb_available') and g.mongodb_available:
+        if engine is not None:
+            kwargs['engine'] = engine
+        
+        # 시뮬레이션 스캔의 결과 크기와 지연 시간 프로필
+        if mode == ScanMode.SIMULATED:
             try:
-                db = current_app.extensions['pymongo'].db
-                scan_record = {
-                    '_id': scan_id,
-                    'target': target,
-                    'mode': mode,
-                    'status': ScanStatus.PENDING,
-                    'created_at': ObjectId().generation_time,
-                    'options': kwargs
-                }
-                db.scans.insert_one(scan_record)
-                logger.info(f"MongoDB에 스캔 기록 저장 성공: {scan_id}")
-            except Exception as e:
-                logger.error(f"MongoDB 기록 오류 (무시됨): {str(e)}")
-                # MongoDB 오류는 무시하고 계속 진행
+                kwargs['simulation'] = parse_simulation_options(data.get('simulation'))
+            except ValueError as e:
+                return jsonify({
+                    'error': 'Bad Request',
+                    'message': str(e)
+                }), 400
+        
+        # 호스트 탐색 사전 단계 사용 여부 (CIDR 대상의 quick/full 모드에 적용)
+        if 'discovery' in data:
+            kwargs['discovery'] = bool(data['discovery'])
+        
+        # 증분 스캔은 같은 대상의 가장 최근 완료 결과를 비교 기준으로 사용
+        baseline = None
+        if mode == ScanMode.DIFF:
+            baseline = load_baseline_result(target)
+            logger.info(f"증분 스캔 기준 결과: {baseline.get('scan_id') if baseline else '없음 (전체 스캔 수행)'}")
+        
+        # 결과 캐시 사용 여부 (false면 캐시된 결과를 무시하고 새로 스캔)
+        if 'use_cache' in data:
+            kwargs['use_cache'] = bool(data['use_cache'])
         
         # 스캔 작업 시작
+        # 동일한 스캔의 캐시된 결과가 있거나 이미 실행 중이면 그 결과/작업을 재사용함
+        # 공유 대기열을 사용하면 작업을 scan_jobs에 등록하고 별도 워커 프로세스가 실행함 (테스트 모드 제외)
+        use_job_queue = (SCAN_QUEUE_BACKEND == 'mongo' and mode != ScanMode.TEST
+                         and getattr(g, 'mongodb_available', False))
         try:
-            result = start_scan_task(scan_id, mode, target, **kwargs)
+            if use_job_queue:
+                result = enqueue_scan_job(scan_id, mode, target, kwargs,
+                                          baseline_scan_id=baseline.get('scan_id') if baseline else None)
+            elif baseline:
+                result = start_scan_task(scan_id, mode, target, baseline=baseline, **kwargs)
+            else:
+                result = start_scan_task(scan_id, mode, target, **kwargs)
+        except ScanQueueFullError as e:
+            logger.warning(f"스캔 대기열 초과로 요청 거부: {str(e)}")
+            return jsonify({
+                'error': 'Service Unavailable',
+                'message': str(e)
+            }), 503
+        
+        if result.get('coalesced'):
+            logger.info(f"실행 중인 동일 스캔에 연결: {result['scan_id']}")
+        else:
             logger.info(f"스캔 작업 시작 성공: {scan_id}")
             
-            response_data = {
-                'message': '스캔 작업이 시작되었습니다.',
-                'scan_id': scan_id,
-                'target': target,
-                'mode': mode,
-                'status': ScanStatus.PENDING
-            }
-            
-            # nmap 없이 테스트 모드로 자동 변경된 경우 경고 메시지 추가
-            if mode == ScanMode.TEST and not NMAP_AVAILABLE:
-                response_data['warning'] = 'nmap이 설치되어 있지 않아 테스트 모드로 실행됩니다.'
-            
-            return jsonify(response_data)
-        except Exception as e:
-            logger.error(f"스캔 작업 시작 실패: {str(e)}")
-            # MongoDB에 실패 상태 업데이트
+            # MongoDB에 스캔 기록 저장 (optional)
             if hasattr(g, 'mongodb_available') and g.mongodb_available:
                 try:
                     db = current_app.extensions['pymongo'].db
+                    scan_record = {
+                        '_id': scan_id,
+                        'target': target,
+                        'target_key': normalize_target(target),
+                        'mode': mode,
+                        'status': result['status'],
+                        'created_at': ObjectId().generation_time,
+                        'options': kwargs,
+                        'cached': result.get('cached', False),
+                        'baseline_scan_id': baseline.get('scan_id') if baseline else None
+                    }
+                    # 워커가 완료 기록을 먼저 저장했을 수 있으므로 문서가 없을 때만 생성 (요청자는 항상 기록)
                     db.scans.update_one(
                         {'_id': scan_id},
-                        {'$set': {'status': ScanStatus.FAILED, 'error': str(e)}}
+                        {'$setOnInsert': scan_record, '$set': {'owner': get_request_owner()}},
+                        upsert=True
                     )
-                except Exception:
-                    pass  # MongoDB 업데이트 오류 무시
-                    
-            raise  # 오류 다시 발생시켜 아래 예외 처리로 전달
+                    logger.info(f"MongoDB에 스캔 기록 저장 성공: {scan_id}")
+                except Exception as e:
+                    logger.error(f"MongoDB 기록 오류 (무시됨): {str(e)}")
+                    # MongoDB 오류는 무시하고 계속 진행
+        
+        response_data = {
+            'message': '스캔 작업이 시작되었습니다.',
+            'scan_id': result['scan_id'],
+            'target': target,
+            'mode': mode,
+            'status': result['status'],
+            'queue_position': result.get('queue_position'),
+            'cached': result.get('cached', False),
+            'cache_age': result.get('cache_age'),
+            'coalesced': result.get('coalesced', False)
+        }
+        if result.get('cached'):
+            response_data['message'] = '캐시된 스캔 결과를 반환합니다.'
+        elif result.get('coalesced'):
+            response_data['message'] = '이미 실행 중인 동일한 스캔 작업에 연결되었습니다.'
+        
+        # nmap 없이 테스트 모드로 자동 변경된 경우 경고 메시지 추가
+        if mode == ScanMode.TEST and not NMAP_AVAILABLE:
+            response_data['warning'] = 'nmap이 설치되어 있지 않아 테스트 모드로 실행됩니다.'
+        
+        return jsonify(response_data)
         
     except Exception as e:
         tb_str = traceback.format_exc()
@@ -144,16 +231,79 @@ def start_scan():
             'details': tb_str if current_app.config.get('DEBUG', False) else None
         }), 500
 
+def get_request_owner():
+    """인증된 요청자의 사용자 ID를 반환합니다. (인증 없는 개발 환경 요청은 None)"""
+    user = getattr(g, 'user', None)
+    return user.get('id') if user else None
+
+def is_admin_request():
+    """인증된 요청자가 관리자 역할인지 확인합니다."""
+    user = getattr(g, 'user', None)
+    return bool(user) and user.get('role') == 'admin'
+
+def load_baseline_result(target):
+    """증분 스캔의 비교 기준이 될 가장 최근 완료 결과를 MongoDB 또는 메모리에서 찾습니다."""
+    if hasattr(g, 'mongodb_available') and g.mongodb_available:
+        return find_stored_baseline(target)
+    return find_baseline_result(target)
+
+# 스캐너 기능 조회 API
+@scan_bp.route('/capabilities', methods=['GET'])
+def scanner_capabilities():
+    """nmap 경로/버전, raw 소켓 권한, NSE 지원 여부, 취약점 색인 상태 등 스캐너 기능을 조회하는 API"""
+    try:
+        return jsonify(dict(get_scanner_capabilities(), vuln_db=get_vuln_db().stats()))
+    except Exception as e:
+        logger.error(f"스캐너 기능 조회 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'스캐너 기능 조회에 실패했습니다: {str(e)}'
+        }), 500
+
+# 스캔 대기열 상태 조회 API
+@scan_bp.route('/queue', methods=['GET'])
+def scan_queue_status():
+    """스캔 워커 풀과 대기열 상태를 조회하는 API"""
+    try:
+        return jsonify(get_scan_queue_stats())
+    except Exception as e:
+        logger.error(f"스캔 대기열 조회 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'스캔 대기열 조회에 실패했습니다: {str(e)}'
+        }), 500
+
+# 스캔 작업 저장소 상태 조회 API
+@scan_bp.route('/stats', methods=['GET'])
+def scan_task_stats():
+    """메모리에 보관 중인 스캔 작업 수와 대략적인 메모리 사용량을 조회하는 API"""
+    try:
+        return jsonify(get_task_store_stats())
+    except Exception as e:
+        logger.error(f"스캔 작업 저장소 조회 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'스캔 작업 저장소 조회에 실패했습니다: {str(e)}'
+        }), 500
+
 # 스캔 상태 조회 API
 @scan_bp.route('/<scan_id>', methods=['GET'])
 def check_scan_status(scan_id):
-    """스캔 작업의 상태를 조회하는 API"""
+    """
+    스캔 작업의 상태를 조회하는 API
+    
+    fields 파라미터로 필요한 결과 필드만 요청할 수 있습니다. (예: ?fields=hosts, ?fields= 이면 요약만)
+    """
     try:
         # 요청 로깅
         logger.info(f"스캔 상태 조회: {scan_id}")
         
+        fields = request.args.get('fields')
+        if fields is not None:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        
         try:
-            scan_status = get_scan_status(scan_id)
+            scan_status = get_scan_status(scan_id, fields, raw=True)
         except ValueError as e:
             logger.error(f"스캔 상태 조회 오류: {str(e)}")
             return jsonify({
@@ -178,25 +328,11 @@ def check_scan_status(scan_id):
                 'message': '오류가 발생하여 테스트 데이터를 반환합니다.'
             })
         
-        # 완료된 스캔의 경우 MongoDB에 결과 저장 (optional)
-        if scan_status['status'] == ScanStatus.COMPLETED and \
-           hasattr(g, 'mongodb_available') and g.mongodb_available:
-            try:
-                db = current_app.extensions['pymongo'].db
-                db.scans.update_one(
-                    {'_id': scan_id},
-                    {'$set': {
-                        'status': ScanStatus.COMPLETED,
-                        'completed_at': ObjectId().generation_time,
-                        'duration': scan_status.get('duration', 0),
-                        'result': loads(dumps(scan_status.get('result', {})))
-                    }}
-                )
-            except Exception as e:
-                logger.error(f"MongoDB 업데이트 오류 (무시됨): {str(e)}")
-                # MongoDB 오류는 무시하고 계속 진행
-        
-        return jsonify(scan_status)
+        # 완료된 결과는 스캔 워커가 한 번만 MongoDB에 저장하므로 여기서는 읽기만 함
+        # 호스트가 많은 결과는 전체 JSON을 메모리에 만들지 않고 호스트 단위로 나누어 전송
+        if count_status_hosts(scan_status) >= SCAN_STREAM_RESPONSE_MIN_HOSTS:
+            return Response(stream_with_context(iter_json_chunks(scan_status)), mimetype='application/json')
+        return jsonify(to_json_shape(scan_status))
         
     except Exception as e:
         tb_str = traceback.format_exc()
@@ -217,6 +353,210 @@ def check_scan_status(scan_id):
             'recovery': True
         })
 
+# 스캔 취소 API
+@scan_bp.route('/<scan_id>', methods=['DELETE'])
+def cancel_scan_api(scan_id):
+    """대기/실행 중인 스캔을 취소하는 API (nmap 프로세스를 종료하고 부분 결과는 유지)"""
+    try:
+        logger.info(f"스캔 취소 요청: {scan_id}")
+        try:
+            scan_status = cancel_scan(scan_id)
+        except ValueError as e:
+            # 이 프로세스에 없는 작업은 공유 대기열에서 취소 요청
+            outcome = request_scan_job_cancel(scan_id) if SCAN_QUEUE_BACKEND == 'mongo' else None
+            if outcome is None:
+                return jsonify({
+                    'error': 'Not Found',
+                    'message': str(e)
+                }), 404
+            scan_status = dict(get_scan_status(scan_id), cancelled=outcome != 'finished')
+            if outcome == 'requested':
+                # 실행 중인 워커가 다음 하트비트에서 nmap을 종료하고 부분 결과를 저장함
+                scan_status['cancel_requested'] = True
+            
+        if not scan_status.get('cancelled'):
+            return jsonify(dict(scan_status, **{
+                'error': 'Conflict',
+                'message': f"이미 종료된 스캔은 취소할 수 없습니다 (상태: {scan_status['status']})"
+            })), 409
+            
+        # 취소 상태와 부분 결과는 스캔 워커가 MongoDB에 저장함
+        scan_status['message'] = '스캔이 취소되었습니다.'
+        return jsonify(scan_status)
+        
+    except Exception as e:
+        logger.error(f"스캔 취소 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'스캔 취소에 실패했습니다: {str(e)}'
+        }), 500
+
+def format_sse(event, data, event_id=None):
+    """Server-Sent Events 형식의 메시지를 만듭니다."""
+    message = ''
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    message += f'event: {event}\n'
+    message += f'data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n'
+    return message
+
+def poll_stored_events(scan_id, scan_status, interval=2.0, keepalive=15.0):
+    """MongoDB에 기록된 스캔 상태를 주기적으로 읽어 바뀐 상태/진행률을 SSE 메시지로 만듭니다."""
+    last_status = None
+    last_progress = None
+    last_sent = time.time()
+    while True:
+        if scan_status['status'] != last_status:
+            last_status = scan_status['status']
+            yield format_sse('status', {'scan_id': scan_id, 'status': last_status, 'stored': True,
+                                        'worker': scan_status.get('worker')})
+            last_sent = time.time()
+        progress = scan_status.get('progress')
+        if progress and progress != last_progress:
+            last_progress = progress
+            yield format_sse('progress', progress)
+            last_sent = time.time()
+        if is_scan_finished(last_status):
+            yield format_sse('end', {'scan_id': scan_id, 'status': last_status})
+            return
+        if time.time() - last_sent >= keepalive:
+            yield ': keepalive\n\n'
+            last_sent = time.time()
+        time.sleep(interval)
+        try:
+            scan_status = get_scan_status(scan_id, fields=[])
+        except ValueError:
+            yield format_sse('end', {'scan_id': scan_id})
+            return
+
+# 스캔 진행 이벤트 스트림 API (SSE)
+@scan_bp.route('/<scan_id>/events/token', methods=['POST'])
+def scan_event_token(scan_id):
+    """
+    스캔 이벤트 스트림 전용 단기 토큰을 발급하는 API
+    EventSource는 헤더를 보낼 수 없어 토큰을 쿼리 문자열로 넘기므로, 로그인 토큰 대신 이 토큰을 사용합니다.
+    """
+    try:
+        get_scan_status(scan_id, fields=[])
+    except ValueError as e:
+        return jsonify({
+            'error': 'Not Found',
+            'message': str(e)
+        }), 404
+    return jsonify({
+        'token': generate_event_token(getattr(g, 'user', None) or {}, scan_id),
+        'expires_in': SSE_TOKEN_EXPIRATION
+    })
+
+@scan_bp.route('/<scan_id>/events', methods=['GET'])
+def scan_event_stream(scan_id):
+    """스캔 상태 변경, 진행률, 발견된 호스트를 Server-Sent Events로 전달하는 API"""
+    try:
+        scan_status = get_scan_status(scan_id)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Not Found',
+            'message': str(e)
+        }), 404
+        
+    # 재연결 시 마지막으로 받은 이벤트 다음부터 전송
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        cursor = int(last_event_id) + 1 if last_event_id is not None else 0
+    except ValueError:
+        cursor = 0
+        
+    def generate():
+        yield 'retry: 3000\n\n'
+        
+        # 다른 프로세스(공유 대기열 워커)가 실행 중인 작업은 저장된 상태를 주기적으로 확인해 전달
+        if scan_status.get('stored') and not is_scan_finished(scan_status['status']):
+            yield from poll_stored_events(scan_id, scan_status)
+            return
+            
+        # 메모리에서 이미 제거된(저장소에서 조회된) 작업은 최종 상태만 보내고 종료
+        if scan_status.get('stored'):
+            yield format_sse('status', {
+                'scan_id': scan_id,
+                'status': scan_status['status'],
+                'stored': True
+            })
+            yield format_sse('end', {'scan_id': scan_id, 'status': scan_status['status']})
+            return
+            
+        next_cursor = cursor
+        while True:
+            events, next_cursor = read_scan_events(scan_id, next_cursor, timeout=15)
+            if not events:
+                # 연결 유지용 주석 메시지 (프록시 타임아웃 방지)
+                yield ': keepalive\n\n'
+                try:
+                    finished = is_scan_finished(get_scan_status(scan_id)['status'])
+                except ValueError:
+                    finished = True
+                if finished:
+                    yield format_sse('end', {'scan_id': scan_id})
+                    return
+                continue
+                
+            for event_id, event, data in events:
+                yield format_sse(event, data, event_id)
+                if event == 'status' and is_scan_finished(data.get('status')):
+                    yield format_sse('end', {'scan_id': scan_id, 'status': data['status']})
+                    return
+                    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx 등 프록시 버퍼링 방지
+    return response
+
+# 스캔 토폴로지 그래프 조회 API
+@scan_bp.route('/<scan_id>/topology', methods=['GET'])
+def scan_topology(scan_id):
+    """
+    스캔 결과로 만든 네트워크 토폴로지 그래프(Cytoscape elements 형식)를 조회하는 API
+
+    include 파라미터로 호스트 외에 포함할 계층을 고를 수 있습니다. (예: ?include=subnets,services,routes)
+    그래프가 바뀌지 않았으면 ETag로 304를 응답합니다.
+    """
+    try:
+        layers = parse_topology_layers(request.args.get('include'))
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': str(e)
+        }), 400
+
+    try:
+        graph, version, scan_status = get_scan_topology(scan_id, layers)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Not Found',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"토폴로지 조회 오류 [ID: {scan_id}]: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'토폴로지 생성에 실패했습니다: {str(e)}'
+        }), 500
+
+    etag = f"{version}-{'.'.join(sorted(layers))}"
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    response = jsonify({
+        'scan_id': scan_id,
+        'status': scan_status['status'],
+        'layers': sorted(layers),
+        'elements': {'nodes': graph['nodes'], 'edges': graph['edges']},
+        'stats': graph['stats'],
+    })
+    response.set_etag(etag)
+    # 실행 중인 스캔의 그래프는 호스트가 발견될 때마다 바뀌므로 매번 재검증
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # 빠른 스캔 API 단축 경로
 @scan_bp.route('/quick', methods=['POST'])
 def quick_scan_api():
@@ -272,10 +612,231 @@ def custom_scan_api():
     request.data = dumps(data).encode('utf-8')  # 요청 데이터 재설정
     return start_scan()
 
+# 증분 스캔 API 단축 경로
+@scan_bp.route('/diff', methods=['POST'])
+def diff_scan_api():
+    """증분 스캔 API"""
+    data = request.get_json() or {}
+    if 'target' not in data:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': '대상(target)은 필수 항목입니다.'
+        }), 400
+        
+    # 모드를 diff로 설정하여 요청 변환
+    data['mode'] = ScanMode.DIFF
+    request.data = dumps(data).encode('utf-8')  # 요청 데이터 재설정
+    return start_scan()
+
+# 인벤토리 조회 결과 최대 개수
+INVENTORY_MAX_LIMIT = 1000
+RELATIVE_TIME_REGEX = re.compile(r'^(\d+)([smhd])$')
+
+def parse_time_param(value):
+    """
+    기간 파라미터를 datetime으로 변환합니다.
+    '7d', '12h' 같은 상대 시간, 유닉스 타임스탬프, ISO 8601 문자열을 지원합니다.
+    """
+    if not value:
+        return None
+    match = RELATIVE_TIME_REGEX.match(value)
+    if match:
+        unit = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}[match.group(2)]
+        return datetime.now(timezone.utc) - timedelta(**{unit: int(match.group(1))})
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def build_inventory_query(**filters):
+    """
+    요청 파라미터(since/until/state)와 추가 조건으로 host_ports 조회 조건을 만듭니다.
+    """
+    query = {key: value for key, value in filters.items() if value is not None}
+    since = parse_time_param(request.args.get('since'))
+    until = parse_time_param(request.args.get('until'))
+    if since or until:
+        query['scanned_at'] = {}
+        if since:
+            query['scanned_at']['$gte'] = since
+        if until:
+            query['scanned_at']['$lte'] = until
+    state = request.args.get('state', 'open')
+    if state != 'any':
+        query['state'] = state
+    return query
+
+def query_inventory(query, group_by):
+    """
+    host_ports 컬렉션을 조회합니다.
+    latest=true(기본값)이면 group_by 기준으로 가장 최근 스캔 결과 하나만 남깁니다.
+    """
+    db = current_app.extensions['pymongo'].db
+    limit = min(int(request.args.get('limit', 100)), INVENTORY_MAX_LIMIT)
+    projection = {'_id': 0}
+    
+    if request.args.get('latest', 'true').lower() == 'false':
+        cursor = db.host_ports.find(query, projection).sort('scanned_at', -1).limit(limit)
+        return list(cursor)
+    
+    pipeline = [
+        {'$match': query},
+        {'$sort': {'scanned_at': -1}},
+        {'$group': {'_id': {key: f'${key}' for key in group_by}, 'doc': {'$first': '$$ROOT'}}},
+        {'$replaceRoot': {'newRoot': '$doc'}},
+        {'$sort': {'scanned_at': -1}},
+        {'$limit': limit},
+        {'$project': projection},
+    ]
+    return list(db.host_ports.aggregate(pipeline))
+
+def inventory_response(items, **extra):
+    """인벤토리 조회 결과를 JSON 응답으로 만듭니다."""
+    return jsonify({'items': loads(dumps(items)), 'count': len(items), **extra})
+
+def inventory_unavailable():
+    return jsonify({
+        'error': 'Service Unavailable',
+        'message': 'MongoDB를 사용할 수 없어 인벤토리를 조회할 수 없습니다.'
+    }), 503
+
+# 특정 포트가 열린 호스트 조회 API
+@scan_bp.route('/inventory/ports/<int:port>', methods=['GET'])
+def inventory_by_port(port):
+    """지정한 포트가 열려 있던 호스트 목록을 조회하는 API (예: /inventory/ports/445?since=7d)"""
+    try:
+        if not getattr(g, 'mongodb_available', False):
+            return inventory_unavailable()
+        protocol = request.args.get('protocol', 'tcp')
+        query = build_inventory_query(port=port, protocol=protocol)
+        items = query_inventory(query, ['ip'])
+        return inventory_response(items, port=port, protocol=protocol)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': f'잘못된 조회 조건입니다: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"포트 인벤토리 조회 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'포트 인벤토리 조회에 실패했습니다: {str(e)}'
+        }), 500
+
+# 특정 서비스를 실행 중인 호스트 조회 API
+@scan_bp.route('/inventory/services/<service>', methods=['GET'])
+def inventory_by_service(service):
+    """지정한 서비스가 실행 중이던 호스트/포트 목록을 조회하는 API (예: /inventory/services/http)"""
+    try:
+        if not getattr(g, 'mongodb_available', False):
+            return inventory_unavailable()
+        query = build_inventory_query(service=service)
+        items = query_inventory(query, ['ip', 'port', 'protocol'])
+        return inventory_response(items, service=service)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': f'잘못된 조회 조건입니다: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"서비스 인벤토리 조회 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'서비스 인벤토리 조회에 실패했습니다: {str(e)}'
+        }), 500
+
+# 특정 호스트의 포트 이력 조회 API
+@scan_bp.route('/inventory/hosts/<ip>', methods=['GET'])
+def inventory_by_host(ip):
+    """지정한 호스트에서 발견된 포트 목록을 조회하는 API (latest=false이면 전체 이력)"""
+    try:
+        if not getattr(g, 'mongodb_available', False):
+            return inventory_unavailable()
+        query = build_inventory_query(ip=ip)
+        items = query_inventory(query, ['port', 'protocol'])
+        return inventory_response(items, ip=ip)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': f'잘못된 조회 조건입니다: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"호스트 인벤토리 조회 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'호스트 인벤토리 조회에 실패했습니다: {str(e)}'
+        }), 500
+
+# 스캔 기록 총 개수 캐시 유지 시간(초) 및 최대 항목 수
+HISTORY_COUNT_TTL = 30
+HISTORY_COUNT_CACHE_MAX = 256
+HISTORY_MAX_LIMIT = 100
+_history_count_cache = OrderedDict()  # 조회 조건 -> (개수, 계산 시각), 오래 사용하지 않은 순서로 제거
+_history_count_lock = threading.Lock()
+
+def encode_history_cursor(doc):
+    """마지막 문서의 (created_at, _id)로 다음 페이지 커서를 만듭니다."""
+    created_at = doc.get('created_at')
+    if isinstance(created_at, datetime):
+        # pymongo는 기본적으로 UTC 기준 naive datetime을 반환함 (MongoDB 날짜는 밀리초 정밀도)
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        created_at = int(round(created_at.timestamp() * 1000))
+    else:
+        created_at = None
+    payload = {'created_at': created_at, 'id': str(doc['_id'])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    """커서를 (created_at, _id) 조회 조건으로 변환합니다."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        last_id = payload['id']
+        created_at = payload.get('created_at')
+    except Exception:
+        raise ValueError('잘못된 커서입니다.')
+    if created_at is None:
+        return {'created_at': None, '_id': {'$lt': last_id}}
+    created_at = datetime.fromtimestamp(created_at / 1000, timezone.utc)
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': last_id}}
+    ]}
+
+def count_scan_history(db, query):
+    """
+    스캔 기록 개수를 반환합니다.
+    조건이 없으면 컬렉션 메타데이터로 추정하고, 조건이 있으면 잠시 캐시해 매 요청마다 세지 않습니다.
+    """
+    if not query:
+        return db.scans.estimated_document_count(), True
+    key = json.dumps(query, sort_keys=True, default=str)
+    now = time.time()
+    with _history_count_lock:
+        cached = _history_count_cache.get(key)
+        if cached and now - cached[1] < HISTORY_COUNT_TTL:
+            _history_count_cache.move_to_end(key)
+            return cached[0], True
+    # 개수 계산은 잠금 밖에서 수행
+    count = db.scans.count_documents(query)
+    with _history_count_lock:
+        _history_count_cache[key] = (count, now)
+        _history_count_cache.move_to_end(key)
+        while len(_history_count_cache) > HISTORY_COUNT_CACHE_MAX:
+            _history_count_cache.popitem(last=False)
+    return count, False
+
 # 최근 스캔 결과 목록 조회 API
 @scan_bp.route('/history', methods=['GET'])
 def scan_history():
-    """최근 스캔 결과 목록을 조회하는 API"""
+    """
+    최근 스캔 결과 목록을 조회하는 API
+    
+    created_at/_id 기준 커서 페이지네이션을 사용하며, 응답의 next_cursor를 cursor 파라미터로 넘기면 다음 페이지를 조회합니다.
+    target, mode, status, owner(mine이면 요청자 본인, 다른 사용자 ID는 관리자만)로 필터링할 수 있습니다.
+    """
     try:
         if not hasattr(g, 'mongodb_available') or not g.mongodb_available:
             return jsonify({
@@ -284,19 +845,59 @@ def scan_history():
             }), 503
             
         db = current_app.extensions['pymongo'].db
-        limit = int(request.args.get('limit', 10))
-        skip = int(request.args.get('skip', 0))
+        limit = min(int(request.args.get('limit', 10)), HISTORY_MAX_LIMIT)
+        
+        # 필터 조건 (모두 인덱스로 처리됨)
+        query = {}
+        if request.args.get('target'):
+            query['target_key'] = normalize_target(request.args['target'])
+        if request.args.get('mode'):
+            query['mode'] = request.args['mode']
+        if request.args.get('status'):
+            query['status'] = request.args['status']
+        owner = request.args.get('owner')
+        if owner == 'mine':
+            # 인증되지 않은 요청(개발 환경)에서 owner가 None인 기록을 조회하지 않도록 거부
+            if not get_request_owner():
+                return jsonify({
+                    'error': 'Unauthorized',
+                    'message': 'owner=mine은 로그인한 사용자만 사용할 수 있습니다.'
+                }), 401
+            query['owner'] = get_request_owner()
+        elif owner:
+            # 다른 사용자의 기록은 관리자만 조회 가능
+            if not is_admin_request():
+                return jsonify({
+                    'error': 'Forbidden',
+                    'message': '다른 사용자의 스캔 기록은 관리자만 조회할 수 있습니다.'
+                }), 403
+            query['owner'] = owner
+        
+        page_query = dict(query)
+        cursor = request.args.get('cursor')
+        if cursor:
+            page_query.update(decode_history_cursor(cursor))
         
-        # 스캔 기록 조회
-        scans = db.scans.find({}, {
-            'result': 0  # 결과는 크기가 클 수 있으므로 제외
-        }).sort('_id', -1).skip(skip).limit(limit)
+        # 스캔 기록 조회 (결과는 크기가 클 수 있으므로 제외하고 result_summary만 포함)
+        scans = list(db.scans.find(page_query, {'result': 0, 'result_blobs': 0})
+                     .sort([('created_at', -1), ('_id', -1)])
+                     .limit(limit + 1))
+        has_more = len(scans) > limit
+        scans = scans[:limit]
+        count, estimated = count_scan_history(db, query)
         
         return jsonify({
-            'scans': loads(dumps(list(scans))),
-            'count': db.scans.count_documents({})
+            'scans': loads(dumps(scans)),
+            'count': count,
+            'count_estimated': estimated,
+            'next_cursor': encode_history_cursor(scans[-1]) if has_more else None
         })
         
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': f'잘못된 조회 조건입니다: {str(e)}'
+        }), 400
     except Exception as e:
         logger.error(f"스캔 기록 조회 오류: {str(e)}", exc_info=True)
         return jsonify({
@@ -304,6 +905,120 @@ def scan_history():
             'message': f'스캔 기록 조회에 실패했습니다: {str(e)}'
         }), 500
 
+def schedules_unavailable():
+    return jsonify({
+        'error': 'Service Unavailable',
+        'message': 'MongoDB를 사용할 수 없어 스캔 예약을 사용할 수 없습니다.'
+    }), 503
+
+def schedule_not_found(schedule_id):
+    return jsonify({
+        'error': 'Not Found',
+        'message': f'존재하지 않는 스캔 예약: {schedule_id}'
+    }), 404
+
+def schedule_owner_query():
+    """요청자가 접근할 수 있는 예약 조건 (인증 없는 개발 환경 요청은 전체)"""
+    owner = get_request_owner()
+    return {'owner': owner} if owner else {}
+
+def schedule_response(schedule):
+    """예약 문서의 날짜를 ISO 8601(UTC) 문자열로 변환합니다."""
+    result = {}
+    for key, value in schedule.items():
+        if isinstance(value, datetime):
+            value = (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+        result[key] = value
+    result['id'] = result.pop('_id')
+    return result
+
+# 스캔 예약 목록 조회/생성 API
+@scan_bp.route('/schedules', methods=['GET', 'POST'])
+def scan_schedules():
+    """
+    반복 스캔 예약 목록을 조회(GET)하거나 새 예약을 만드는(POST) API
+    
+    예약은 target, mode, options와 interval(초) 또는 cron('분 시 일 월 요일', UTC) 중 하나, 
+    jitter(실행 시각에 더할 최대 지연, 초), enabled, name으로 구성됩니다.
+    """
+    try:
+        if not hasattr(g, 'mongodb_available') or not g.mongodb_available:
+            return schedules_unavailable()
+        db = current_app.extensions['pymongo'].db
+        
+        if request.method == 'POST':
+            data = request.get_json(silent=True)
+            if not data:
+                return jsonify({
+                    'error': 'Bad Request',
+                    'message': 'JSON 형식의 요청이 필요합니다.'
+                }), 400
+            schedule = create_schedule(db, data, owner=get_request_owner())
+            logger.info(f"스캔 예약 생성: {schedule['_id']} ({schedule['mode']} {schedule['target']})")
+            return jsonify(schedule_response(schedule)), 201
+        
+        schedules = list(db.scan_schedules.find(schedule_owner_query()).sort([('next_run_at', 1)]))
+        return jsonify({
+            'schedules': [schedule_response(schedule) for schedule in schedules],
+            'count': len(schedules),
+            'active_scans': count_active_scheduled_scans(db),
+            'max_concurrent': SCAN_SCHEDULE_MAX_CONCURRENT
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"스캔 예약 처리 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'스캔 예약 처리에 실패했습니다: {str(e)}'
+        }), 500
+
+# 스캔 예약 조회/수정/삭제 API
+@scan_bp.route('/schedules/<schedule_id>', methods=['GET', 'PUT', 'PATCH', 'DELETE'])
+def scan_schedule(schedule_id):
+    """예약 하나를 조회(GET), 수정(PUT/PATCH, 보낸 필드만 변경), 삭제(DELETE)하는 API"""
+    try:
+        if not hasattr(g, 'mongodb_available') or not g.mongodb_available:
+            return schedules_unavailable()
+        db = current_app.extensions['pymongo'].db
+        query = dict(schedule_owner_query(), _id=schedule_id)
+        
+        if request.method == 'DELETE':
+            if not db.scan_schedules.delete_one(query).deleted_count:
+                return schedule_not_found(schedule_id)
+            logger.info(f"스캔 예약 삭제: {schedule_id}")
+            return jsonify({'message': '스캔 예약이 삭제되었습니다.', 'id': schedule_id})
+            
+        if request.method in ('PUT', 'PATCH'):
+            data = request.get_json(silent=True)
+            if not data:
+                return jsonify({
+                    'error': 'Bad Request',
+                    'message': 'JSON 형식의 요청이 필요합니다.'
+                }), 400
+            schedule = update_schedule(db, schedule_id, data, query=schedule_owner_query())
+        else:
+            schedule = db.scan_schedules.find_one(query)
+        if schedule is None:
+            return schedule_not_found(schedule_id)
+        return jsonify(schedule_response(schedule))
+        
+    except ValueError as e:
+        return jsonify({
+            'error': 'Bad Request',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"스캔 예약 처리 오류: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': f'스캔 예약 처리에 실패했습니다: {str(e)}'
+        }), 500
+
 # 테스트 스캔 API - nmap 없이도 테스트 가능한 API
 @scan_bp.route('/test', methods=['POST', 'OPTIONS'])
 def test_scan_api():
@@ -320,7 +1035,7 @@ def test_scan_api():
     try:
         # 요청 로깅
         logger.info("테스트 스캔 요청 받음")
-        logger.info(f"헤더: {dict(request.headers)}")
+        logger.info(f"헤더: {loggable_headers()}")
         
         # 요청 검증
         if not request.is_json:
@@ -346,12 +1061,13 @@ def test_scan_api():
         scan_id = f"test-{uuid.uuid4()}"
         
         # 테스트 스캔 결과 직접 반환 (즉시 완료)
+        # 인증 없이 호출할 수 있으므로 워커 풀/대기열을 사용하지 않고, 요청 스레드에서 대기하지도 않음
         try:
             target = data['target']
             logger.info(f"테스트 스캔 타겟: {target}")
             
             # 테스트 데이터 생성
-            test_result = test_scan(target)
+            test_result = generate_test_data(target)
             
             # 응답 준비
             response_data = {
@@ -3,12 +3,29 @@ import re
 import json
 import time
 import os
+import sys
 import subprocess
 import logging
+import shlex
+import shutil
+import xml.etree.ElementTree as ET
 from typing import Dict, List, Any, Optional, Union, Tuple
+from datetime import datetime, timezone
 import ipaddress
 import socket
+import asyncio
 import threading
+import queue
+import atexit
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+from collections import deque, OrderedDict
+
+from .vuln_db import match_service_vulns
+from .scan_simulator import plan_simulated_scan, SimulatedScanError
+from .scan_records import HostRecord, PortRecord, to_json_shape, record_json_default, iter_json_chunks
 
 # nmap 라이브러리 임포트 예외 처리
 try:
@@ -33,41 +50,956 @@ class ScanMode:
     FULL = "full"         # 모든 포트와 OS 감지 (시간 소요)
     CUSTOM = "custom"     # 사용자 정의 옵션
     TEST = "test"         # 테스트 모드 (실제 스캔 없이 테스트용 결과 반환)
+    DIFF = "diff"         # 증분 스캔 (이전 결과와 비교해 변경된 호스트/포트만 정밀 스캔)
+    SIMULATED = "simulated"  # 부하 테스트용 시뮬레이션 (크기/지연/실패율을 지정한 가상 결과)
 
 class ScanStatus:
     PENDING = "pending"
+    QUEUED = "queued"     # 워커 풀의 빈 슬롯을 기다리는 중
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"  # 사용자가 취소함 (부분 결과는 유지)
+
+# 빠른 스캔 대상 포트
+COMMON_PORTS = "21,22,23,25,53,80,110,139,443,445,3306,3389,8080"
+
+# 스캔 엔진 정의
+class ScanEngine:
+    NMAP = "nmap"         # nmap 프로세스로 스캔
+    NATIVE = "native"     # 프로세스 내 asyncio TCP 연결 스캔 (빠른 스캔 전용)
+
+# 스캔 작업 저장소 설정
+SCAN_TASK_TTL = int(os.environ.get('SCAN_TASK_TTL', 3600))                  # 완료된 작업을 메모리에 유지할 시간 (초)
+SCAN_TASK_MAX_ENTRIES = int(os.environ.get('SCAN_TASK_MAX_ENTRIES', 500))   # 메모리에 유지할 최대 작업 수
+SCAN_TASK_MAX_BYTES = int(os.environ.get('SCAN_TASK_MAX_BYTES', 0))         # 완료된 작업이 차지할 최대 메모리 (0이면 제한 없음)
+
+# 스캔 결과를 저장할 MongoDB 데이터베이스 (앱 시작 시 set_scan_database로 등록)
+_scan_db = None
+
+def set_scan_database(db):
+    """
+    스캔 엔진이 결과를 저장하고 조회할 MongoDB 데이터베이스를 등록합니다.
+    """
+    global _scan_db
+    _scan_db = db
+
+def get_scan_database():
+    """
+    set_scan_database()로 등록된 MongoDB 데이터베이스를 반환합니다. (등록되지 않았으면 None)
+    """
+    return _scan_db
+
+def approx_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    dict/list/문자열/결과 레코드로 이루어진 객체가 차지하는 메모리를 대략적으로 계산합니다. (바이트)
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(approx_size(item, _seen) for item in obj)
+    elif isinstance(obj, (HostRecord, PortRecord)):
+        size += sum(approx_size(value, _seen) for _, value in obj.items())
+    return size
+
+# 스캔 작업별로 보관할 최대 이벤트 수 (SSE 재연결 시 다시 보내기 위해 보관)
+SCAN_EVENT_BUFFER = int(os.environ.get('SCAN_EVENT_BUFFER', 10000))
+
+class ScanEventBus:
+    """
+    스캔 작업별 이벤트(상태 변경, 진행률, 발견된 호스트)를 순서대로 기록하고
+    구독자(SSE 스트림)가 새 이벤트를 기다릴 수 있게 합니다.
+    """
+
+    def __init__(self, max_events: int = SCAN_EVENT_BUFFER):
+        self.max_events = max_events
+        self._streams = {}  # scan_id -> {'offset': 버려진 이벤트 수, 'events': [(종류, 데이터)]}
+        self._cond = threading.Condition()
+
+    def publish(self, scan_id: str, event: str, data: Dict):
+        with self._cond:
+            stream = self._streams.setdefault(scan_id, {'offset': 0, 'events': []})
+            stream['events'].append((event, data))
+            overflow = len(stream['events']) - self.max_events
+            if overflow > 0:
+                del stream['events'][:overflow]
+                stream['offset'] += overflow
+            self._cond.notify_all()
+
+    def read(self, scan_id: str, cursor: int, timeout: float) -> Tuple[List[Tuple[int, str, Dict]], int]:
+        """
+        cursor 이후의 이벤트를 (번호, 종류, 데이터) 목록으로 반환합니다.
+        새 이벤트가 없으면 timeout 동안 기다리며, 다음에 읽을 cursor를 함께 반환합니다.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                stream = self._streams.get(scan_id)
+                if stream is not None:
+                    end = stream['offset'] + len(stream['events'])
+                    if cursor < end:
+                        start = max(cursor, stream['offset'])
+                        events = [
+                            (start + i, event, data)
+                            for i, (event, data) in enumerate(stream['events'][start - stream['offset']:])
+                        ]
+                        return events, end
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return [], cursor
+                self._cond.wait(remaining)
+
+    def discard(self, scan_id: str):
+        with self._cond:
+            self._streams.pop(scan_id, None)
+
+# 전역 스캔 이벤트 버스
+scan_event_bus = ScanEventBus()
+
+def _set_task_status(task: Dict, status: str, **extra):
+    """
+    작업 상태를 바꾸고 상태 변경 이벤트를 발행합니다.
+    최종 상태가 되면 결과를 MongoDB에 저장하도록 작성기에 넘깁니다.
+    """
+    task['status'] = status
+    event = {'scan_id': task['id'], 'status': status, 'time': time.time()}
+    event.update(extra)
+    scan_event_bus.publish(task['id'], 'status', event)
+    # 최종 상태는 워커가 직접 한 번만 저장
+    if is_scan_finished(status):
+        scan_result_writer.submit(task)
+
+class ScanTaskStore:
+    """
+    스캔 작업을 보관하는 딕셔너리 형태의 저장소.
+    끝난 작업은 TTL이 지나거나 개수/메모리 한도를 넘으면 오래 사용하지 않은 순서로 제거되며,
+    제거되는 작업의 결과는 MongoDB(db.scans)에 기록되어 이후에도 조회할 수 있습니다.
+    대기/실행 중인 작업은 제거하지 않습니다.
+    """
+
+    FINISHED = (ScanStatus.COMPLETED, ScanStatus.FAILED, ScanStatus.CANCELLED)
+    EVICT_INTERVAL = 1.0  # 개수 한도를 넘지 않았을 때 전체 작업을 다시 확인하기까지의 최소 간격 (초)
+
+    def __init__(self, ttl: int = SCAN_TASK_TTL, max_entries: int = SCAN_TASK_MAX_ENTRIES,
+                 max_bytes: int = SCAN_TASK_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._tasks = OrderedDict()
+        self._sizes = {}  # 끝난 작업의 대략적인 크기 (끝난 뒤에는 바뀌지 않으므로 한 번만 계산)
+        self._lock = threading.RLock()
+        self.evicted = 0
+        self.spilled = 0
+        self._last_evict = 0.0
+
+    def __setitem__(self, scan_id: str, task: Dict):
+        with self._lock:
+            self._tasks[scan_id] = task
+            self._tasks.move_to_end(scan_id)
+            self._sizes.pop(scan_id, None)
+        self.evict()
+
+    def __getitem__(self, scan_id: str) -> Dict:
+        with self._lock:
+            task = self._tasks[scan_id]
+            self._tasks.move_to_end(scan_id)
+            return task
+
+    def __delitem__(self, scan_id: str):
+        with self._lock:
+            del self._tasks[scan_id]
+            self._sizes.pop(scan_id, None)
+
+    def __contains__(self, scan_id: str) -> bool:
+        with self._lock:
+            return scan_id in self._tasks
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+    def get(self, scan_id: str, default=None) -> Optional[Dict]:
+        with self._lock:
+            return self._tasks.get(scan_id, default)
+
+    def values(self) -> List[Dict]:
+        with self._lock:
+            return list(self._tasks.values())
+
+    def _entry_size(self, scan_id: str, task: Dict) -> int:
+        if task['status'] not in self.FINISHED:
+            return approx_size(task)
+        if scan_id not in self._sizes:
+            self._sizes[scan_id] = approx_size(task)
+        return self._sizes[scan_id]
+
+    def evict(self) -> int:
+        """
+        만료되었거나 한도를 넘은 끝난 작업을 제거하고 MongoDB로 옮깁니다. 제거한 작업 수를 반환합니다.
+        """
+        now = time.time()
+        victims = []
+        with self._lock:
+            # 작업 등록/상태 조회마다 호출되므로 개수 한도를 넘지 않았으면 전체 작업 확인은 EVICT_INTERVAL마다 한 번만 수행
+            if len(self._tasks) <= self.max_entries and now - self._last_evict < self.EVICT_INTERVAL:
+                return 0
+            self._last_evict = now
+            finished = [(sid, t) for sid, t in self._tasks.items() if t['status'] in self.FINISHED]
+            # 1) TTL이 지난 작업
+            remaining = []
+            for sid, task in finished:
+                if now - (task.get('end_time') or now) >= self.ttl:
+                    victims.append(sid)
+                else:
+                    remaining.append((sid, task))
+            remaining.reverse()  # 오래 사용하지 않은 작업이 끝에 오도록 뒤집어 pop()으로 꺼냄
+            # 2) 개수 한도 초과 시 오래 사용하지 않은 순서로 제거
+            overflow = len(self._tasks) - len(victims) - self.max_entries
+            while overflow > 0 and remaining:
+                victims.append(remaining.pop()[0])
+                overflow -= 1
+            # 3) 메모리 한도 초과 시 오래 사용하지 않은 순서로 제거
+            if self.max_bytes:
+                total = sum(self._entry_size(sid, t) for sid, t in remaining)
+                while total > self.max_bytes and remaining:
+                    sid, task = remaining.pop()
+                    total -= self._entry_size(sid, task)
+                    victims.append(sid)
+            evicted = [(sid, self._tasks.pop(sid)) for sid in victims]
+            for sid in victims:
+                self._sizes.pop(sid, None)
+                scan_event_bus.discard(sid)
+            self.evicted += len(evicted)
+
+        for sid, task in evicted:
+            self._spill(task)
+        return len(evicted)
+
+    def _spill(self, task: Dict):
+        """
+        제거되는 작업이 아직 MongoDB에 기록되지 않았다면 완료 기록 작성기에 넘깁니다.
+        (evict()는 작업 등록/상태 조회 요청에서 호출되므로 여기서 직접 기록하지 않음)
+        """
+        if _scan_db is None or task.get('persisted'):
+            return
+        scan_result_writer.spill(task)
+        self.spilled += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        저장소에 있는 작업 수와 대략적인 메모리 사용량을 반환합니다.
+        """
+        with self._lock:
+            by_status = {}
+            for task in self._tasks.values():
+                by_status[task['status']] = by_status.get(task['status'], 0) + 1
+            return {
+                'entries': len(self._tasks),
+                'by_status': by_status,
+                'approx_bytes': sum(self._entry_size(sid, t) for sid, t in self._tasks.items()),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'evicted': self.evicted,
+                'spilled': self.spilled,
+            }
+
+# 완료 기록 일괄 저장 설정
+SCAN_PERSIST_BATCH_SIZE = int(os.environ.get('SCAN_PERSIST_BATCH_SIZE', 50))             # 한 번에 저장할 최대 작업 수
+SCAN_PERSIST_FLUSH_INTERVAL = float(os.environ.get('SCAN_PERSIST_FLUSH_INTERVAL', 0.5))  # 모아서 저장할 최대 대기 시간 (초)
+
+# 스캔 결과 압축 저장 설정
+SCAN_RESULT_COMPRESSION_LEVEL = int(os.environ.get('SCAN_RESULT_COMPRESSION_LEVEL', 6))      # zlib 압축 수준 (1~9)
+SCAN_RESULT_CHUNK_SIZE = int(os.environ.get('SCAN_RESULT_CHUNK_SIZE', 4 * 1024 * 1024))    # 이보다 큰 압축 필드는 별도 컬렉션에 나누어 저장 (바이트)
+# 따로 압축해 저장하고 요청한 경우에만 풀어서 읽는 결과 필드
+SCAN_RESULT_FIELDS = ('scan_info', 'hosts', 'diff')
+
+def summarize_scan_result(result: Optional[Dict]) -> Optional[Dict]:
+    """
+    결과 목록/상태 표시에 필요한 작은 요약 정보를 만듭니다. (압축하지 않고 문서에 그대로 저장)
+    """
+    if result is None:
+        return None
+    hosts = result.get('hosts', [])
+    return {
+        'hosts_total': len(hosts),
+        'hosts_up': sum(1 for host in hosts if host.get('state') == 'up'),
+        'open_ports': sum(
+            1 for host in hosts for port in host.get('ports', []) if port.get('state') == 'open'
+        ),
+        'vulnerable_ports': sum(
+            1 for host in hosts for port in host.get('ports', []) if port.get('state') == 'open' and port.get('vulns')
+        ),
+        'partial': bool(result.get('partial')),
+    }
+
+def pack_scan_result(scan_id: str, result: Dict) -> Tuple[Dict, Dict, List[Dict]]:
+    """
+    스캔 결과를 필드별로 압축합니다.
+    
+    Returns:
+        (result_blobs, result_summary, chunk_documents)
+        result_blobs의 각 값은 압축된 bytes이거나, SCAN_RESULT_CHUNK_SIZE보다 크면
+        scan_result_chunks 컬렉션에 나누어 저장할 조각 수({'chunks': n})입니다.
+    """
+    blobs = {}
+    chunks = []
+    summary = summarize_scan_result(result)
+    summary['fields'] = []
+    summary['values'] = {}
+    raw_bytes = compressed_bytes = 0
+    for field, value in result.items():
+        if field not in SCAN_RESULT_FIELDS:
+            # 작은 부가 필드(partial 등)는 압축하지 않음
+            summary['values'][field] = value
+            continue
+        raw = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=record_json_default).encode('utf-8')
+        packed = zlib.compress(raw, SCAN_RESULT_COMPRESSION_LEVEL)
+        raw_bytes += len(raw)
+        compressed_bytes += len(packed)
+        summary['fields'].append(field)
+        if len(packed) <= SCAN_RESULT_CHUNK_SIZE:
+            blobs[field] = packed
+            continue
+        pieces = [packed[i:i + SCAN_RESULT_CHUNK_SIZE] for i in range(0, len(packed), SCAN_RESULT_CHUNK_SIZE)]
+        blobs[field] = {'chunks': len(pieces)}
+        chunks.extend(
+            {'_id': f"{scan_id}:{field}:{n}", 'scan_id': scan_id, 'field': field, 'n': n, 'data': piece}
+            for n, piece in enumerate(pieces)
+        )
+    summary['raw_bytes'] = raw_bytes
+    summary['compressed_bytes'] = compressed_bytes
+    return blobs, summary, chunks
+
+def stored_result_projection(fields: Optional[List[str]]) -> Optional[Dict]:
+    """
+    요청한 결과 필드만 읽어오도록 MongoDB projection을 만듭니다. (None이면 전체)
+    """
+    if fields is None:
+        return None
+    projection = {}
+    for field in SCAN_RESULT_FIELDS:
+        if field not in fields:
+            projection[f'result_blobs.{field}'] = 0
+            projection[f'result.{field}'] = 0
+    return projection
+
+def unpack_scan_result(doc: Dict, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    저장된 스캔 문서에서 결과를 복원합니다. 요청한 필드(None이면 전체)만 압축을 풉니다.
+    압축 저장 이전에 기록된 문서의 result 필드도 그대로 읽습니다.
+    """
+    if 'result_blobs' not in doc:
+        result = doc.get('result')
+        if result is None or fields is None:
+            return result
+        return {k: v for k, v in result.items() if k in fields or k not in SCAN_RESULT_FIELDS}
+    
+    summary = doc.get('result_summary') or {}
+    result = dict(summary.get('values', {}))
+    for field in summary.get('fields', []):
+        if fields is not None and field not in fields:
+            continue
+        blob = doc['result_blobs'].get(field)
+        if blob is None:
+            continue
+        if isinstance(blob, dict):
+            pieces = _scan_db.scan_result_chunks.find({'scan_id': doc['_id'], 'field': field}).sort('n', 1)
+            blob = b''.join(bytes(piece['data']) for piece in pieces)
+        result[field] = json.loads(zlib.decompress(blob))
+    return result
+
+def _completion_update(task: Dict) -> Tuple[Dict, Dict, List[Dict]]:
+    """
+    끝난 작업의 최종 상태를 db.scans에 기록하기 위한 (filter, update, chunk_documents)를 만듭니다.
+    같은 값을 $set하므로 여러 번 실행해도 결과가 같고, 문서가 없으면 기본 필드와 함께 새로 만듭니다.
+    결과는 필드별로 압축되며, 너무 큰 필드는 chunk_documents로 나뉩니다. (문서보다 먼저 저장해야 함)
+    """
+    end_time = task.get('end_time') or task['start_time']
+    fields = {
+        'status': task['status'],
+        'start_time': task['start_time'],
+        'end_time': end_time,
+        'duration': end_time - task['start_time'],
+        'error': task.get('error'),
+        'completed_at': datetime.fromtimestamp(end_time, timezone.utc),
+    }
+    chunks = []
+    if task.get('result') is not None:
+        fields['result_blobs'], fields['result_summary'], chunks = pack_scan_result(task['id'], task['result'])
+    if task.get('cached'):
+        fields['cached'] = True
+    if 'timing' in task:
+        fields['timing'] = task['timing']
+    return (
+        {'_id': task['id']},
+        {
+            '$set': fields,
+            '$setOnInsert': {
+                'target': task['target'],
+                'target_key': normalize_target(task['target']),
+                'mode': task['mode'],
+                'created_at': datetime.fromtimestamp(task['start_time'], timezone.utc),
+            },
+        },
+        chunks
+    )
+
+def _write_result_chunks(chunks: List[Dict]):
+    """
+    큰 결과 필드의 조각을 저장합니다. _id가 정해져 있으므로 이미 저장된 조각은 무시합니다.
+    """
+    from pymongo.errors import BulkWriteError
+    if not chunks:
+        return
+    try:
+        _scan_db.scan_result_chunks.insert_many(chunks, ordered=False)
+    except BulkWriteError as e:
+        if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+
+def record_scan_completion(task: Dict):
+    """
+    끝난 작업의 최종 상태와 결과를 db.scans에 바로 기록합니다. (큰 결과 필드의 조각을 먼저 저장)
+    작성기를 거치지 않고 기록해야 하는 경우(공유 대기열 작업의 취소/실패 처리 등)에 사용합니다.
+    """
+    scan_filter, update, chunks = _completion_update(task)
+    _write_result_chunks(chunks)
+    _scan_db.scans.update_one(scan_filter, update, upsert=True)
+
+# 호스트/포트 인벤토리 저장 시 한 번에 넣을 최대 문서 수
+INVENTORY_INSERT_BATCH = 1000
+
+# 실제 스캔이 아닌 결과를 만드는 모드 (인벤토리에 기록하지 않고 증분 스캔 기준으로도 사용하지 않음)
+SYNTHETIC_SCAN_MODES = (ScanMode.TEST, ScanMode.SIMULATED)
+
+def build_host_port_documents(task: Dict) -> List[Dict]:
+    """
+    끝난 작업의 결과를 host_ports 컬렉션용 문서(호스트-포트당 1개)로 펼칩니다.
+    _id는 (스캔 ID, IP, 프로토콜, 포트)로 정해지므로 같은 결과를 다시 넣어도 중복되지 않습니다.
+    """
+    result = task.get('result') or {}
+    scanned_at = datetime.fromtimestamp(task.get('end_time') or task['start_time'], timezone.utc)
+    documents = []
+    for host in result.get('hosts', []):
+        for port in host.get('ports', []):
+            documents.append({
+                '_id': f"{task['id']}:{host.get('ip')}:{port.get('protocol')}:{port.get('port')}",
+                'scan_id': task['id'],
+                'target': task['target'],
+                'mode': task['mode'],
+                'ip': host.get('ip'),
+                'hostname': host.get('hostname', ''),
+                'mac': host.get('mac', ''),
+                'port': port.get('port'),
+                'protocol': port.get('protocol'),
+                'state': port.get('state'),
+                'service': port.get('service', ''),
+                'product': port.get('product', ''),
+                'version': port.get('version', ''),
+                'cves': [vuln['id'] for vuln in port.get('vulns') or ()],
+                'scanned_at': scanned_at,
+            })
+    return documents
+
+class ScanResultWriter:
+    """
+    끝난 스캔의 최종 상태와 결과를 MongoDB에 한 번만 기록하는 백그라운드 작성기.
+    여러 작업의 완료 기록을 모아 bulk_write로 저장하므로, 상태 조회 API는 읽기만 합니다.
+    """
+
+    def __init__(self, batch_size: int = SCAN_PERSIST_BATCH_SIZE, flush_interval: float = SCAN_PERSIST_FLUSH_INTERVAL):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._spilled = {}  # 저장소에서 제거되었지만 아직 기록되지 않은 작업 (기록될 때까지 pending()으로 조회)
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, task: Dict):
+        """
+        끝난 작업을 저장 대기열에 추가합니다. 이미 기록된 작업은 무시합니다.
+        """
+        if _scan_db is None or task.get('persisted') or task.get('persist_pending'):
+            return
+        task['persist_pending'] = True
+        self._queue.put(task)
+        self._ensure_thread()
+
+    def spill(self, task: Dict):
+        """
+        작업 저장소에서 제거되는 작업을 저장 대기열에 넘깁니다.
+        기록이 끝날 때까지는 메모리에도 MongoDB에도 없으므로 pending()으로 조회할 수 있게 유지합니다.
+        """
+        if _scan_db is None or task.get('persisted'):
+            return
+        with self._lock:
+            self._spilled[task['id']] = task
+        self.submit(task)
+        if task.get('persisted'):
+            # 넘기는 사이에 이미 기록이 끝났으면 바로 정리
+            with self._lock:
+                self._spilled.pop(task['id'], None)
+
+    def pending(self, scan_id: str) -> Optional[Dict]:
+        """
+        저장소에서 제거되어 기록을 기다리는 작업을 반환합니다. 없으면 None을 반환합니다.
+        """
+        with self._lock:
+            return self._spilled.get(scan_id)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='scan-result-writer')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, tasks: List[Dict]):
+        from pymongo import UpdateOne
+        try:
+            operations = []
+            chunks = []
+            for task in tasks:
+                scan_filter, update, task_chunks = _completion_update(task)
+                operations.append(UpdateOne(scan_filter, update, upsert=True))
+                chunks.extend(task_chunks)
+            # 문서가 조각을 가리키기 전에 조각부터 저장
+            _write_result_chunks(chunks)
+            _scan_db.scans.bulk_write(operations, ordered=False)
+            for task in tasks:
+                task['persisted'] = True
+            self.written += len(tasks)
+            logger.info(f"스캔 결과 {len(tasks)}개 MongoDB 저장 완료")
+        except Exception as e:
+            self.failed += len(tasks)
+            logger.error(f"스캔 결과 MongoDB 저장 실패 ({len(tasks)}개): {str(e)}")
+            return
+        finally:
+            with self._lock:
+                for task in tasks:
+                    task.pop('persist_pending', None)
+                    self._spilled.pop(task['id'], None)
+        self._write_inventory(tasks)
+
+    def _write_inventory(self, tasks: List[Dict]):
+        """
+        결과를 host_ports 컬렉션에 호스트-포트 단위로 저장합니다.
+        (캐시된 결과, 실패한 작업, 테스트/시뮬레이션 결과는 제외)
+        """
+        from pymongo.errors import BulkWriteError
+        documents = [
+            document
+            for task in tasks
+            if task['status'] in (ScanStatus.COMPLETED, ScanStatus.CANCELLED) and not task.get('cached')
+            and task['mode'] not in SYNTHETIC_SCAN_MODES
+            for document in build_host_port_documents(task)
+        ]
+        for start in range(0, len(documents), INVENTORY_INSERT_BATCH):
+            try:
+                _scan_db.host_ports.insert_many(documents[start:start + INVENTORY_INSERT_BATCH], ordered=False)
+            except BulkWriteError as e:
+                # 이미 저장된 문서(중복 키)는 무시
+                errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != 11000]
+                if errors:
+                    logger.error(f"호스트/포트 인벤토리 저장 실패: {errors[0].get('errmsg')}")
+            except Exception as e:
+                logger.error(f"호스트/포트 인벤토리 저장 실패: {str(e)}")
+
+    def flush(self, timeout: float = 10.0):
+        """
+        대기 중인 기록이 모두 저장될 때까지 최대 timeout초 기다립니다.
+        """
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            spilled = len(self._spilled)
+        return {'pending': self._queue.qsize(), 'spilled': spilled, 'written': self.written, 'failed': self.failed}
+
+# 전역 완료 기록 작성기 (프로세스 종료 시 남은 기록 저장)
+scan_result_writer = ScanResultWriter()
+atexit.register(scan_result_writer.flush)
+
+# 스캔 작업을 추적하기 위한 전역 저장소
+scan_tasks = ScanTaskStore()
+
+# 스캔 워커 풀 설정
+SCAN_MAX_WORKERS = int(os.environ.get('SCAN_MAX_WORKERS', 4))          # 동시에 실행할 최대 스캔 수
+SCAN_QUEUE_MAX_SIZE = int(os.environ.get('SCAN_QUEUE_MAX_SIZE', 1000))  # 대기열 최대 길이
+
+# nmap XML 출력을 스트리밍으로 파싱하여 호스트별 결과를 즉시 반영할지 여부
+SCAN_STREAM_RESULTS = os.environ.get('SCAN_STREAM_RESULTS', 'true').lower() in ('1', 'true', 'yes')
+
+# 스캔 대기열 방식: local(이 프로세스의 워커 스레드) 또는 mongo(MongoDB scan_jobs 컬렉션을 공유하는 워커 프로세스)
+SCAN_QUEUE_BACKEND = os.environ.get('SCAN_QUEUE_BACKEND', 'local').lower()
+SCAN_JOB_LEASE = float(os.environ.get('SCAN_JOB_LEASE', 60))                  # 워커가 작업을 점유하는 시간 (초), 하트비트로 연장
+SCAN_JOB_POLL_INTERVAL = float(os.environ.get('SCAN_JOB_POLL_INTERVAL', 2))   # 워커가 새 작업을 확인하는 주기 (초)
+SCAN_JOB_MAX_ATTEMPTS = int(os.environ.get('SCAN_JOB_MAX_ATTEMPTS', 3))       # 워커 중단 등으로 다시 시도할 최대 횟수
+
+# 호스트가 이 수 이상인 결과는 상태 조회 응답을 호스트 단위로 나누어 스트리밍
+SCAN_STREAM_RESPONSE_MIN_HOSTS = int(os.environ.get('SCAN_STREAM_RESPONSE_MIN_HOSTS', 500))
+
+# CIDR 샤딩 설정: 큰 네트워크를 SCAN_SHARD_PREFIX 크기의 하위 블록으로 나누어 병렬 스캔
+SCAN_SHARD_PREFIX = int(os.environ.get('SCAN_SHARD_PREFIX', 24))
+SCAN_SHARD_PARALLELISM = int(os.environ.get('SCAN_SHARD_PARALLELISM', 4))  # 작업 하나당 동시 하위 스캔 수
+# 전체 프로세스에서 동시에 실행할 수 있는 nmap 프로세스 수 (샤드 포함)
+SCAN_MAX_NMAP_PROCESSES = int(os.environ.get('SCAN_MAX_NMAP_PROCESSES', max(SCAN_MAX_WORKERS, os.cpu_count() or 1)))
+
+# nmap 프로세스 동시 실행 제한
+_nmap_slots = threading.BoundedSemaphore(max(1, SCAN_MAX_NMAP_PROCESSES))
+
+# 호스트 탐색(ping/TCP-ACK) 사전 단계 설정
+SCAN_DISCOVERY_ENABLED = os.environ.get('SCAN_DISCOVERY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SCAN_DISCOVERY_TTL = int(os.environ.get('SCAN_DISCOVERY_TTL', 600))  # 서브넷별 탐색 결과 캐시 유지 시간 (초)
+SCAN_DISCOVERY_ARGS = os.environ.get('SCAN_DISCOVERY_ARGS', '-sn -PE -PA21,22,80,443,3389')
+
+# 서브넷별 호스트 탐색 결과 캐시: {네트워크: (탐색 시각, [살아있는 IP 목록])}
+_discovery_cache = {}
+_discovery_lock = threading.Lock()
+
+# 스캔 결과 캐시 설정
+SCAN_CACHE_TTL = int(os.environ.get('SCAN_CACHE_TTL', 300))                  # 결과 캐시 유지 시간 (초)
+SCAN_CACHE_MAX_ENTRIES = int(os.environ.get('SCAN_CACHE_MAX_ENTRIES', 128))  # 캐시에 보관할 최대 결과 수
+
+# 빠른 스캔 기본 엔진과 asyncio 연결 스캔 설정
+SCAN_QUICK_ENGINE = os.environ.get('SCAN_QUICK_ENGINE', ScanEngine.NMAP)
+SCAN_NATIVE_CONCURRENCY = int(os.environ.get('SCAN_NATIVE_CONCURRENCY', 500))  # 동시에 열어둘 최대 연결 수
+SCAN_NATIVE_TIMEOUT = float(os.environ.get('SCAN_NATIVE_TIMEOUT', 1.0))        # 연결 시도당 제한 시간 (초)
+
+# 적응형 타이밍: 대상별로 관측한 RTT/타임아웃/소요 시간으로 다음 스캔의 nmap 타이밍 옵션을 선택
+SCAN_ADAPTIVE_TIMING = os.environ.get('SCAN_ADAPTIVE_TIMING', 'true').lower() in ('1', 'true', 'yes')
+
+# nmap 진행률 보고 주기 (--stats-every)
+SCAN_STATS_INTERVAL = os.environ.get('SCAN_STATS_INTERVAL', '5s')
+
+# 모드별 우선순위 (값이 작을수록 먼저 실행)
+SCAN_PRIORITIES = {
+    ScanMode.TEST: 0,
+    ScanMode.QUICK: 1,
+    ScanMode.SIMULATED: 1,
+    ScanMode.DIFF: 2,
+    ScanMode.CUSTOM: 2,
+    ScanMode.FULL: 3,
+}
+
+# 결과 캐시와 동일 스캔 연결을 사용하지 않는 모드
+# (증분 스캔은 요청 시점의 기준 결과와 비교해야 하므로 이전 비교 결과를 재사용하지 않음)
+UNCACHED_SCAN_MODES = (ScanMode.TEST, ScanMode.SIMULATED, ScanMode.DIFF)
+
+class ScanQueueFullError(Exception):
+    """스캔 대기열이 가득 차서 작업을 더 받을 수 없을 때 발생합니다."""
+    pass
+
+class ScanCancelledError(Exception):
+    """스캔 작업이 취소되어 실행을 중단할 때 발생합니다."""
+    pass
+
+# 실행 중인 스캔 작업의 취소 신호와 nmap 프로세스 목록 (scan_id -> 제어 정보)
+_task_controls = {}
+_task_controls_lock = threading.Lock()
+
+def _create_task_control(scan_id: str) -> Dict:
+    control = {'cancel': threading.Event(), 'done': threading.Event(), 'processes': set()}
+    with _task_controls_lock:
+        _task_controls[scan_id] = control
+    return control
+
+def _get_task_control(scan_id: str) -> Optional[Dict]:
+    with _task_controls_lock:
+        return _task_controls.get(scan_id)
+
+def _remove_task_control(scan_id: str):
+    with _task_controls_lock:
+        control = _task_controls.pop(scan_id, None)
+    if control:
+        control['done'].set()
+
+class ScanScheduler:
+    """
+    스캔 작업을 우선순위 큐에 넣고 제한된 수의 워커 스레드로 실행합니다.
+    같은 우선순위에서는 먼저 들어온 작업이 먼저 실행됩니다.
+    """
+
+    def __init__(self, max_workers: int = SCAN_MAX_WORKERS, max_queue_size: int = SCAN_QUEUE_MAX_SIZE):
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max_queue_size
+        self._heap = []  # (priority, seq, scan_id, enqueued_at, job)
+        self._depth = {}  # 우선순위별 대기 작업 수 (새 작업의 대기 순번을 대기열을 훑지 않고 계산)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = set()
+        self._wait_times = deque(maxlen=500)  # 최근 대기 시간 (초)
+        self._total_submitted = 0
+        self._total_started = 0
+
+    def submit(self, scan_id: str, priority: int, job) -> int:
+        """
+        작업을 대기열에 추가하고 1부터 시작하는 대기 순번을 반환합니다.
+        """
+        with self._cond:
+            if len(self._heap) >= self.max_queue_size:
+                raise ScanQueueFullError(f"스캔 대기열이 가득 찼습니다 (최대 {self.max_queue_size}개)")
+            heapq.heappush(self._heap, (priority, next(self._seq), scan_id, time.time(), job))
+            self._depth[priority] = self._depth.get(priority, 0) + 1
+            self._total_submitted += 1
+            self._ensure_workers()
+            self._cond.notify()
+            # 새 작업은 같은 우선순위에서 가장 나중이므로 우선순위가 같거나 높은 작업 수가 대기 순번
+            return sum(count for level, count in self._depth.items() if level <= priority)
 
-# 스캔 작업을 추적하기 위한 전역 딕셔너리
-scan_tasks = {}
+    def remove(self, scan_id: str) -> bool:
+        """
+        아직 시작하지 않은 작업을 대기열에서 제거합니다. 제거했으면 True를 반환합니다.
+        """
+        with self._cond:
+            for index, entry in enumerate(self._heap):
+                if entry[2] == scan_id:
+                    self._heap.pop(index)
+                    heapq.heapify(self._heap)
+                    self._depth[entry[0]] -= 1
+                    return True
+            return False
+
+    def queue_position(self, scan_id: str) -> Optional[int]:
+        """
+        대기 중인 작업의 순번(1부터)을 반환합니다. 대기열에 없으면 None을 반환합니다.
+        """
+        with self._cond:
+            return self._position_locked(scan_id)
+
+    def _position_locked(self, scan_id: str) -> Optional[int]:
+        # 대기열 전체를 정렬하지 않고 앞선(우선순위가 높거나 먼저 들어온) 작업 수를 셈
+        key = next((entry[:2] for entry in self._heap if entry[2] == scan_id), None)
+        if key is None:
+            return None
+        return 1 + sum(1 for entry in self._heap if entry[:2] < key)
+
+    def idle_slots(self) -> int:
+        """
+        바로 실행할 수 있는 빈 워커 수(워커 수 - 실행 중 - 대기 중)를 반환합니다.
+        """
+        with self._cond:
+            return max(0, self.max_workers - len(self._running) - len(self._heap))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        대기열 깊이, 실행 중인 작업 수, 대기 시간 통계를 반환합니다.
+        """
+        with self._cond:
+            now = time.time()
+            waits = list(self._wait_times)
+            return {
+                'max_workers': self.max_workers,
+                'running': len(self._running),
+                'queue_depth': len(self._heap),
+                'max_queue_size': self.max_queue_size,
+                'oldest_wait': max((now - entry[3] for entry in self._heap), default=0),
+                'avg_wait_time': sum(waits) / len(waits) if waits else 0,
+                'max_wait_time': max(waits, default=0),
+                'total_submitted': self._total_submitted,
+                'total_started': self._total_started,
+            }
+
+    def _ensure_workers(self):
+        # 필요할 때만 워커 스레드를 생성 (락을 잡은 상태에서 호출)
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name=f"scan-worker-{len(self._workers)}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                priority, _, scan_id, enqueued_at, job = heapq.heappop(self._heap)
+                self._depth[priority] -= 1
+                wait_time = time.time() - enqueued_at
+                self._wait_times.append(wait_time)
+                self._total_started += 1
+                self._running.add(scan_id)
+            try:
+                job(wait_time)
+            except Exception as e:
+                logger.error(f"스캔 워커 오류 [ID: {scan_id}]: {str(e)}")
+            finally:
+                with self._cond:
+                    self._running.discard(scan_id)
+
+# 전역 스캔 스케줄러
+scan_scheduler = ScanScheduler()
+
+class ScanResultCache:
+    """
+    (대상, 모드, 포트, 인자)를 키로 완료된 스캔 결과를 보관하는 TTL/LRU 캐시.
+    """
+
+    def __init__(self, ttl: int = SCAN_CACHE_TTL, max_entries: int = SCAN_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (저장 시각, 결과)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Tuple[Dict, float]]:
+        """
+        캐시된 (결과, 저장 시각)을 반환합니다. 없거나 만료되었으면 None을 반환합니다.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[0]
+
+    def put(self, key: Tuple, result: Dict):
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+# 전역 스캔 결과 캐시와 실행 중인 스캔 목록 (캐시 키 -> 스캔 ID)
+scan_result_cache = ScanResultCache()
+_inflight_scans = {}
+_inflight_lock = threading.Lock()
+
+# 스캐너 기능 정보 (앱 시작 시 한 번만 확인)
+_scanner_capabilities = None
+_capabilities_lock = threading.Lock()
+
+def _has_raw_socket_privileges() -> bool:
+    """
+    SYN 스캔/OS 감지에 필요한 raw 소켓 권한(관리자 권한)이 있는지 확인합니다.
+    """
+    if hasattr(os, 'geteuid'):
+        return os.geteuid() == 0
+    try:
+        import ctypes
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    except Exception:
+        return False
+
+def detect_scanner_capabilities() -> Dict[str, Any]:
+    """
+    nmap 경로와 버전, raw 소켓 권한, NSE 사용 가능 여부를 확인합니다.
+    """
+    capabilities = {
+        'python_nmap': NMAP_AVAILABLE,
+        'nmap_path': shutil.which('nmap'),
+        'nmap_version': None,
+        'privileged': _has_raw_socket_privileges(),
+        'nse_available': False,
+        'syn_scan': False,
+        'scan_type': '-sT',
+        'detected_at': time.time(),
+    }
+
+    if capabilities['nmap_path']:
+        try:
+            output = subprocess.run(
+                [capabilities['nmap_path'], '--version'],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=10
+            ).stdout
+            match = re.search(r'Nmap version (\S+)', output)
+            capabilities['nmap_version'] = match.group(1) if match else None
+            # NSE는 Lua 지원이 포함된 빌드에서만 사용 가능
+            capabilities['nse_available'] = 'liblua' in output
+        except Exception as e:
+            logger.error(f"nmap 버전 확인 중 오류 발생: {str(e)}")
+        # 권한이 있으면 연결 스캔(-sT) 대신 SYN 스캔(-sS) 사용
+        if capabilities['privileged']:
+            capabilities['syn_scan'] = True
+            capabilities['scan_type'] = '-sS'
+    else:
+        logger.warning("시스템에 nmap이 설치되어 있지 않습니다.")
+
+    if not NMAP_AVAILABLE:
+        logger.warning("python-nmap 라이브러리가 설치되어 있지 않습니다.")
+
+    return capabilities
+
+def init_scanner_capabilities(force: bool = False) -> Dict[str, Any]:
+    """
+    스캐너 기능 정보를 확인하여 등록합니다. 앱 시작 시 한 번 호출됩니다.
+    """
+    global _scanner_capabilities
+    with _capabilities_lock:
+        if _scanner_capabilities is None or force:
+            _scanner_capabilities = detect_scanner_capabilities()
+            logger.info(f"스캐너 기능 확인 완료: {_scanner_capabilities}")
+        return _scanner_capabilities
+
+def get_scanner_capabilities() -> Dict[str, Any]:
+    """
+    등록된 스캐너 기능 정보를 반환합니다. 아직 확인하지 않았다면 지금 확인합니다.
+    """
+    if _scanner_capabilities is None:
+        return init_scanner_capabilities()
+    return _scanner_capabilities
+
+def _scan_type_flag() -> str:
+    """
+    현재 권한에서 사용할 TCP 스캔 방식 옵션을 반환합니다. (-sS 또는 -sT)
+    """
+    return get_scanner_capabilities()['scan_type']
 
 # nmap 설치 확인 함수
 def check_nmap_installed() -> bool:
     """
     시스템에 nmap이 설치되어 있는지 확인합니다.
+    (앱 시작 시 확인한 스캐너 기능 정보를 사용하므로 프로세스를 새로 실행하지 않음)
     """
-    # 먼저 python-nmap 라이브러리 확인
-    if not NMAP_AVAILABLE:
-        logger.warning("python-nmap 라이브러리가 설치되어 있지 않습니다.")
-        return False
-        
-    try:
-        # which 또는 where 명령어로 nmap 실행 파일 찾기
-        if os.name == 'nt':  # Windows
-            result = subprocess.run(['where', 'nmap'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        else:  # Linux, MacOS
-            result = subprocess.run(['which', 'nmap'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        # 반환 코드가 0이면 설치되어 있음
-        is_installed = result.returncode == 0
-        if not is_installed:
-            logger.warning("시스템에 nmap이 설치되어 있지 않습니다.")
-        return is_installed
-    except Exception as e:
-        logger.error(f"nmap 설치 확인 중 오류 발생: {str(e)}")
+    capabilities = get_scanner_capabilities()
+    # 스트리밍 파서를 쓰지 않으면 python-nmap 라이브러리도 필요
+    if not SCAN_STREAM_RESULTS and not capabilities['python_nmap']:
         return False
+    return capabilities['nmap_path'] is not None
 
 # 테스트용 더미 데이터
 def generate_test_data(target: str) -> Dict:
@@ -148,43 +1080,40 @@ def is_valid_target(target: str) -> bool:
         return True
     return False
 
-def parse_nmap_data(host_data: Dict) -> Dict[str, Any]:
+def parse_nmap_data(host_data: Dict) -> HostRecord:
     """
     nmap 스캔 결과를 파싱하여 필요한 데이터 형식으로 변환합니다.
+    결과는 메모리를 적게 쓰는 HostRecord이며, 응답 시 to_json_shape()로 JSON 형식으로 변환됩니다.
     """
-    result = {
-        'hostname': host_data.hostname(),
-        'state': host_data.state(),
-        'ip': host_data.get('addresses', {}).get('ipv4', ''),
-        'mac': host_data.get('addresses', {}).get('mac', ''),
-        'macVendor': host_data.get('vendor', {}).get(host_data.get('addresses', {}).get('mac', ''), ''),
-        'ports': [],
-        'os': None,
-        'scripts': [],
-        'uptime': None,
-        'distance': None,
-        'tcpSequence': None,
-        'lastScanTime': time.strftime('%Y-%m-%d %H:%M:%S')
-    }
+    addresses = host_data.get('addresses', {})
+    result = HostRecord(
+        hostname=host_data.hostname(),
+        state=host_data.state(),
+        ip=addresses.get('ipv4', ''),
+        mac=addresses.get('mac', ''),
+        macVendor=host_data.get('vendor', {}).get(addresses.get('mac', ''), ''),
+        lastScanTime=time.strftime('%Y-%m-%d %H:%M:%S')
+    )
     
     # 포트 정보 파싱
     for proto in ['tcp', 'udp']:
         if proto in host_data:
             for port_num, port_data in host_data[proto].items():
-                port_info = {
-                    'port': int(port_num),
-                    'protocol': proto,
-                    'state': port_data.get('state', ''),
-                    'service': port_data.get('name', ''),
-                    'product': port_data.get('product', ''),
-                    'version': port_data.get('version', ''),
-                }
-                result['ports'].append(port_info)
+                result.ports.append(PortRecord(
+                    port=int(port_num),
+                    protocol=proto,
+                    state=port_data.get('state', ''),
+                    service=port_data.get('name', ''),
+                    product=port_data.get('product', ''),
+                    version=port_data.get('version', ''),
+                    vulns=match_service_vulns(port_data.get('product', ''), port_data.get('version', ''),
+                                              port_data.get('cpe', '')),
+                ))
 
     # OS 정보 파싱
     if 'osmatch' in host_data and host_data['osmatch']:
         top_match = host_data['osmatch'][0]
-        result['os'] = {
+        result.os = {
             'name': top_match.get('name', ''),
             'accuracy': int(top_match.get('accuracy', 0)),
             'version': top_match.get('osclass', [{}])[0].get('osgen', '') if top_match.get('osclass') else '',
@@ -193,121 +1122,911 @@ def parse_nmap_data(host_data: Dict) -> Dict[str, Any]:
     # 스크립트 결과 파싱
     if 'hostscript' in host_data:
         for script in host_data['hostscript']:
-            result['scripts'].append({
+            result.scripts.append({
                 'name': script.get('id', ''),
                 'output': script.get('output', '')
             })
             
     # 업타임 정보 파싱
     if 'uptime' in host_data:
-        result['uptime'] = {
+        result.uptime = {
             'seconds': host_data['uptime'].get('seconds', 0),
             'lastBoot': host_data['uptime'].get('lastboot', '')
         }
         
     # 거리 정보 파싱
     if 'distance' in host_data:
-        result['distance'] = host_data['distance'].get('value', 0)
+        result.distance = host_data['distance'].get('value', 0)
         
     # TCP 시퀀스 정보 파싱
     if 'tcpsequence' in host_data:
-        result['tcpSequence'] = {
+        result.tcpSequence = {
             'class': host_data['tcpsequence'].get('class', ''),
             'difficulty': host_data['tcpsequence'].get('difficulty', '')
         }
         
+    # traceroute 경로 파싱 (스캐너에서 가까운 순서)
+    if host_data.get('trace'):
+        result.trace = [
+            {
+                'ttl': int(hop.get('ttl', 0)),
+                'ip': hop.get('ipaddr', ''),
+                'host': hop.get('host', ''),
+                'rtt': float(hop['rtt']) if hop.get('rtt') not in (None, '', '--') else None,
+            }
+            for hop in host_data['trace'].get('hops', [])
+        ]
+        
+    return result
+
+class NmapXmlHost(dict):
+    """
+    nmap XML의 <host> 요소를 python-nmap의 PortScannerHostDict와 같은 구조로 담는 딕셔너리.
+    parse_nmap_data()에 그대로 넘길 수 있습니다.
+    """
+
+    def hostname(self) -> str:
+        hostnames = self.get('hostnames', [])
+        for entry in hostnames:
+            if entry.get('type') == 'user':
+                return entry.get('name', '')
+        return hostnames[0].get('name', '') if hostnames else ''
+
+    def state(self) -> str:
+        return self.get('status', {}).get('state', '')
+
+def parse_host_element(host_elem: ET.Element) -> NmapXmlHost:
+    """
+    nmap XML의 <host> 요소를 NmapXmlHost로 변환합니다.
+    """
+    host = NmapXmlHost()
+    host['hostnames'] = [
+        {'name': h.get('name', ''), 'type': h.get('type', '')}
+        for h in host_elem.findall('hostnames/hostname')
+    ]
+    host['addresses'] = {}
+    host['vendor'] = {}
+    for address in host_elem.findall('address'):
+        host['addresses'][address.get('addrtype')] = address.get('addr')
+        if address.get('vendor'):
+            host['vendor'][address.get('addr')] = address.get('vendor')
+
+    status = host_elem.find('status')
+    if status is not None:
+        host['status'] = {'state': status.get('state', ''), 'reason': status.get('reason', '')}
+
+    uptime = host_elem.find('uptime')
+    if uptime is not None:
+        host['uptime'] = {'seconds': uptime.get('seconds', ''), 'lastboot': uptime.get('lastboot', '')}
+
+    for port in host_elem.findall('ports/port'):
+        proto = port.get('protocol')
+        state = port.find('state')
+        service = port.find('service')
+        port_data = {
+            'state': state.get('state', '') if state is not None else '',
+            'reason': state.get('reason', '') if state is not None else '',
+            'name': '', 'product': '', 'version': '', 'extrainfo': '', 'conf': '', 'cpe': '',
+        }
+        if service is not None:
+            for key in ('name', 'product', 'version', 'extrainfo', 'conf'):
+                port_data[key] = service.get(key, '')
+            cpe = service.find('cpe')
+            if cpe is not None:
+                port_data['cpe'] = cpe.text or ''
+        scripts = {script.get('id'): script.get('output', '') for script in port.findall('script')}
+        if scripts:
+            port_data['script'] = scripts
+        host.setdefault(proto, {})[int(port.get('portid'))] = port_data
+
+    hostscripts = [
+        {'id': script.get('id', ''), 'output': script.get('output', '')}
+        for script in host_elem.findall('hostscript/script')
+    ]
+    if hostscripts:
+        host['hostscript'] = hostscripts
+
+    osmatches = []
+    for match in host_elem.findall('os/osmatch'):
+        osmatches.append({
+            'name': match.get('name', ''),
+            'accuracy': match.get('accuracy', '0'),
+            'line': match.get('line', ''),
+            'osclass': [
+                {
+                    'type': osclass.get('type', ''),
+                    'vendor': osclass.get('vendor', ''),
+                    'osfamily': osclass.get('osfamily', ''),
+                    'osgen': osclass.get('osgen', ''),
+                    'accuracy': osclass.get('accuracy', ''),
+                    'cpe': [cpe.text for cpe in osclass.findall('cpe')],
+                }
+                for osclass in match.findall('osclass')
+            ],
+        })
+    if osmatches:
+        host['osmatch'] = osmatches
+
+    distance = host_elem.find('distance')
+    if distance is not None:
+        host['distance'] = {'value': int(distance.get('value', 0))}
+
+    tcpsequence = host_elem.find('tcpsequence')
+    if tcpsequence is not None:
+        host['tcpsequence'] = dict(tcpsequence.attrib)
+
+    # traceroute 결과 (-A 또는 --traceroute)
+    trace = host_elem.find('trace')
+    if trace is not None:
+        host['trace'] = {
+            'port': trace.get('port', ''),
+            'proto': trace.get('proto', ''),
+            'hops': [dict(hop.attrib) for hop in trace.findall('hop')],
+        }
+
+    return host
+
+# 현재 스레드가 처리 중인 스캔 작업과 대상 블록 (진행률 보고에 사용)
+_scan_context = threading.local()
+_progress_lock = threading.Lock()
+
+def _check_cancelled():
+    """
+    현재 스레드의 스캔 작업이 취소되었으면 ScanCancelledError를 발생시킵니다.
+    """
+    task = getattr(_scan_context, 'task', None)
+    control = _get_task_control(task['id']) if task else None
+    if control and control['cancel'].is_set():
+        raise ScanCancelledError(f"스캔이 취소되었습니다: {task['id']}")
+
+def _wait_cancellable(seconds: float):
+    """
+    seconds초 동안 기다립니다. 그 사이 현재 스레드의 스캔 작업이 취소되면 바로 ScanCancelledError를 발생시킵니다.
+    """
+    task = getattr(_scan_context, 'task', None)
+    control = _get_task_control(task['id']) if task else None
+    if control is None:
+        time.sleep(seconds)
+    elif control['cancel'].wait(seconds):
+        raise ScanCancelledError(f"스캔이 취소되었습니다: {task['id']}")
+
+def count_target_addresses(target: str) -> int:
+    """
+    공백으로 구분된 대상에 포함된 주소 수를 계산합니다. (도메인은 1개로 계산)
+    """
+    total = 0
+    for item in target.split():
+        if CIDR_REGEX.match(item):
+            total += ipaddress.IPv4Network(item, strict=False).num_addresses
+        else:
+            total += 1
+    return total
+
+def _report_progress(percent: float, remaining: Optional[float] = None, phase: Optional[str] = None,
+                     block: Optional[str] = None, task: Optional[Dict] = None):
+    """
+    현재 스레드의 스캔 작업에 대상 블록의 진행률을 기록하고 전체 진행률과 남은 시간을 계산합니다.
+    여러 블록(샤드)으로 나뉜 작업은 블록별 진행률의 평균을 전체 진행률로 사용합니다.
+    """
+    task = task or getattr(_scan_context, 'task', None)
+    block = block or getattr(_scan_context, 'block', None)
+    if task is None or block is None:
+        return
+
+    now = time.time()
+    with _progress_lock:
+        blocks = task.setdefault('block_progress', {})
+        blocks[block] = min(100.0, max(0.0, percent))
+        total_blocks = task.get('shards_total') or 1
+        overall = min(100.0, sum(blocks.values()) / total_blocks)
+        elapsed = now - task.get('started_at', now)
+        # 단일 블록은 nmap이 계산한 남은 시간을, 여러 블록은 경과 시간으로 추정한 값을 사용
+        if total_blocks == 1 and remaining is not None:
+            estimate = remaining
+        elif overall > 0:
+            estimate = elapsed * (100.0 - overall) / overall
+        else:
+            estimate = None
+        task['progress'] = {
+            'percent': round(overall, 2),
+            'phase': phase or task.get('progress', {}).get('phase'),
+            'remaining': round(estimate, 1) if estimate is not None else None,
+            'eta': now + estimate if estimate is not None else None,
+            'hosts_done': len(task.get('partial_hosts', [])),
+            'hosts_total': task.get('hosts_total'),
+            'updated_at': now,
+        }
+        if 'shards_total' in task:
+            task['progress']['shards_done'] = task['shards_done']
+            task['progress']['shards_total'] = task['shards_total']
+        # 이벤트는 1초에 한 번 정도만 발행
+        if now - task.get('progress_published_at', 0) < 1 and overall < 100:
+            return
+        task['progress_published_at'] = now
+        progress = dict(task['progress'])
+    scan_event_bus.publish(task['id'], 'progress', progress)
+
+def recommended_poll_interval(status: str, progress: Optional[Dict] = None) -> int:
+    """
+    상태와 남은 시간에 따라 클라이언트에 권장할 폴링 간격(밀리초)을 계산합니다.
+    """
+    if status == ScanStatus.QUEUED:
+        return 5000  # 대기 중: 5초
+    if status == ScanStatus.RUNNING:
+        remaining = (progress or {}).get('remaining')
+        if remaining is None:
+            return 2000  # 진행률을 아직 모름: 2초
+        # 남은 시간의 1/10 간격으로, 1초~10초 사이
+        return int(min(10000, max(1000, remaining * 100)))
+    return 30000  # 최종 상태: 30초
+
+def parse_nmap_xml_stream(stream, on_host=None) -> Dict:
+    """
+    nmap XML 출력(바이트 줄 단위 iterable)을 읽으면서 <host> 요소가 끝날 때마다 파싱합니다.
+    <taskprogress>는 현재 작업의 진행률로 보고하고, 처리가 끝난 최상위 요소(host, taskprogress, runstats 등)는 바로 버립니다.
+    
+    Returns:
+        process_scan_result()와 같은 형식의 결과
+    """
+    result = {'scan_info': {}, 'hosts': []}
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    depth = 0  # 현재 열려 있는 요소 깊이 (루트 = 1)
+    for line in stream:
+        parser.feed(line)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if elem.tag == 'scaninfo':
+                result['scan_info'][elem.get('protocol')] = {
+                    'method': elem.get('type', ''),
+                    'services': elem.get('services', ''),
+                }
+            elif elem.tag == 'taskprogress':
+                try:
+                    _report_progress(
+                        float(elem.get('percent', 0)),
+                        remaining=float(elem.get('remaining')) if elem.get('remaining') else None,
+                        phase=elem.get('task')
+                    )
+                except ValueError:
+                    pass
+            elif elem.tag == 'host':
+                _record_host_timing(elem)
+                parsed = parse_nmap_data(parse_host_element(elem))
+                result['hosts'].append(parsed)
+                if on_host:
+                    on_host(parsed)
+            # 끝난 최상위 요소는 메모리에서 제거 (루트에는 처리 중인 요소만 남으므로 제거 비용은 호스트 수와 무관)
+            if depth == 1:
+                try:
+                    root.remove(elem)
+                except ValueError:
+                    pass
+    parser.close()
     return result
 
-def quick_scan(target: str) -> Dict:
+def run_nmap_streaming(target: str, args: str, on_host=None) -> Dict:
+    """
+    nmap을 XML 표준 출력 모드(-oX -)로 실행하고, <host> 요소가 출력될 때마다 파싱합니다.
+    파싱된 호스트는 parse_nmap_data()와 같은 형식으로 on_host 콜백에 전달되며,
+    최종적으로 process_scan_result()와 같은 형식의 결과를 반환합니다.
+    """
+    nmap_path = get_scanner_capabilities()['nmap_path']
+    if not nmap_path:
+        raise RuntimeError("nmap 실행 파일을 찾을 수 없습니다")
+
+    cmd = [nmap_path, '-oX', '-'] + shlex.split(args)
+    # 주기적으로 <taskprogress> 진행률 정보를 출력하도록 설정
+    if '--stats-every' not in args:
+        cmd += ['--stats-every', SCAN_STATS_INTERVAL]
+    cmd += target.split()
+    logger.info(f"nmap 스트리밍 실행: {' '.join(cmd)}")
+    _check_cancelled()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # 취소 시 종료할 수 있도록 작업에 프로세스 등록.
+    # 실행 직전 확인과 등록 사이에 취소된 경우 cancel_scan()이 이 프로세스를 보지 못하므로 등록 후 다시 확인
+    task = getattr(_scan_context, 'task', None)
+    control = _get_task_control(task['id']) if task else None
+    if control:
+        with _task_controls_lock:
+            control['processes'].add(process)
+            cancelled = control['cancel'].is_set()
+        if cancelled:
+            process.terminate()
+
+    # stderr 버퍼가 가득 차서 nmap이 멈추지 않도록 별도 스레드에서 비움
+    stderr_lines = []
+    stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(process.stderr))
+    stderr_thread.daemon = True
+    stderr_thread.start()
+
+    try:
+        result = parse_nmap_xml_stream(process.stdout, on_host)
+    except ET.ParseError:
+        # 취소로 nmap이 종료되어 XML이 중간에 끊긴 경우
+        _check_cancelled()
+        raise
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        stderr_thread.join(timeout=5)
+        if control:
+            with _task_controls_lock:
+                control['processes'].discard(process)
+
+    _check_cancelled()
+    if returncode != 0:
+        stderr = b''.join(stderr_lines).decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"nmap 실행 실패 (코드 {returncode}): {stderr}")
+
+    # 타이밍 프로필은 nmap이 정상 종료한 실행의 관측값으로만 갱신
+    if task is not None:
+        with _progress_lock:
+            task['nmap_runs'] = task.get('nmap_runs', 0) + 1
+    return result
+
+def _run_nmap(target: str, args: str, on_host=None) -> Dict:
+    """
+    설정에 따라 스트리밍 파서 또는 python-nmap으로 nmap을 실행합니다.
+    동시에 실행되는 nmap 프로세스 수는 SCAN_MAX_NMAP_PROCESSES로 제한됩니다.
+    """
+    with _nmap_slots:
+        if SCAN_STREAM_RESULTS:
+            return run_nmap_streaming(target, args, on_host)
+
+        # python-nmap은 프로세스를 노출하지 않아 취소해도 nmap을 종료할 수 없음. 끝난 뒤 취소 여부만 반영
+        nm = nmap.PortScanner()
+        nm.scan(hosts=target, arguments=args)
+        _check_cancelled()
+        result = process_scan_result(nm, target)
+    if on_host:
+        for host in result['hosts']:
+            on_host(host)
+    return result
+
+def _expand_targets(target: str) -> List[str]:
+    """
+    공백으로 구분된 대상(IP, CIDR, 도메인)을 개별 주소 목록으로 펼칩니다.
+    """
+    addresses = []
+    for item in target.split():
+        if CIDR_REGEX.match(item):
+            network = ipaddress.IPv4Network(item, strict=False)
+            hosts = list(network.hosts())
+            addresses.extend(str(ip) for ip in (hosts or [network.network_address]))
+        else:
+            addresses.append(item)
+    return addresses
+
+def _service_name(port: int) -> str:
+    try:
+        return socket.getservbyport(port, 'tcp')
+    except OSError:
+        return ''
+
+async def _probe_port(address: str, port: int, semaphore: asyncio.Semaphore, timeout: float) -> str:
+    """
+    TCP 연결을 시도하여 포트 상태(open/closed/filtered)를 반환합니다.
+    """
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except ConnectionRefusedError:
+            return 'closed'
+        except (asyncio.TimeoutError, OSError):
+            return 'filtered'
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return 'open'
+
+async def _scan_host_async(target: str, ports: List[int], semaphore: asyncio.Semaphore,
+                           timeout: float, on_host=None) -> Optional[Dict]:
+    """
+    한 호스트의 포트들을 동시에 확인하고 parse_nmap_data()와 같은 형식으로 반환합니다.
+    응답한 포트가 하나도 없으면 None을 반환합니다.
+    """
+    hostname = ''
+    address = target
+    if not IP_REGEX.match(target):
+        # 도메인은 먼저 IPv4 주소로 변환
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(target, None, family=socket.AF_INET)
+        except OSError:
+            return None
+        hostname, address = target, infos[0][4][0]
+
+    states = await asyncio.gather(*(_probe_port(address, port, semaphore, timeout) for port in ports))
+    # 연결이 거부된 포트도 호스트가 살아있다는 뜻이므로 호스트는 up으로 처리
+    if all(state == 'filtered' for state in states):
+        return None
+
+    host = HostRecord(
+        hostname=hostname,
+        state='up',
+        ip=address,
+        ports=[
+            PortRecord(port=port, protocol='tcp', state=state, service=_service_name(port))
+            for port, state in zip(ports, states) if state == 'open'
+        ],
+        lastScanTime=time.strftime('%Y-%m-%d %H:%M:%S')
+    )
+    if on_host:
+        on_host(host)
+    return host
+
+async def _native_connect_scan_async(targets: List[str], ports: List[int], concurrency: int,
+                                     timeout: float, on_host=None) -> List[Dict]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def scan_and_report(target: str) -> Optional[Dict]:
+        nonlocal done
+        _check_cancelled()
+        host = await _scan_host_async(target, ports, semaphore, timeout, on_host)
+        done += 1
+        _report_progress(100.0 * done / len(targets), phase='Native Connect Scan')
+        return host
+
+    task = getattr(_scan_context, 'task', None)
+    control = _get_task_control(task['id']) if task else None
+    scan = asyncio.ensure_future(asyncio.gather(*(scan_and_report(target) for target in targets)))
+    # 모든 코루틴이 한꺼번에 시작되므로 시작 시점의 확인만으로는 취소되지 않음.
+    # 취소 신호를 주기적으로 확인해 남은 연결 시도를 모두 취소 (발견된 호스트는 on_host로 이미 반영됨)
+    while control is not None and not scan.done():
+        await asyncio.wait([scan], timeout=0.2)
+        if control['cancel'].is_set() and not scan.done():
+            scan.cancel()
+            try:
+                await scan
+            except asyncio.CancelledError:
+                pass
+            raise ScanCancelledError(f"스캔이 취소되었습니다: {task['id']}")
+    hosts = await scan
+    return [host for host in hosts if host]
+
+def native_connect_scan(target: str, ports: str = COMMON_PORTS, on_host=None,
+                        concurrency: int = None, timeout: float = None) -> Dict:
+    """
+    nmap 없이 asyncio로 TCP 연결 스캔을 수행합니다.
+    동시 연결 수는 세마포어(concurrency)로 제한되며, 결과는 process_scan_result()와 같은 형식입니다.
+    """
+    port_list = [int(port) for port in str(ports).split(',') if port.strip()]
+    targets = _expand_targets(target)
+    concurrency = concurrency or SCAN_NATIVE_CONCURRENCY
+    timeout = timeout or SCAN_NATIVE_TIMEOUT
+    logger.info(f"asyncio 연결 스캔 시작: {target} ({len(targets)}개 호스트 x {len(port_list)}개 포트, 동시 {concurrency})")
+
+    hosts = asyncio.run(_native_connect_scan_async(targets, port_list, concurrency, timeout, on_host))
+    logger.info(f"asyncio 연결 스캔 완료: {target} - {len(hosts)}개 호스트 응답")
+    return {
+        'scan_info': {'tcp': {'method': 'connect', 'services': ','.join(str(port) for port in port_list)}},
+        'hosts': hosts
+    }
+
+# 대상별 타이밍 프로필 (MongoDB scan_timing 컬렉션의 메모리 캐시)
+_timing_profiles = {}
+_timing_lock = threading.Lock()
+TIMING_CACHE_MAX_ENTRIES = 4096
+# 사용자가 직접 지정하면 적응형 타이밍을 적용하지 않는 nmap 타이밍 옵션
+TIMING_FLAGS = ('-T', '--min-rate', '--max-rate', '--max-retries', '--host-timeout',
+                '--min-rtt-timeout', '--max-rtt-timeout', '--initial-rtt-timeout', '--scan-delay')
+
+def uses_adaptive_timing(scan_mode: str, options: Dict) -> bool:
+    """
+    적응형 타이밍을 적용할 스캔인지 확인합니다. (nmap을 사용하는 quick/full/custom 모드)
+    """
+    if scan_mode == ScanMode.QUICK:
+        return (options.get('engine') or SCAN_QUICK_ENGINE) != ScanEngine.NATIVE
+    return scan_mode in (ScanMode.FULL, ScanMode.CUSTOM)
+
+def timing_key(target: str) -> str:
+    """
+    타이밍 프로필을 공유할 단위를 반환합니다.
+    단일 IP와 /24보다 작은 대역은 해당 /24 서브넷, 더 큰 대역과 도메인은 대상 자체를 사용합니다.
+    """
+    items = target.split()
+    if len(items) == 1 and (IP_REGEX.match(items[0]) or CIDR_REGEX.match(items[0])):
+        network = ipaddress.IPv4Network(items[0], strict=False)
+        if network.prefixlen >= 24:
+            return str(network.supernet(new_prefix=24))
+        return str(network)
+    return normalize_target(target)
+
+def _record_host_timing(host_elem: ET.Element):
+    """
+    nmap XML <host>의 <times>(srtt/rttvar, 마이크로초), 호스트별 소요 시간, 타임아웃 여부를
+    현재 스캔 작업의 관측값에 누적합니다.
+    """
+    task = getattr(_scan_context, 'task', None)
+    if task is None:
+        return
+    times = host_elem.find('times')
+    try:
+        srtt = int(times.get('srtt', 0)) / 1000.0 if times is not None else 0.0
+        rttvar = int(times.get('rttvar', 0)) / 1000.0 if times is not None else 0.0
+        elapsed = int(host_elem.get('endtime', 0)) - int(host_elem.get('starttime', 0))
+    except ValueError:
+        return
+    with _progress_lock:
+        observed = task.setdefault('timing_observed', {
+            'hosts': 0, 'timed_out': 0, 'rtt_samples': 0, 'srtt_sum': 0.0, 'rttvar_sum': 0.0,
+            'srtt_max': 0.0, 'host_seconds_max': 0,
+        })
+        observed['hosts'] += 1
+        if host_elem.get('timedout') == 'true':
+            observed['timed_out'] += 1
+        if srtt > 0:
+            observed['rtt_samples'] += 1
+            observed['srtt_sum'] += srtt
+            observed['rttvar_sum'] += rttvar
+            observed['srtt_max'] = max(observed['srtt_max'], srtt)
+        observed['host_seconds_max'] = max(observed['host_seconds_max'], elapsed)
+
+def get_timing_profile(key: str) -> Optional[Dict]:
+    """
+    대상의 타이밍 프로필을 메모리 캐시 또는 MongoDB에서 읽습니다.
+    """
+    with _timing_lock:
+        if key in _timing_profiles:
+            return _timing_profiles[key]
+    profile = None
+    if _scan_db is not None:
+        try:
+            profile = _scan_db.scan_timing.find_one({'_id': key})
+        except Exception as e:
+            logger.error(f"타이밍 프로필 조회 실패 [{key}]: {str(e)}")
+            return None
+    with _timing_lock:
+        if len(_timing_profiles) >= TIMING_CACHE_MAX_ENTRIES:
+            _timing_profiles.clear()
+        _timing_profiles[key] = profile
+    return profile
+
+def update_timing_profile(key: str, task: Dict) -> Optional[Dict]:
+    """
+    끝난 스캔의 관측값으로 대상의 타이밍 프로필을 갱신합니다. (이전 값과 지수 이동 평균)
+    nmap이 한 번 이상 정상 종료한 작업에만 호출합니다. (task['nmap_runs'])
+    
+    Returns:
+        이번 스캔의 관측값 (관측된 호스트가 없으면 None)
+    """
+    observed = task.get('timing_observed')
+    if not observed or not observed['hosts']:
+        return None
+    sample = {
+        'srtt_ms': observed['srtt_sum'] / observed['rtt_samples'] if observed['rtt_samples'] else None,
+        'rttvar_ms': observed['rttvar_sum'] / observed['rtt_samples'] if observed['rtt_samples'] else None,
+        'srtt_max_ms': observed['srtt_max'] or None,
+        'timeout_rate': observed['timed_out'] / observed['hosts'],
+        'host_seconds_max': observed['host_seconds_max'],
+        'duration': (task.get('end_time') or time.time()) - task.get('started_at', task['start_time']),
+    }
+    previous = get_timing_profile(key) or {}
+    profile = {'_id': key, 'samples': previous.get('samples', 0) + 1, 'updated_at': time.time()}
+    for field, value in sample.items():
+        old = previous.get(field)
+        # 최근 관측값에 더 큰 가중치 (0.6)
+        if value is None or old is None:
+            profile[field] = old if value is None else value
+        else:
+            profile[field] = round(0.6 * value + 0.4 * old, 3)
+    with _timing_lock:
+        _timing_profiles[key] = profile
+    if _scan_db is not None:
+        try:
+            _scan_db.scan_timing.replace_one({'_id': key}, profile, upsert=True)
+        except Exception as e:
+            logger.error(f"타이밍 프로필 저장 실패 [{key}]: {str(e)}")
+    return sample
+
+def choose_timing(scan_mode: str, target: str, options: Dict) -> Dict:
+    """
+    대상의 타이밍 프로필로 nmap 타이밍 옵션(-T, --min-rate/--max-rate, --max-retries,
+    --max-rtt-timeout, --host-timeout)을 고르고, 각 선택의 이유를 함께 반환합니다.
+    
+    Returns:
+        {'key': 프로필 키, 'profile': 사용한 프로필, 'args': nmap 인자 또는 None(기본값 사용), 'reasons': [설명]}
+    """
+    key = timing_key(target)
+    decision = {'key': key, 'profile': None, 'args': None, 'reasons': []}
+    if not SCAN_ADAPTIVE_TIMING:
+        decision['reasons'].append('적응형 타이밍 비활성화 (SCAN_ADAPTIVE_TIMING=false): 모드 기본값 사용')
+        return decision
+    arguments = options.get('arguments') or ''
+    if any(flag in arguments for flag in TIMING_FLAGS):
+        decision['reasons'].append('사용자가 지정한 타이밍 옵션을 그대로 사용')
+        return decision
+    profile = get_timing_profile(key)
+    if not profile:
+        decision['reasons'].append(f'{key}에 대한 이전 관측값 없음: 모드 기본값 사용')
+        return decision
+    decision['profile'] = {k: v for k, v in profile.items() if k != '_id'}
+
+    srtt = profile.get('srtt_ms')
+    rttvar = profile.get('rttvar_ms') or 0
+    timeout_rate = profile.get('timeout_rate') or 0
+    args = []
+    reasons = decision['reasons']
+
+    # 타이밍 템플릿과 전송 속도
+    if srtt is None:
+        args.append('-T3')
+        reasons.append('RTT 관측값 없음 (응답한 호스트 없음): -T3')
+    elif srtt < 5 and timeout_rate == 0:
+        args += ['-T4', '--min-rate', '1000']
+        reasons.append(f'평균 RTT {srtt:.1f}ms (LAN 수준): -T4, 최소 전송 속도 1000pps')
+    elif srtt < 50 and timeout_rate < 0.05:
+        args += ['-T4', '--min-rate', '300']
+        reasons.append(f'평균 RTT {srtt:.1f}ms: -T4, 최소 전송 속도 300pps')
+    else:
+        args.append('-T3')
+        reasons.append(f'평균 RTT {srtt:.1f}ms, 타임아웃 비율 {timeout_rate:.0%} (느린 링크): -T3')
+        if timeout_rate >= 0.1:
+            args += ['--max-rate', '100']
+            reasons.append(f'호스트 타임아웃 비율 {timeout_rate:.0%}: 혼잡을 줄이기 위해 최대 전송 속도 100pps')
+
+    # 재전송 횟수와 RTT 제한 시간
+    if (srtt is not None and srtt >= 50) or timeout_rate >= 0.05:
+        args += ['--max-retries', '6']
+        reasons.append('느리거나 손실이 있는 링크: 재전송 최대 6회')
+    elif srtt is not None and srtt < 5:
+        args += ['--max-retries', '2']
+        reasons.append('빠른 링크: 재전송 최대 2회')
+    if srtt is not None:
+        max_rtt = int(min(10000, max(100, (srtt + 4 * rttvar) * 3)))
+        args += ['--max-rtt-timeout', f'{max_rtt}ms']
+        reasons.append(f'RTT 제한 시간 {max_rtt}ms (srtt + 4*rttvar의 3배)')
+
+    # 호스트 제한 시간: 이전에 가장 오래 걸린 호스트의 3배 (최소 60초)
+    host_seconds = profile.get('host_seconds_max') or 0
+    if host_seconds:
+        factor = 3 if scan_mode == ScanMode.QUICK else 4
+        host_timeout = int(max(60, host_seconds * factor))
+        args += ['--host-timeout', f'{host_timeout}s']
+        reasons.append(f'이전 최대 호스트 소요 시간 {host_seconds}초: 호스트 제한 시간 {host_timeout}초')
+
+    decision['args'] = ' '.join(args)
+    return decision
+
+def quick_scan(target: str, on_host=None, extra_args: str = '', engine: str = None, timing: str = None) -> Dict:
     """
     빠른 스캔: 대표적인 포트만 빠르게 스캔합니다.
+    engine이 native면 nmap 대신 asyncio 연결 스캔을 사용합니다. (기본값: SCAN_QUICK_ENGINE)
+    timing을 지정하면 기본 -T4 대신 사용합니다. (choose_timing() 참고)
     """
-    # nmap 설치 확인
+    if (engine or SCAN_QUICK_ENGINE) == ScanEngine.NATIVE:
+        return native_connect_scan(target, COMMON_PORTS, on_host=on_host)
+    
+    # nmap 설치 확인 (테스트 결과로 대체하면 가짜 결과가 완료/캐시되므로 실패 처리)
     if not check_nmap_installed():
-        logger.warning("nmap이 설치되어 있지 않아 테스트 모드로 대체합니다.")
-        return test_scan(target)
+        raise RuntimeError("nmap이 설치되어 있지 않습니다")
     
-    common_ports = "21,22,23,25,53,80,110,139,443,445,3306,3389,8080"
-    nm = nmap.PortScanner()
-    args = f'-sT -T4 -F --open -p {common_ports}'
+    args = f'{_scan_type_flag()} {timing or "-T4"} --open -p {COMMON_PORTS} {extra_args}'.strip()
     logger.info(f"빠른 스캔 시작: {target} {args}")
     
     try:
-        nm.scan(hosts=target, arguments=args)
-        result = process_scan_result(nm, target)
+        result = _run_nmap(target, args, on_host)
         logger.info(f"빠른 스캔 완료: {target}")
         return result
+    except ScanCancelledError:
+        raise
     except Exception as e:
         logger.error(f"빠른 스캔 실패: {target} - {str(e)}")
-        # 스캔 실패 시 테스트 모드로 대체
-        logger.info(f"오류로 인해 테스트 모드로 대체합니다.")
-        return test_scan(target)
+        raise
 
-def full_scan(target: str) -> Dict:
+def full_scan(target: str, on_host=None, extra_args: str = '', timing: str = None) -> Dict:
     """
     전체 스캔: 모든 포트와 OS 정보를 자세하게 스캔합니다. (시간 소요)
+    timing을 지정하면 nmap 기본 타이밍 대신 사용합니다.
     """
-    # nmap 설치 확인
+    # nmap 설치 확인 (테스트 결과로 대체하면 가짜 결과가 완료/캐시되므로 실패 처리)
     if not check_nmap_installed():
-        logger.warning("nmap이 설치되어 있지 않아 테스트 모드로 대체합니다.")
-        return test_scan(target)
+        raise RuntimeError("nmap이 설치되어 있지 않습니다")
     
-    nm = nmap.PortScanner()
     # -O: OS 감지, -A: OS 감지 + 스크립트 + 트레이스라우트 등
     # --version-all: 모든 서비스 버전 정보 수집
-    args = '-sT -sV -O -A --osscan-guess --version-all'
+    args = f'{_scan_type_flag()} -sV -O -A --osscan-guess --version-all {timing or ""} {extra_args}'
+    args = ' '.join(args.split())
     logger.info(f"전체 스캔 시작: {target} {args}")
     
     try:
-        nm.scan(hosts=target, arguments=args)
-        result = process_scan_result(nm, target)
+        result = _run_nmap(target, args, on_host)
         logger.info(f"전체 스캔 완료: {target}")
         return result
+    except ScanCancelledError:
+        raise
     except Exception as e:
         logger.error(f"전체 스캔 실패: {target} - {str(e)}")
-        # 스캔 실패 시 테스트 모드로 대체
-        logger.info(f"오류로 인해 테스트 모드로 대체합니다.")
-        return test_scan(target)
+        raise
 
-def custom_scan(target: str, ports: str = None, arguments: str = None) -> Dict:
+def custom_scan(target: str, ports: str = None, arguments: str = None, on_host=None, extra_args: str = '',
+                timing: str = None) -> Dict:
     """
     사용자 정의 스캔: 사용자가 지정한 포트와 옵션으로 스캔합니다.
+    timing은 사용자가 타이밍 옵션을 직접 지정하지 않은 경우에만 전달됩니다.
     """
-    # nmap 설치 확인
+    # nmap 설치 확인 (테스트 결과로 대체하면 가짜 결과가 완료/캐시되므로 실패 처리)
     if not check_nmap_installed():
-        logger.warning("nmap이 설치되어 있지 않아 테스트 모드로 대체합니다.")
-        return test_scan(target)
+        raise RuntimeError("nmap이 설치되어 있지 않습니다")
     
     if not ports and not arguments:
         raise ValueError("포트 범위나 스캔 인자 중 최소한 하나는 지정해야 합니다")
         
-    nm = nmap.PortScanner()
-    args = arguments if arguments else f'-sT -p {ports}'
+    args = arguments if arguments else f'{_scan_type_flag()} -p {ports}'
+    args = ' '.join(f'{args} {timing or ""} {extra_args}'.split())
     logger.info(f"사용자 정의 스캔 시작: {target} {args}")
     
     try:
-        nm.scan(hosts=target, arguments=args)
-        result = process_scan_result(nm, target)
+        result = _run_nmap(target, args, on_host)
         logger.info(f"사용자 정의 스캔 완료: {target}")
         return result
+    except ScanCancelledError:
+        raise
     except Exception as e:
         logger.error(f"사용자 정의 스캔 실패: {target} - {str(e)}")
-        # 스캔 실패 시 테스트 모드로 대체
-        logger.info(f"오류로 인해 테스트 모드로 대체합니다.")
-        return test_scan(target)
+        raise
+
+def _open_ports(host: Dict) -> Dict[Tuple[int, str], Dict]:
+    """
+    호스트의 열린 포트를 (포트, 프로토콜) -> 포트 정보 형태로 반환합니다.
+    """
+    return {
+        (port['port'], port['protocol']): port
+        for port in host.get('ports', [])
+        if port.get('state') == 'open'
+    }
+
+def diff_scan(target: str, baseline: Optional[Dict] = None, on_host=None) -> Dict:
+    """
+    증분 스캔: 이전 스캔 결과(baseline)와 비교하여 변경된 호스트만 정밀 스캔합니다.
+    1) 이전에 알려진 포트와 대표 포트로 가벼운 연결 스캔을 수행하고
+    2) 포트 상태가 바뀌었거나 새로 나타난 호스트에 대해서만 -sV/-O 스캔을 수행한 뒤
+    3) 이전 결과와 병합한 현재 상태와 변경 내역(diff)을 함께 반환합니다.
+    이전 결과가 없으면 전체 스캔을 수행합니다.
+    """
+    if not baseline or not baseline.get('hosts'):
+        logger.info(f"비교할 이전 결과가 없어 전체 스캔을 수행합니다: {target}")
+        result = full_scan(target, on_host=on_host)
+        result['diff'] = {
+            'baseline_scan_id': None,
+            'hosts_new': [host['ip'] for host in result['hosts']],
+            'hosts_down': [],
+            'opened': [], 'closed': [], 'version_changed': [],
+            'probed_hosts': len(result['hosts']),
+            'unchanged_hosts': 0,
+        }
+        return result
+
+    # 테스트 결과로 대체하면 diff 없이 완료되고 이후 증분 스캔의 기준이 되므로 실패 처리
+    if not check_nmap_installed():
+        raise RuntimeError("nmap이 설치되어 있지 않습니다")
+
+    previous = {host['ip']: host for host in baseline['hosts'] if host.get('ip')}
+    known_ports = {port for host in previous.values() for (port, proto) in _open_ports(host) if proto == 'tcp'}
+    known_ports.update(int(port) for port in COMMON_PORTS.split(','))
+    port_list = ','.join(str(port) for port in sorted(known_ports))
+
+    # 1단계: 가벼운 연결 스캔으로 현재 열린 포트 확인
+    logger.info(f"증분 스캔 1단계 (열린 포트 확인): {target}")
+    check = _run_nmap(target, f'{_scan_type_flag()} -T4 --open -p {port_list}')
+    current = {host['ip']: host for host in check['hosts'] if host.get('ip')}
+
+    diff = {
+        'baseline_scan_id': baseline.get('scan_id'),
+        'hosts_new': [],
+        'hosts_down': sorted(ip for ip in previous if ip not in current),
+        'opened': [], 'closed': [], 'version_changed': [],
+    }
+
+    changed_hosts = []
+    for ip, host in current.items():
+        now_open = _open_ports(host)
+        if ip not in previous:
+            diff['hosts_new'].append(ip)
+            changed_hosts.append(ip)
+            continue
+        before_open = _open_ports(previous[ip])
+        opened = [key for key in now_open if key not in before_open]
+        closed = [key for key in before_open if key not in now_open]
+        for port, proto in opened:
+            diff['opened'].append({'ip': ip, 'port': port, 'protocol': proto,
+                                   'service': now_open[(port, proto)].get('service', '')})
+        for port, proto in closed:
+            diff['closed'].append({'ip': ip, 'port': port, 'protocol': proto,
+                                   'service': before_open[(port, proto)].get('service', '')})
+        if opened or closed:
+            changed_hosts.append(ip)
+
+    # 2단계: 변경된 호스트의 열린 포트만 정밀 스캔
+    probed = {}
+    probe_ports = sorted({port for ip in changed_hosts for (port, proto) in _open_ports(current[ip]) if proto == 'tcp'})
+    if changed_hosts and probe_ports:
+        logger.info(f"증분 스캔 2단계 (정밀 스캔): {len(changed_hosts)}개 호스트, {len(probe_ports)}개 포트")
+        detail = _run_nmap(
+            ' '.join(changed_hosts),
+            f"{_scan_type_flag()} -sV -O --osscan-guess -Pn -p {','.join(str(port) for port in probe_ports)}"
+        )
+        probed = {host['ip']: host for host in detail['hosts'] if host.get('ip')}
+
+    # 3단계: 이전 결과와 병합
+    hosts = []
+    for ip, host in current.items():
+        now_open = _open_ports(host)
+        base = probed.get(ip) or previous.get(ip) or host
+        # 이전 결과는 저장소에서 읽은 딕셔너리일 수 있으므로 다른 스캔과 같은 HostRecord 형식으로 맞춤
+        merged = HostRecord(**{key: base.get(key) for key in HostRecord.__slots__})
+        merged['state'] = host.get('state', 'up')
+        merged['lastScanTime'] = host.get('lastScanTime')
+        detail_ports = _open_ports(probed[ip]) if ip in probed else {}
+        before_ports = _open_ports(previous[ip]) if ip in previous else {}
+        merged_ports = []
+        for key, port in now_open.items():
+            info = detail_ports.get(key) or before_ports.get(key) or port
+            merged_ports.append(info)
+            before = before_ports.get(key)
+            if key in detail_ports and before and \
+                    (before.get('product'), before.get('version')) != (info.get('product'), info.get('version')):
+                diff['version_changed'].append({
+                    'ip': ip, 'port': key[0], 'protocol': key[1],
+                    'before': {'product': before.get('product', ''), 'version': before.get('version', '')},
+                    'after': {'product': info.get('product', ''), 'version': info.get('version', '')},
+                })
+        merged['ports'] = sorted(merged_ports, key=lambda p: (p['protocol'], p['port']))
+        hosts.append(merged)
+        if on_host:
+            on_host(merged)
+
+    diff['probed_hosts'] = len(probed)
+    diff['unchanged_hosts'] = len(current) - len(changed_hosts)
+    logger.info(f"증분 스캔 완료: {target} - 신규 {len(diff['hosts_new'])}, 다운 {len(diff['hosts_down'])}, "
+                f"열림 {len(diff['opened'])}, 닫힘 {len(diff['closed'])}, 버전 변경 {len(diff['version_changed'])}")
+    return {'scan_info': check.get('scan_info', {}), 'hosts': hosts, 'diff': diff}
 
 def test_scan(target: str) -> Dict:
     """
     테스트 스캔: 실제 nmap 스캔 없이 테스트용 결과를 반환합니다.
     """
     logger.info(f"테스트 스캔 시작: {target}")
-    # 2초 대기하여 실제 스캔 흉내내기
-    time.sleep(2)
+    # 2초 대기하여 실제 스캔 흉내내기 (워커 스레드에서 실행되며 취소하면 바로 중단)
+    _wait_cancellable(2)
     result = generate_test_data(target)
     logger.info(f"테스트 스캔 완료: {target}")
     return result
 
-def process_scan_result(nm: nmap.PortScanner, target: str) -> Dict:
+def simulated_scan(target: str, options: Dict, on_host=None) -> Dict:
+    """
+    시뮬레이션 스캔: 지정한 크기의 가상 결과를 지연 시간 프로필에 따라 호스트 단위로 내보냅니다.
+    프로필의 실패율에 따라 도중에 SimulatedScanError로 실패하며, 대기 중에 취소하면 바로 중단합니다.
+    """
+    startup, total, fail_at, hosts = plan_simulated_scan(target, options)
+    logger.debug(f"시뮬레이션 스캔 시작: {target} - 호스트 {total}개, 프로필 {options.get('profile')}")
+    _wait_cancellable(startup)
+    result = {'scan_info': {'tcp': {'method': 'simulated'}}, 'hosts': []}
+    # 진행률 이벤트는 nmap의 --stats-every처럼 약 5% 단위로만 보고
+    report_every = max(1, total // 20)
+    for index, (delay, host) in enumerate(hosts):
+        if index == fail_at:
+            raise SimulatedScanError(f"시뮬레이션된 스캔 실패 ({index}/{total}개 호스트 완료 후)")
+        _wait_cancellable(delay)
+        result['hosts'].append(host)
+        if on_host:
+            on_host(host)
+        if (index + 1) % report_every == 0:
+            _report_progress(100.0 * (index + 1) / total)
+    if fail_at == total:
+        raise SimulatedScanError(f"시뮬레이션된 스캔 실패 ({total}/{total}개 호스트 완료 후)")
+    return result
+
+def process_scan_result(nm: 'nmap.PortScanner', target: str) -> Dict:
     """
     스캔 결과를 처리하고 필요한 형식으로 반환합니다.
     """
@@ -323,69 +2042,526 @@ def process_scan_result(nm: nmap.PortScanner, target: str) -> Dict:
     
     return result
 
-def start_scan_task(scan_id: str, scan_mode: str, target: str, **kwargs) -> Dict:
+def shard_target(target: str, prefix: int = SCAN_SHARD_PREFIX) -> List[str]:
     """
-    비동기적으로 스캔 작업을 시작하고, 작업 ID를 반환합니다.
+    CIDR 대상을 prefix 크기의 하위 네트워크 목록으로 나눕니다.
+    CIDR이 아니거나 이미 prefix보다 작은 네트워크면 대상을 그대로 반환합니다.
+    """
+    if not CIDR_REGEX.match(target):
+        return [target]
+    network = ipaddress.IPv4Network(target, strict=False)
+    if network.prefixlen >= prefix:
+        return [target]
+    return [str(subnet) for subnet in network.subnets(new_prefix=prefix)]
+
+def merge_scan_results(results: List[Dict]) -> Dict:
+    """
+    하위 스캔 결과들을 하나의 결과로 병합합니다.
+    hosts는 순서대로 이어 붙이고, scan_info는 프로토콜별로 처음 나온 값을 사용합니다.
+    """
+    merged = {'scan_info': {}, 'hosts': []}
+    for result in results:
+        for proto, info in (result.get('scan_info') or {}).items():
+            merged['scan_info'].setdefault(proto, info)
+        merged['hosts'].extend(result.get('hosts', []))
+    return merged
+
+def discover_hosts(target: str, use_cache: bool = True) -> List[str]:
+    """
+    ping/TCP-ACK 탐색으로 대상 네트워크에서 살아있는 호스트의 IP 목록을 반환합니다.
+    결과는 서브넷별로 SCAN_DISCOVERY_TTL 동안 캐시됩니다.
+    """
+    key = str(ipaddress.IPv4Network(target, strict=False)) if CIDR_REGEX.match(target) else target
+    now = time.time()
+    if use_cache:
+        with _discovery_lock:
+            cached = _discovery_cache.get(key)
+        if cached and now - cached[0] < SCAN_DISCOVERY_TTL:
+            logger.info(f"호스트 탐색 캐시 사용: {key} ({len(cached[1])}개 호스트)")
+            return list(cached[1])
+
+    logger.info(f"호스트 탐색 시작: {key} {SCAN_DISCOVERY_ARGS}")
+    result = _run_nmap(key, SCAN_DISCOVERY_ARGS)
+    live_hosts = [host['ip'] for host in result['hosts'] if host.get('state') == 'up' and host.get('ip')]
+    with _discovery_lock:
+        _discovery_cache[key] = (now, live_hosts)
+        # 만료된 항목 정리
+        for expired in [k for k, v in _discovery_cache.items() if now - v[0] >= SCAN_DISCOVERY_TTL]:
+            del _discovery_cache[expired]
+    logger.info(f"호스트 탐색 완료: {key} - {len(live_hosts)}개 호스트 응답")
+    return live_hosts
+
+def _should_discover(scan_mode: str, target: str, options: Dict) -> bool:
+    """
+    빠른/전체 스캔의 CIDR 대상에 대해서만 호스트 탐색 단계를 사용합니다.
+    """
+    if scan_mode not in (ScanMode.QUICK, ScanMode.FULL) or not CIDR_REGEX.match(target):
+        return False
+    return options.get('discovery', SCAN_DISCOVERY_ENABLED) and check_nmap_installed()
+
+def _run_scan_mode(scan_mode: str, target: str, options: Dict, on_host=None, extra_args: str = '') -> Dict:
+    """
+    스캔 모드에 맞는 스캔 함수를 실행합니다.
+    """
+    timing = options.get('timing')
+    if scan_mode == ScanMode.QUICK:
+        return quick_scan(target, on_host=on_host, extra_args=extra_args, engine=options.get('engine'), timing=timing)
+    elif scan_mode == ScanMode.FULL:
+        return full_scan(target, on_host=on_host, extra_args=extra_args, timing=timing)
+    elif scan_mode == ScanMode.CUSTOM:
+        return custom_scan(target, options.get('ports'), options.get('arguments'), on_host=on_host,
+                           extra_args=extra_args, timing=timing)
+    elif scan_mode == ScanMode.DIFF:
+        return diff_scan(target, options.get('baseline'), on_host=on_host)
+    elif scan_mode == ScanMode.TEST:
+        return test_scan(target)
+    elif scan_mode == ScanMode.SIMULATED:
+        return simulated_scan(target, options.get('simulation') or {}, on_host=on_host)
+    raise ValueError(f"잘못된 스캔 모드: {scan_mode}")
+
+def _scan_block(task: Dict, target: str, options: Dict, on_host=None) -> Dict:
+    """
+    대상 블록 하나를 스캔합니다. 호스트 탐색이 활성화되어 있으면
+    살아있는 호스트만 포트 스캔 단계로 넘깁니다.
+    """
+    _scan_context.task = task
+    _scan_context.block = target
+    try:
+        _check_cancelled()
+        result = _scan_block_phases(task, target, options, on_host)
+        if 'shards_total' in task:
+            with _progress_lock:
+                task['shards_done'] += 1
+        _report_progress(100.0)
+        return result
+    finally:
+        _scan_context.task = None
+        _scan_context.block = None
+
+def _scan_block_phases(task: Dict, target: str, options: Dict, on_host=None) -> Dict:
+    if not _should_discover(task['mode'], target, options):
+        return _run_scan_mode(task['mode'], target, options, on_host)
+
+    live_hosts = discover_hosts(target)
+    with _discovery_lock:
+        discovery = task.setdefault('discovery', {'blocks': 0, 'live_hosts': 0})
+        discovery['blocks'] += 1
+        discovery['live_hosts'] += len(live_hosts)
+    if not live_hosts:
+        return {'scan_info': {}, 'hosts': []}
+    # 탐색 단계에서 이미 확인했으므로 포트 스캔에서는 호스트 탐색 생략 (-Pn)
+    return _run_scan_mode(task['mode'], ' '.join(live_hosts), options, on_host, extra_args='-Pn')
+
+def _run_sharded_scan(task: Dict, options: Dict, on_host=None) -> Dict:
+    """
+    대상이 큰 CIDR이면 하위 블록으로 나누어 병렬로 스캔하고 결과를 병합합니다.
+    """
+    scan_mode = task['mode']
+    # 테스트/시뮬레이션/증분 스캔은 나누지 않음 (증분 스캔은 이전 결과 전체와 비교해야 함)
+    if scan_mode in (ScanMode.TEST, ScanMode.SIMULATED, ScanMode.DIFF):
+        shards = [task['target']]
+    else:
+        shards = shard_target(task['target'])
+    if len(shards) == 1:
+        return _scan_block(task, task['target'], options, on_host)
+
+    task['shards_total'] = len(shards)
+    task['shards_done'] = 0
+    logger.info(f"샤드 스캔 시작 [ID: {task['id']}]: {task['target']} -> {len(shards)}개 블록")
+
+    def run_shard(shard: str) -> Dict:
+        return _scan_block(task, shard, options, on_host)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SCAN_SHARD_PARALLELISM, len(shards)))) as executor:
+        results = list(executor.map(run_shard, shards))
+    return merge_scan_results(results)
+
+def normalize_target(target: str) -> str:
+    """
+    캐시 키 비교를 위해 대상을 정규화합니다. (CIDR은 네트워크 주소 기준, 도메인은 소문자)
+    """
+    target = target.strip()
+    if CIDR_REGEX.match(target):
+        return str(ipaddress.IPv4Network(target, strict=False))
+    if IP_REGEX.match(target):
+        return str(ipaddress.IPv4Address(target))
+    return target.lower()
+
+def make_scan_cache_key(scan_mode: str, target: str, options: Dict) -> Tuple:
+    """
+    스캔 결과 캐시와 중복 실행 방지에 사용할 키를 만듭니다.
+    결과가 달라지는 옵션(포트, 인자, 빠른 스캔 엔진, 호스트 탐색 여부)을 모두 포함합니다.
+    """
+    engine = (options.get('engine') or SCAN_QUICK_ENGINE) if scan_mode == ScanMode.QUICK else ''
+    return (
+        normalize_target(target),
+        scan_mode,
+        str(options.get('ports') or ''),
+        ' '.join(str(options.get('arguments') or '').split()),
+        engine,
+        bool(options.get('discovery', SCAN_DISCOVERY_ENABLED)),
+    )
+
+def find_baseline_result(target: str) -> Optional[Dict]:
+    """
+    메모리에 남아 있는 작업 중 대상이 같은 가장 최근의 완료된 스캔 결과를 찾습니다.
+    증분 스캔의 비교 기준으로 사용하며, 결과에 scan_id를 함께 담아 반환합니다.
+    """
+    key = normalize_target(target)
+    latest = None
+    for task in list(scan_tasks.values()):
+        # 캐시된 결과와 테스트/시뮬레이션 결과는 비교 기준에서 제외
+        if task['status'] != ScanStatus.COMPLETED or not task.get('result') or task.get('cached'):
+            continue
+        if task['mode'] in SYNTHETIC_SCAN_MODES:
+            continue
+        if normalize_target(task['target']) != key:
+            continue
+        if latest is None or task.get('end_time', 0) > latest.get('end_time', 0):
+            latest = task
+    if latest is None:
+        return None
+    return dict(latest['result'], scan_id=latest['id'])
+
+def find_stored_baseline(target: str) -> Optional[Dict]:
+    """
+    MongoDB에 기록된 스캔 중 대상이 같은 가장 최근의 완료된 결과를 찾고, 없으면 메모리에서 찾습니다.
+    """
+    if _scan_db is not None:
+        try:
+            doc = _scan_db.scans.find_one(
+                {
+                    '$and': [
+                        {'$or': [{'target_key': normalize_target(target)}, {'target': target}]},
+                        {'$or': [{'result.hosts': {'$exists': True}}, {'result_summary.fields': 'hosts'}]}
+                    ],
+                    'status': ScanStatus.COMPLETED,
+                    'mode': {'$nin': list(SYNTHETIC_SCAN_MODES)}
+                },
+                stored_result_projection(['scan_info', 'hosts']),
+                sort=[('completed_at', -1)]
+            )
+            if doc:
+                return dict(unpack_scan_result(doc, ['scan_info', 'hosts']), scan_id=doc['_id'])
+        except Exception as e:
+            logger.error(f"증분 스캔 기준 결과 조회 오류 (무시됨): {str(e)}")
+    return find_baseline_result(target)
+
+def _release_inflight(cache_key: Optional[Tuple], scan_id: str):
+    """
+    실행 중 목록에서 스캔을 제거합니다. (다른 작업으로 교체된 경우는 그대로 둠)
+    """
+    if not cache_key:
+        return
+    with _inflight_lock:
+        if _inflight_scans.get(cache_key) == scan_id:
+            del _inflight_scans[cache_key]
+
+def start_scan_task(scan_id: str, scan_mode: str, target: str, coalesce: bool = True, **kwargs) -> Dict:
+    """
+    스캔 작업을 우선순위 대기열에 등록하고, 작업 ID와 대기 순번을 반환합니다.
+    실제 스캔은 워커 풀에 빈 슬롯이 생기면 실행됩니다.
+    coalesce가 False면 동일한 스캔이 실행 중이어도 새로 실행합니다. (공유 대기열 워커에서 사용)
     """
     if not is_valid_target(target):
         raise ValueError(f"잘못된 대상 형식: {target}")
     
+    # 테스트/시뮬레이션/증분 스캔은 요청마다 따로 실행 (캐시/중복 실행 방지 제외)
+    cache_key = make_scan_cache_key(scan_mode, target, kwargs) if scan_mode not in UNCACHED_SCAN_MODES else None
+    
+    # 캐시된 결과가 있으면 스캔 없이 바로 완료 처리
+    if cache_key and kwargs.get('use_cache', True):
+        cached = scan_result_cache.get(cache_key)
+        if cached:
+            cached_result, cached_at = cached
+            now = time.time()
+            scan_tasks[scan_id] = {
+                'id': scan_id,
+                'target': target,
+                'mode': scan_mode,
+                'status': ScanStatus.COMPLETED,
+                'start_time': now,
+                'end_time': now,
+                'result': cached_result,
+                'error': None,
+                'cached': True,
+                'cached_at': cached_at
+            }
+            _set_task_status(scan_tasks[scan_id], ScanStatus.COMPLETED, cached=True,
+                             hosts=len(cached_result.get('hosts', [])))
+            logger.info(f"캐시된 스캔 결과 사용 [ID: {scan_id}]: {target} ({now - cached_at:.0f}초 전 결과)")
+            return {
+                'scan_id': scan_id,
+                'target': target,
+                'mode': scan_mode,
+                'status': ScanStatus.COMPLETED,
+                'cached': True,
+                'cache_age': now - cached_at
+            }
+    
+    # 동일한 스캔이 이미 대기/실행 중이면 새로 시작하지 않고 기존 작업에 연결
+    if cache_key:
+        with _inflight_lock:
+            existing_id = _inflight_scans.get(cache_key)
+            existing = scan_tasks.get(existing_id) if existing_id else None
+            if coalesce and existing and existing['status'] in (ScanStatus.QUEUED, ScanStatus.RUNNING):
+                logger.info(f"실행 중인 동일 스캔에 연결 [ID: {existing_id}]: {target}")
+                return {
+                    'scan_id': existing_id,
+                    'target': existing['target'],
+                    'mode': scan_mode,
+                    'status': existing['status'],
+                    'queue_position': scan_scheduler.queue_position(existing_id),
+                    'coalesced': True
+                }
+            _inflight_scans[cache_key] = scan_id
+    
+    priority = SCAN_PRIORITIES.get(scan_mode, max(SCAN_PRIORITIES.values()))
     scan_tasks[scan_id] = {
         'id': scan_id, 
         'target': target, 
         'mode': scan_mode,
-        'status': ScanStatus.PENDING, 
+        'status': ScanStatus.QUEUED, 
+        'priority': priority,
         'start_time': time.time(),
+        'partial_hosts': [],
+        'first_host_at': None,
+        'hosts_total': count_target_addresses(target),
         'result': None,
         'error': None
     }
     
-    def run_scan_thread():
+    task = scan_tasks[scan_id]
+    control = _create_task_control(scan_id)
+    control['cache_key'] = cache_key
+    scan_event_bus.publish(scan_id, 'status', {'scan_id': scan_id, 'status': ScanStatus.QUEUED, 'time': time.time()})
+    
+    def on_host(host: Dict):
+        # 스캔 도중 발견된 호스트를 작업에 바로 반영
+        if task['first_host_at'] is None:
+            task['first_host_at'] = time.time()
+        task['partial_hosts'].append(host)
+        scan_event_bus.publish(scan_id, 'host', host)
+    
+    def run_scan_thread(wait_time: float):
         try:
-            scan_tasks[scan_id]['status'] = ScanStatus.RUNNING
+            if control['cancel'].is_set():
+                raise ScanCancelledError(f"스캔이 취소되었습니다: {scan_id}")
+            task['started_at'] = time.time()
+            task['wait_time'] = wait_time
+            _set_task_status(task, ScanStatus.RUNNING, wait_time=wait_time)
             
-            if scan_mode == ScanMode.QUICK:
-                result = quick_scan(target)
-            elif scan_mode == ScanMode.FULL:
-                result = full_scan(target)
-            elif scan_mode == ScanMode.CUSTOM:
-                ports = kwargs.get('ports')
-                arguments = kwargs.get('arguments')
-                result = custom_scan(target, ports, arguments)
-            elif scan_mode == ScanMode.TEST:
-                result = test_scan(target)
-            else:
-                raise ValueError(f"잘못된 스캔 모드: {scan_mode}")
+            # 이전 관측값으로 타이밍 옵션 선택 (nmap을 사용하는 quick/full/custom 모드만)
+            options = kwargs
+            if uses_adaptive_timing(scan_mode, kwargs):
+                task['timing'] = choose_timing(scan_mode, target, kwargs)
+                logger.info(f"타이밍 선택 [ID: {scan_id}]: {task['timing']['args'] or '기본값'} - "
+                            f"{'; '.join(task['timing']['reasons'])}")
+                if task['timing']['args']:
+                    options = dict(kwargs, timing=task['timing']['args'])
+            
+            result = _run_sharded_scan(task, options, on_host)
                 
-            scan_tasks[scan_id]['result'] = result
-            scan_tasks[scan_id]['status'] = ScanStatus.COMPLETED
-            scan_tasks[scan_id]['end_time'] = time.time()
+            task['result'] = result
+            task['partial_hosts'] = []
+            task['end_time'] = time.time()
+            if 'timing' in task and task.get('nmap_runs'):
+                task['timing']['observed'] = update_timing_profile(task['timing']['key'], task)
+            _set_task_status(task, ScanStatus.COMPLETED, hosts=len(result.get('hosts', [])),
+                             duration=task['end_time'] - task['start_time'])
+            if cache_key:
+                scan_result_cache.put(cache_key, result)
             
+        except ScanCancelledError:
+            # 지금까지 발견된 호스트는 부분 결과로 유지
+            logger.info(f"스캔 취소됨 [ID: {scan_id}]: {len(task['partial_hosts'])}개 호스트 결과 유지")
+            task['result'] = {'scan_info': {}, 'hosts': list(task['partial_hosts']), 'partial': True}
+            task['partial_hosts'] = []
+            task['end_time'] = time.time()
+            _set_task_status(task, ScanStatus.CANCELLED, hosts=len(task['result']['hosts']))
         except Exception as e:
             logger.error(f"스캔 실패 [ID: {scan_id}]: {str(e)}")
-            scan_tasks[scan_id]['status'] = ScanStatus.FAILED
-            scan_tasks[scan_id]['error'] = str(e)
-            scan_tasks[scan_id]['end_time'] = time.time()
-            
-    thread = threading.Thread(target=run_scan_thread)
-    thread.daemon = True
-    thread.start()
+            task['error'] = str(e)
+            task['end_time'] = time.time()
+            _set_task_status(task, ScanStatus.FAILED, error=str(e))
+        finally:
+            _release_inflight(cache_key, scan_id)
+            _remove_task_control(scan_id)
+    
+    try:
+        queue_position = scan_scheduler.submit(scan_id, priority, run_scan_thread)
+    except ScanQueueFullError:
+        _release_inflight(cache_key, scan_id)
+        _remove_task_control(scan_id)
+        del scan_tasks[scan_id]
+        scan_event_bus.discard(scan_id)
+        raise
     
     return {
         'scan_id': scan_id,
         'target': target,
         'mode': scan_mode,
-        'status': ScanStatus.PENDING
+        'status': ScanStatus.QUEUED,
+        'queue_position': queue_position
     }
 
-def get_scan_status(scan_id: str) -> Dict:
+def cancel_scan(scan_id: str, wait: float = 5.0) -> Dict:
     """
-    스캔 작업의 상태를 확인합니다.
+    스캔 작업을 취소합니다.
+    대기 중인 작업은 대기열에서 빼고, 실행 중인 작업은 nmap 프로세스를 종료한 뒤
+    워커가 부분 결과를 정리할 때까지 최대 wait초 기다립니다.
+    이미 끝난 작업은 바꾸지 않으며, 반환값의 'cancelled'로 취소 여부를 알 수 있습니다.
     """
-    if scan_id not in scan_tasks:
+    task = scan_tasks.get(scan_id)
+    if task is None:
         raise ValueError(f"존재하지 않는 스캔 ID: {scan_id}")
-        
-    task = scan_tasks[scan_id]
+    control = _get_task_control(scan_id)
+    if is_scan_finished(task['status']) or control is None:
+        return dict(get_scan_status(scan_id), cancelled=False)
+
+    control['cancel'].set()
+    if scan_scheduler.remove(scan_id):
+        # 아직 시작하지 않은 작업은 바로 취소 처리
+        logger.info(f"대기 중인 스캔 취소 [ID: {scan_id}]")
+        task['result'] = {'scan_info': {}, 'hosts': [], 'partial': True}
+        task['end_time'] = time.time()
+        _set_task_status(task, ScanStatus.CANCELLED, hosts=0)
+        _release_inflight(control.get('cache_key'), scan_id)
+        _remove_task_control(scan_id)
+    else:
+        with _task_controls_lock:
+            processes = list(control['processes'])
+        logger.info(f"실행 중인 스캔 취소 [ID: {scan_id}]: nmap 프로세스 {len(processes)}개 종료")
+        if not SCAN_STREAM_RESULTS and not processes:
+            logger.warning(f"SCAN_STREAM_RESULTS=false에서는 실행 중인 nmap을 종료할 수 없어 nmap이 끝난 뒤 취소됩니다 [ID: {scan_id}]")
+        for process in processes:
+            try:
+                process.terminate()
+            except Exception as e:
+                logger.error(f"nmap 프로세스 종료 실패 [ID: {scan_id}]: {str(e)}")
+        if not control['done'].wait(wait):
+            # 정상 종료를 기다렸지만 남아있으면 강제 종료
+            with _task_controls_lock:
+                processes = list(control['processes'])
+            for process in processes:
+                try:
+                    process.kill()
+                except Exception:
+                    pass
+            control['done'].wait(1)
+
+    return dict(get_scan_status(scan_id), cancelled=True)
+
+def get_scan_queue_stats() -> Dict[str, Any]:
+    """
+    스캔 워커 풀과 대기열의 현재 상태를 반환합니다.
+    """
+    stats = scan_scheduler.stats()
+    stats['cache'] = scan_result_cache.stats()
+    stats['tasks'] = get_task_store_stats()
+    stats['persistence'] = scan_result_writer.stats()
+    with _inflight_lock:
+        stats['inflight'] = len(_inflight_scans)
+    stats['backend'] = SCAN_QUEUE_BACKEND
+    if SCAN_QUEUE_BACKEND == 'mongo':
+        stats['jobs'] = get_job_queue_stats()
+    return stats
+
+def count_status_hosts(status: Dict) -> int:
+    """
+    상태 조회 결과에 포함된 호스트 수를 반환합니다. (스트리밍 응답 여부 판단에 사용)
+    """
+    return len((status.get('result') or {}).get('hosts', [])) + \
+        len((status.get('partial_result') or {}).get('hosts', []))
+
+def read_scan_events(scan_id: str, cursor: int = 0, timeout: float = 15.0) -> Tuple[List[Tuple[int, str, Dict]], int]:
+    """
+    스캔 작업의 cursor 이후 이벤트를 읽습니다. 새 이벤트가 없으면 timeout 동안 기다립니다.
+    """
+    events, next_cursor = scan_event_bus.read(scan_id, cursor, timeout)
+    return [(event_id, event, to_json_shape(data)) for event_id, event, data in events], next_cursor
+
+def is_scan_finished(status: str) -> bool:
+    """
+    더 이상 상태가 바뀌지 않는 최종 상태인지 확인합니다.
+    """
+    return status in (ScanStatus.COMPLETED, ScanStatus.FAILED, ScanStatus.CANCELLED)
+
+def get_task_store_stats() -> Dict[str, Any]:
+    """
+    스캔 작업 저장소의 항목 수와 대략적인 메모리 사용량을 반환합니다.
+    """
+    scan_tasks.evict()
+    return scan_tasks.stats()
+
+def _load_stored_scan_status(scan_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    MongoDB에 기록된 스캔 문서를 get_scan_status()와 같은 형식으로 변환합니다.
+    fields를 지정하면 해당 결과 필드만 읽어와 압축을 풉니다.
+    """
+    if _scan_db is None:
+        return None
+    try:
+        doc = _scan_db.scans.find_one({'_id': scan_id}, stored_result_projection(fields))
+    except Exception as e:
+        logger.error(f"저장된 스캔 조회 실패 [ID: {scan_id}]: {str(e)}")
+        return None
+    if not doc:
+        return None
+
+    start_time = doc.get('start_time')
+    if start_time is None and doc.get('created_at'):
+        start_time = doc['created_at'].timestamp()
+    status = {
+        'scan_id': scan_id,
+        'target': doc.get('target'),
+        'mode': doc.get('mode'),
+        'status': doc.get('status'),
+        'start_time': start_time,
+        'stored': True,
+        'recommended_poll_interval': recommended_poll_interval(doc.get('status'))
+    }
+    if doc.get('timing'):
+        status['timing'] = doc['timing']
+    # 공유 대기열 워커가 실행 중인 작업은 워커가 하트비트로 기록한 진행 상황을 포함
+    if status['status'] == ScanStatus.QUEUED and SCAN_QUEUE_BACKEND == 'mongo':
+        status['queue_position'] = job_queue_position(scan_id)
+    elif status['status'] == ScanStatus.RUNNING:
+        for key in ('progress', 'hosts_found', 'worker'):
+            if doc.get(key) is not None:
+                status[key] = doc[key]
+        status['recommended_poll_interval'] = recommended_poll_interval(status['status'], doc.get('progress'))
+    if is_scan_finished(status['status']):
+        status['end_time'] = doc.get('end_time')
+        status['duration'] = doc.get('duration', 0)
+    if status['status'] in (ScanStatus.COMPLETED, ScanStatus.CANCELLED):
+        try:
+            status['result'] = unpack_scan_result(doc, fields)
+        except Exception as e:
+            logger.error(f"저장된 스캔 결과 복원 실패 [ID: {scan_id}]: {str(e)}")
+            status['result'] = None
+        status['result_summary'] = doc.get('result_summary') or summarize_scan_result(status['result'])
+    elif status['status'] == ScanStatus.FAILED:
+        status['error'] = doc.get('error')
+    return status
+
+def get_scan_status(scan_id: str, fields: Optional[List[str]] = None, raw: bool = False) -> Dict:
+    """
+    스캔 작업의 상태를 확인합니다.
+    
+    Args:
+        scan_id: 스캔 ID
+        fields: 응답에 포함할 결과 필드 (예: ['hosts']). None이면 전체, 빈 목록이면 요약만 포함
+        raw: True면 결과의 호스트를 내부 레코드 그대로 반환 (스트리밍 응답에서 직렬화 시점에 변환)
+    """
+    scan_tasks.evict()
+    task = scan_tasks.get(scan_id) or scan_result_writer.pending(scan_id)
+    if task is None:
+        # 메모리에서 제거된 작업은 MongoDB에 기록된 결과로 응답
+        stored = _load_stored_scan_status(scan_id, fields)
+        if stored is None:
+            raise ValueError(f"존재하지 않는 스캔 ID: {scan_id}")
+        return stored
     
     result = {
         'scan_id': scan_id,
@@ -395,17 +2571,289 @@ def get_scan_status(scan_id: str) -> Dict:
         'start_time': task['start_time']
     }
     
-    if task['status'] in [ScanStatus.COMPLETED, ScanStatus.FAILED]:
+    if task['status'] == ScanStatus.QUEUED:
+        result['queue_position'] = scan_scheduler.queue_position(scan_id)
+    elif 'wait_time' in task:
+        result['wait_time'] = task['wait_time']
+        
+    if task.get('cached'):
+        result['cached'] = True
+        result['cache_age'] = time.time() - task['cached_at']
+        
+    if 'discovery' in task:
+        result['discovery'] = dict(task['discovery'])
+        
+    if 'timing' in task:
+        result['timing'] = task['timing']
+        
+    if task.get('progress'):
+        result['progress'] = dict(task['progress'])
+    result['recommended_poll_interval'] = recommended_poll_interval(task['status'], task.get('progress'))
+        
+    if 'shards_total' in task:
+        result['shards_total'] = task['shards_total']
+        result['shards_done'] = task['shards_done']
+        
+    if task.get('first_host_at'):
+        result['time_to_first_host'] = task['first_host_at'] - task.get('started_at', task['start_time'])
+        
+    # 실행 중인 스캔은 지금까지 발견된 호스트를 부분 결과로 제공
+    if task['status'] == ScanStatus.RUNNING:
+        partial_hosts = list(task.get('partial_hosts', []))
+        result['hosts_found'] = len(partial_hosts)
+        result['partial_result'] = {'hosts': partial_hosts if raw else to_json_shape(partial_hosts)}
+        
+    if is_scan_finished(task['status']):
         result['end_time'] = task.get('end_time')
         result['duration'] = task.get('end_time', 0) - task['start_time']
         
-    if task['status'] == ScanStatus.COMPLETED:
-        result['result'] = task['result']
+    if task['status'] in (ScanStatus.COMPLETED, ScanStatus.CANCELLED):
+        scan_result = task['result']
+        if scan_result is not None and fields is not None:
+            scan_result = {k: v for k, v in scan_result.items() if k in fields or k not in SCAN_RESULT_FIELDS}
+        # 내부 레코드는 응답을 만들 때만 JSON 형식으로 변환
+        result['result'] = scan_result if raw else to_json_shape(scan_result)
+        result['result_summary'] = summarize_scan_result(task['result'])
     elif task['status'] == ScanStatus.FAILED:
         result['error'] = task['error']
         
     return result
 
+# MongoDB 공유 작업 대기열 (SCAN_QUEUE_BACKEND=mongo)
+# API 프로세스는 scan_jobs 컬렉션에 작업을 넣기만 하고, 별도 워커 프로세스(worker.py)가
+# 작업을 점유(lease)해 실행하면서 하트비트로 점유 시간을 연장하고 진행 상황을 scans 문서에 기록합니다.
+# 워커가 중단되어 하트비트가 끊기면 점유 시간이 지난 뒤 다른 워커가 작업을 다시 가져갑니다.
+
+def enqueue_scan_job(scan_id: str, scan_mode: str, target: str, options: Dict,
+                     baseline_scan_id: Optional[str] = None) -> Dict:
+    """
+    스캔 작업을 공유 대기열에 넣고 start_scan_task()와 같은 형식의 결과를 반환합니다.
+    동일한 스캔이 이미 대기/실행 중이면 그 작업에 연결합니다.
+    """
+    if not is_valid_target(target):
+        raise ValueError(f"잘못된 대상 형식: {target}")
+    if _scan_db is None:
+        raise RuntimeError("공유 대기열을 사용하려면 MongoDB가 필요합니다")
+
+    cache_key = list(make_scan_cache_key(scan_mode, target, options)) if scan_mode not in UNCACHED_SCAN_MODES else None
+    if cache_key:
+        existing = _scan_db.scan_jobs.find_one(
+            {'cache_key': cache_key, 'status': {'$in': [ScanStatus.QUEUED, ScanStatus.RUNNING]}},
+            {'status': 1, 'target': 1}
+        )
+        if existing:
+            logger.info(f"대기/실행 중인 동일 스캔에 연결 [ID: {existing['_id']}]: {target}")
+            return {
+                'scan_id': existing['_id'],
+                'target': existing['target'],
+                'mode': scan_mode,
+                'status': existing['status'],
+                'queue_position': job_queue_position(existing['_id']),
+                'coalesced': True
+            }
+
+    if _scan_db.scan_jobs.count_documents({'status': ScanStatus.QUEUED}) >= SCAN_QUEUE_MAX_SIZE:
+        raise ScanQueueFullError(f"스캔 대기열이 가득 찼습니다 (최대 {SCAN_QUEUE_MAX_SIZE}개)")
+
+    now = time.time()
+    _scan_db.scan_jobs.insert_one({
+        '_id': scan_id,
+        'target': target,
+        'mode': scan_mode,
+        'options': options,
+        'baseline_scan_id': baseline_scan_id,
+        'priority': SCAN_PRIORITIES.get(scan_mode, max(SCAN_PRIORITIES.values())),
+        'cache_key': cache_key,
+        'status': ScanStatus.QUEUED,
+        'enqueued_at': now,
+        'attempts': 0,
+        'cancel_requested': False,
+    })
+    logger.info(f"공유 대기열에 스캔 작업 등록 [ID: {scan_id}]: {target} ({scan_mode})")
+    return {
+        'scan_id': scan_id,
+        'target': target,
+        'mode': scan_mode,
+        'status': ScanStatus.QUEUED,
+        'queue_position': job_queue_position(scan_id)
+    }
+
+def job_queue_position(scan_id: str) -> Optional[int]:
+    """
+    공유 대기열에서 대기 중인 작업의 순번(1부터)을 반환합니다.
+    """
+    if _scan_db is None:
+        return None
+    job = _scan_db.scan_jobs.find_one({'_id': scan_id}, {'status': 1, 'priority': 1, 'enqueued_at': 1})
+    if not job or job['status'] != ScanStatus.QUEUED:
+        return None
+    ahead = _scan_db.scan_jobs.count_documents({
+        'status': ScanStatus.QUEUED,
+        '$or': [
+            {'priority': {'$lt': job['priority']}},
+            {'priority': job['priority'], 'enqueued_at': {'$lt': job['enqueued_at']}},
+        ]
+    })
+    return ahead + 1
+
+def claim_scan_job(worker_id: str, lease: float = SCAN_JOB_LEASE) -> Optional[Dict]:
+    """
+    대기 중이거나 점유 시간이 지난 작업 하나를 원자적으로 점유합니다. (우선순위, 등록 순)
+    """
+    from pymongo import ReturnDocument
+    now = time.time()
+    return _scan_db.scan_jobs.find_one_and_update(
+        {
+            '$or': [
+                {'status': ScanStatus.QUEUED},
+                {'status': ScanStatus.RUNNING, 'lease_expires_at': {'$lt': now}},
+            ],
+            'cancel_requested': {'$ne': True},
+        },
+        {
+            '$set': {
+                'status': ScanStatus.RUNNING,
+                'lease_owner': worker_id,
+                'lease_expires_at': now + lease,
+                'heartbeat_at': now,
+                'started_at': now,
+            },
+            '$inc': {'attempts': 1},
+        },
+        sort=[('priority', 1), ('enqueued_at', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def heartbeat_scan_job(scan_id: str, worker_id: str, progress: Dict, lease: float = SCAN_JOB_LEASE) -> Optional[Dict]:
+    """
+    점유 시간을 연장하고 진행 상황을 scans 문서에 기록합니다.
+    다른 워커에게 점유를 빼앗겼으면 None을, 아니면 작업 문서(cancel_requested 포함)를 반환합니다.
+    """
+    from pymongo import ReturnDocument
+    now = time.time()
+    job = _scan_db.scan_jobs.find_one_and_update(
+        {'_id': scan_id, 'lease_owner': worker_id, 'status': ScanStatus.RUNNING},
+        {'$set': {'lease_expires_at': now + lease, 'heartbeat_at': now}},
+        projection={'cancel_requested': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        return None
+    # 최종 결과가 이미 기록된 문서는 덮어쓰지 않음
+    _scan_db.scans.update_one(
+        {'_id': scan_id, 'status': {'$in': [ScanStatus.QUEUED, ScanStatus.RUNNING]}},
+        {'$set': dict(progress, worker=worker_id)}
+    )
+    return job
+
+def finish_scan_job(scan_id: str, worker_id: str, status: str, error: Optional[str] = None):
+    """
+    워커가 실행을 마친 작업의 점유를 해제하고 최종 상태를 기록합니다.
+    """
+    _scan_db.scan_jobs.update_one(
+        {'_id': scan_id, 'lease_owner': worker_id},
+        {
+            '$set': {'status': status, 'finished_at': time.time(), 'error': error},
+            '$unset': {'lease_expires_at': ''},
+        }
+    )
+
+def release_scan_job(scan_id: str, worker_id: str):
+    """
+    워커 종료 시 끝내지 못한 작업을 다시 대기 상태로 돌려 다른 워커가 바로 가져갈 수 있게 합니다.
+    """
+    _scan_db.scan_jobs.update_one(
+        {'_id': scan_id, 'lease_owner': worker_id, 'status': ScanStatus.RUNNING},
+        {'$set': {'status': ScanStatus.QUEUED}, '$unset': {'lease_owner': '', 'lease_expires_at': ''}}
+    )
+
+def request_scan_job_cancel(scan_id: str) -> Optional[str]:
+    """
+    공유 대기열의 작업 취소를 요청합니다.
+    
+    Returns:
+        'cancelled'(대기 중이던 작업을 바로 취소), 'requested'(실행 중인 워커에 취소 요청),
+        'finished'(이미 끝난 작업), 작업이 없으면 None
+    """
+    from pymongo import ReturnDocument
+    now = time.time()
+    job = _scan_db.scan_jobs.find_one_and_update(
+        {'_id': scan_id, 'status': ScanStatus.QUEUED},
+        {'$set': {'status': ScanStatus.CANCELLED, 'cancel_requested': True, 'finished_at': now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if job:
+        # 대기 중이던 작업은 빈 부분 결과로 바로 완료 기록
+        record_scan_completion({
+            'id': scan_id, 'target': job['target'], 'mode': job['mode'], 'status': ScanStatus.CANCELLED,
+            'start_time': job['enqueued_at'], 'end_time': now,
+            'result': {'scan_info': {}, 'hosts': [], 'partial': True}, 'error': None,
+        })
+        logger.info(f"공유 대기열의 대기 중인 스캔 취소 [ID: {scan_id}]")
+        return 'cancelled'
+    result = _scan_db.scan_jobs.update_one(
+        {'_id': scan_id, 'status': ScanStatus.RUNNING},
+        {'$set': {'cancel_requested': True}}
+    )
+    if result.matched_count:
+        logger.info(f"공유 대기열의 실행 중인 스캔 취소 요청 [ID: {scan_id}]")
+        return 'requested'
+    return 'finished' if _scan_db.scan_jobs.find_one({'_id': scan_id}, {'_id': 1}) else None
+
+def reap_cancelled_scan_jobs() -> int:
+    """
+    취소 요청된 뒤 실행하던 워커가 중단되어 점유 시간이 지났거나, 워커 종료 시 대기 상태로 반환된 작업을 취소로 끝냅니다.
+    (claim_scan_job은 취소 요청된 작업을 가져가지 않으므로 정리하지 않으면 계속 대기/실행 중으로 남음)
+    끝낸 작업 수를 반환합니다.
+    """
+    from pymongo import ReturnDocument
+    reaped = 0
+    while True:
+        now = time.time()
+        job = _scan_db.scan_jobs.find_one_and_update(
+            {
+                'cancel_requested': True,
+                '$or': [
+                    {'status': ScanStatus.QUEUED},
+                    {'status': ScanStatus.RUNNING, 'lease_expires_at': {'$lt': now}},
+                ],
+            },
+            {
+                '$set': {'status': ScanStatus.CANCELLED, 'finished_at': now},
+                '$unset': {'lease_owner': '', 'lease_expires_at': ''},
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            return reaped
+        # 대기 중 취소와 같이 빈 부분 결과로 완료 기록
+        record_scan_completion({
+            'id': job['_id'], 'target': job['target'], 'mode': job['mode'], 'status': ScanStatus.CANCELLED,
+            'start_time': job['enqueued_at'], 'end_time': now,
+            'result': {'scan_info': {}, 'hosts': [], 'partial': True}, 'error': None,
+        })
+        reaped += 1
+        logger.info(f"중단된 워커의 취소 요청된 작업 정리 [ID: {job['_id']}]")
+
+def get_job_queue_stats() -> Dict[str, Any]:
+    """
+    공유 대기열의 상태별 작업 수와 실행 중인 워커 수를 반환합니다.
+    """
+    if _scan_db is None:
+        return {}
+    try:
+        now = time.time()
+        return {
+            'queued': _scan_db.scan_jobs.count_documents({'status': ScanStatus.QUEUED}),
+            'running': _scan_db.scan_jobs.count_documents({'status': ScanStatus.RUNNING}),
+            'expired_leases': _scan_db.scan_jobs.count_documents(
+                {'status': ScanStatus.RUNNING, 'lease_expires_at': {'$lt': now}}),
+            'workers': len(_scan_db.scan_jobs.distinct('lease_owner', {'status': ScanStatus.RUNNING})),
+        }
+    except Exception as e:
+        logger.error(f"공유 대기열 상태 조회 실패: {str(e)}")
+        return {'error': str(e)}
+
 # 메인 함수 (테스트용)
 if __name__ == "__main__":
     import uuid
@@ -415,6 +2863,7 @@ if __name__ == "__main__":
     
     try:
         # nmap 확인
+        print(f"스캐너 기능: {init_scanner_capabilities()}")
         if check_nmap_installed():
             print("nmap이 설치되어 있습니다.")
         else:
@@ -428,7 +2877,7 @@ if __name__ == "__main__":
         while True:
             status = get_scan_status(scan_id)
             print(f"상태: {status['status']}")
-            if status['status'] in [ScanStatus.COMPLETED, ScanStatus.FAILED]:
+            if is_scan_finished(status['status']):
                 break
             time.sleep(1)
         
@@ -0,0 +1,187 @@
+# scan_records.py
+"""
+스캔 엔진 내부에서 사용하는 호스트/포트 결과 레코드
+
+호스트와 포트마다 딕셔너리를 만드는 대신 __slots__ 객체를 사용해 큰 대역(/16 등) 결과를
+메모리에 보관할 때의 오버헤드를 줄입니다. 서비스 이름처럼 반복되는 문자열은 intern하여 공유합니다.
+레코드는 읽기용 딕셔너리 인터페이스(get, [], in, keys, items)를 제공하므로 내부 코드는 기존처럼
+host.get('ports') 형태로 사용할 수 있고, API 응답을 만들 때 to_json_shape()로 기존 JSON 형식으로 변환합니다.
+"""
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ''
+
+class _Record:
+    """__slots__ 필드를 딕셔너리처럼 읽을 수 있게 하는 공통 기반 클래스"""
+    __slots__ = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def keys(self) -> List[str]:
+        return list(self.__slots__)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    # 내용으로 비교하는 변경 가능한 레코드이므로 해시할 수 없음 (dict와 같음)
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class PortRecord(_Record):
+    """포트 하나의 스캔 결과 ({port, protocol, state, service, product, version}, 취약점이 있으면 vulns)"""
+    __slots__ = ('port', 'protocol', 'state', 'service', 'product', 'version', 'vulns')
+
+    def __init__(self, port: int, protocol: str, state: str, service: str = '',
+                 product: str = '', version: str = '', vulns: tuple = ()):
+        self.port = port
+        self.protocol = _intern(protocol)
+        self.state = _intern(state)
+        self.service = _intern(service)
+        self.product = _intern(product)
+        self.version = _intern(version)
+        self.vulns = vulns  # 취약점 색인이 반환한 CVE 정보 튜플 (같은 제품/버전의 포트끼리 공유)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'port': self.port,
+            'protocol': self.protocol,
+            'state': self.state,
+            'service': self.service,
+            'product': self.product,
+            'version': self.version,
+        }
+        # 취약점이 있는 포트에만 포함 (기존 응답 형식 유지)
+        if self.vulns:
+            data['vulns'] = [dict(vuln) for vuln in self.vulns]
+        return data
+
+class HostRecord(_Record):
+    """호스트 하나의 스캔 결과 (parse_nmap_data()의 반환 형식)"""
+    __slots__ = ('hostname', 'state', 'ip', 'mac', 'macVendor', 'ports', 'os', 'scripts',
+                 'uptime', 'distance', 'tcpSequence', 'lastScanTime', 'trace')
+
+    def __init__(self, hostname: str = '', state: str = '', ip: str = '', mac: str = '',
+                 macVendor: str = '', ports: Optional[List[PortRecord]] = None, os: Optional[Dict] = None,
+                 scripts: Optional[List[Dict]] = None, uptime: Optional[Dict] = None,
+                 distance: Optional[int] = None, tcpSequence: Optional[Dict] = None, lastScanTime: str = '',
+                 trace: Optional[List[Dict]] = None):
+        self.hostname = hostname
+        self.state = _intern(state)
+        self.ip = ip
+        self.mac = mac
+        self.macVendor = _intern(macVendor)
+        self.ports = ports if ports is not None else []
+        self.os = os
+        self.scripts = scripts if scripts is not None else []
+        self.uptime = uptime
+        self.distance = distance
+        self.tcpSequence = tcpSequence
+        self.lastScanTime = _intern(lastScanTime)
+        self.trace = trace  # traceroute 경로 [{ttl, ip, host, rtt}] (-A/--traceroute 결과에만 있음)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'hostname': self.hostname,
+            'state': self.state,
+            'ip': self.ip,
+            'mac': self.mac,
+            'macVendor': self.macVendor,
+            'ports': [port.to_dict() if isinstance(port, PortRecord) else port for port in self.ports],
+            'os': self.os,
+            'scripts': self.scripts,
+            'uptime': self.uptime,
+            'distance': self.distance,
+            'tcpSequence': self.tcpSequence,
+            'lastScanTime': self.lastScanTime,
+        }
+        # traceroute 결과가 있는 호스트에만 포함 (기존 응답 형식 유지)
+        if self.trace:
+            data['trace'] = self.trace
+        return data
+
+def to_json_shape(value: Any) -> Any:
+    """
+    레코드가 포함된 결과(dict/list)를 API 응답용 JSON 형식으로 변환합니다.
+    레코드나 컨테이너가 없는 값 목록(포트 번호 목록 등)은 복사하지 않고 그대로 반환합니다.
+    """
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        if not any(isinstance(item, (_Record, dict, list)) for item in value):
+            return value
+        return [to_json_shape(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_json_shape(item) for key, item in value.items()}
+    return value
+
+def record_json_default(value: Any) -> Any:
+    """json.dumps(default=...)용 변환 함수"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, _Record):
+        return value.to_dict()
+    return str(value)
+
+def _iter_json(value: Any, batch: int) -> Iterator[str]:
+    if isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            yield (',' if index else '') + json.dumps(str(key)) + ':'
+            yield from _iter_json(item, batch)
+        yield '}'
+    elif isinstance(value, list) and len(value) > batch:
+        # 큰 목록(호스트 목록 등)은 batch개씩만 직렬화
+        yield '['
+        for start in range(0, len(value), batch):
+            yield (',' if start else '') + ','.join(
+                json.dumps(item, separators=(',', ':'), default=_json_default) for item in value[start:start + batch]
+            )
+        yield ']'
+    else:
+        yield json.dumps(value, separators=(',', ':'), default=_json_default)
+
+def iter_json_chunks(value: Any, batch: int = 64, buffer_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    결과를 JSON 문자열 조각으로 나누어 생성합니다. (스트리밍 응답용)
+    전체 JSON 문자열을 한 번에 만들지 않으므로 결과 크기와 관계없이 메모리 사용량이 일정합니다.
+    """
+    buffer = []
+    size = 0
+    for piece in _iter_json(value, batch):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,520 @@
+# scan_schedules.py
+"""
+주기적으로 반복되는 스캔 예약
+
+예약은 MongoDB scan_schedules 컬렉션에 저장되며, 실행 주기는 간격(interval, 초) 또는
+cron 식(분 시 일 월 요일, UTC 기준) 중 하나로 지정합니다.
+예약 실행기는 실행 시각에 예약별 지연(jitter)을 더해 같은 시각의 예약이 한꺼번에 시작되지 않게 하고,
+예약으로 시작된 스캔이 동시에 SCAN_SCHEDULE_MAX_CONCURRENT개를 넘지 않도록 제한합니다.
+실행할 예약은 next_run_at을 원자적으로 갱신하여 가져가므로 여러 API 인스턴스에서 실행해도 한 번만 시작됩니다.
+
+동시 실행 수는 scan_schedule_slots 컬렉션의 세마포어 문서 하나로 관리합니다. 실행 자리는 사용 중인 수가 한도
+미만일 때만 원자적으로 예약되고, 스캔이 끝나면 반환됩니다. 자리를 가진 실행기는 폴링할 때마다 점유 시간을
+연장하므로, 실행기가 중단되어 연장되지 않은 자리는 점유 시간이 지나면 어느 인스턴스에서든 회수됩니다.
+"""
+import logging
+import os
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from .scan import (
+    ScanMode, ScanStatus, ScanQueueFullError, SCAN_QUEUE_BACKEND, is_valid_target, normalize_target,
+    start_scan_task, enqueue_scan_job, find_stored_baseline, is_scan_finished, scan_tasks
+)
+from .scan_worker import default_worker_id
+
+logger = logging.getLogger('app.scan_schedules')
+
+# 예약 스캔 설정
+SCAN_SCHEDULES_ENABLED = os.environ.get('SCAN_SCHEDULES_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SCAN_SCHEDULE_MAX_CONCURRENT = int(os.environ.get('SCAN_SCHEDULE_MAX_CONCURRENT', 2))    # 예약으로 시작된 스캔의 최대 동시 실행 수
+SCAN_SCHEDULE_POLL_INTERVAL = float(os.environ.get('SCAN_SCHEDULE_POLL_INTERVAL', 15))   # 실행할 예약을 확인하는 주기 (초)
+SCAN_SCHEDULE_DEFAULT_JITTER = int(os.environ.get('SCAN_SCHEDULE_DEFAULT_JITTER', 300))  # 예약에 jitter를 지정하지 않았을 때의 최대 지연 (초)
+SCAN_SCHEDULE_MIN_INTERVAL = int(os.environ.get('SCAN_SCHEDULE_MIN_INTERVAL', 300))      # 허용하는 최소 실행 간격 (초)
+SCAN_SCHEDULE_SLOT_LEASE = int(os.environ.get('SCAN_SCHEDULE_SLOT_LEASE', 120))        # 실행 자리의 점유 시간 (초), 연장되지 않으면 회수
+
+SCHEDULE_MODES = (ScanMode.QUICK, ScanMode.FULL, ScanMode.CUSTOM, ScanMode.DIFF)
+SCHEDULE_SLOTS_ID = 'scheduled_scans'  # scan_schedule_slots의 세마포어 문서 ID
+
+# cron 필드: (이름, 최솟값, 최댓값)
+CRON_FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 6)]
+
+def parse_cron(expr: str) -> Dict[str, Set[int]]:
+    """
+    5개 필드의 cron 식을 필드별 허용 값 집합으로 변환합니다.
+    각 필드는 *, 숫자, 범위(a-b), 목록(a,b), 간격(*/n, a-b/n)을 지원하며 요일은 0(또는 7)이 일요일입니다.
+
+    Raises:
+        ValueError: 형식이 잘못된 경우
+    """
+    parts = (expr or '').split()
+    if len(parts) != len(CRON_FIELDS):
+        raise ValueError(f"cron 식은 '분 시 일 월 요일' 5개 필드여야 합니다: {expr}")
+    parsed = {}
+    for part, (name, low, high) in zip(parts, CRON_FIELDS):
+        values = set()
+        field_high = 7 if name == 'weekday' else high
+        for item in part.split(','):
+            base, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if base == '*':
+                    start, end = low, high
+                elif '-' in base:
+                    start, end = (int(x) for x in base.split('-', 1))
+                else:
+                    start = int(base)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"잘못된 cron {name} 필드: {part}")
+            if step < 1 or start < low or end > field_high or start > end:
+                raise ValueError(f"잘못된 cron {name} 필드: {part}")
+            values.update(range(start, end + 1, step))
+        if name == 'weekday' and 7 in values:
+            values.discard(7)
+            values.add(0)
+        parsed[name] = values
+    # 일/요일이 모두 제한되면 둘 중 하나만 맞아도 실행 (표준 cron 동작)
+    parsed['day_restricted'] = parts[2] != '*'
+    parsed['weekday_restricted'] = parts[4] != '*'
+    return parsed
+
+def _cron_day_matches(cron: Dict, moment: datetime) -> bool:
+    day_ok = moment.day in cron['day']
+    weekday_ok = (moment.isoweekday() % 7) in cron['weekday']
+    if cron['day_restricted'] and cron['weekday_restricted']:
+        return day_ok or weekday_ok
+    return day_ok and weekday_ok
+
+def next_cron_time(cron: Dict, after: datetime) -> datetime:
+    """
+    after 이후(after 제외) cron 식과 일치하는 가장 이른 시각(분 단위, UTC)을 계산합니다.
+    일치하지 않는 월/일/시는 건너뛰므로 분 단위로 하나씩 확인하지 않습니다.
+    """
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = moment + timedelta(days=366 * 5)
+    while moment < limit:
+        if moment.month not in cron['month']:
+            moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        if not _cron_day_matches(cron, moment):
+            moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if moment.hour not in cron['hour']:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+            continue
+        if moment.minute not in cron['minute']:
+            moment += timedelta(minutes=1)
+            continue
+        return moment
+    raise ValueError("cron 식과 일치하는 시각이 없습니다")
+
+def _as_utc(value: datetime) -> datetime:
+    # pymongo는 시간대 없는 UTC datetime을 반환함
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def compute_next_run(schedule: Dict, after: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    예약의 다음 실행 시각을 계산합니다.
+    after(보통 직전의 예정 시각) 다음 주기의 예정 시각과, 여기에 0~jitter초의 임의 지연을 더한 실제 실행 시각을 반환합니다.
+    지연은 예정 시각에만 더하므로 간격 예약에서도 지연이 누적되지 않습니다.
+    """
+    now = datetime.now(timezone.utc)
+    after = _as_utc(after) if after else now
+    if schedule.get('cron'):
+        cron = parse_cron(schedule['cron'])
+        scheduled = next_cron_time(cron, after)
+        if scheduled <= now:
+            # 실행기가 오래 멈춰 있었으면 밀린 실행은 건너뛰고 다음 주기부터
+            scheduled = next_cron_time(cron, now)
+    else:
+        interval = timedelta(seconds=schedule['interval'])
+        scheduled = after + interval
+        if scheduled <= now:
+            scheduled += interval * ((now - scheduled) // interval + 1)
+    jitter = schedule.get('jitter') or 0
+    if schedule.get('interval'):
+        # 지연이 주기보다 길면 실행이 겹치거나 순서가 뒤바뀔 수 있으므로 주기의 절반까지만 사용
+        jitter = min(jitter, schedule['interval'] / 2)
+    return scheduled, scheduled + timedelta(seconds=random.uniform(0, jitter))
+
+def check_custom_options(schedule: Dict):
+    options = schedule.get('options') or {}
+    if schedule.get('mode') == ScanMode.CUSTOM and not (options.get('ports') or options.get('arguments')):
+        raise ValueError("사용자 정의 스캔에는 options.ports 또는 options.arguments가 필요합니다")
+
+def validate_schedule(data: Dict, partial: bool = False) -> Dict:
+    """
+    예약 생성/수정 요청을 검증하고 저장할 필드만 골라 반환합니다.
+
+    Raises:
+        ValueError: 잘못된 값이 있는 경우 (메시지는 응답에 그대로 사용)
+    """
+    fields = {}
+    if not partial or 'target' in data:
+        if not data.get('target') or not is_valid_target(data['target']):
+            raise ValueError(f"잘못된 대상 형식: {data.get('target')}")
+        fields['target'] = data['target']
+        fields['target_key'] = normalize_target(data['target'])
+    if not partial or 'mode' in data:
+        if data.get('mode') not in SCHEDULE_MODES:
+            raise ValueError(f"예약할 수 없는 스캔 모드: {data.get('mode')}. 지원되는 모드: {', '.join(SCHEDULE_MODES)}")
+        fields['mode'] = data['mode']
+    if 'options' in data:
+        if not isinstance(data['options'], dict):
+            raise ValueError("options는 객체여야 합니다")
+        allowed = {'ports', 'arguments', 'engine', 'discovery', 'use_cache'}
+        unknown = set(data['options']) - allowed
+        if unknown:
+            raise ValueError(f"지원하지 않는 옵션: {', '.join(sorted(unknown))}")
+        fields['options'] = data['options']
+    elif not partial:
+        fields['options'] = {}
+    if not partial:
+        check_custom_options(fields)
+
+    if 'interval' in data or 'cron' in data or not partial:
+        interval, cron = data.get('interval'), data.get('cron')
+        if bool(interval) == bool(cron):
+            raise ValueError("interval(초)과 cron 중 하나만 지정해야 합니다")
+        if cron:
+            parse_cron(cron)
+            fields['cron'], fields['interval'] = cron, None
+        else:
+            try:
+                interval = int(interval)
+            except (TypeError, ValueError):
+                raise ValueError("interval은 초 단위 정수여야 합니다")
+            if interval < SCAN_SCHEDULE_MIN_INTERVAL:
+                raise ValueError(f"interval은 {SCAN_SCHEDULE_MIN_INTERVAL}초 이상이어야 합니다")
+            fields['interval'], fields['cron'] = interval, None
+    if 'jitter' in data:
+        try:
+            fields['jitter'] = max(0, int(data['jitter']))
+        except (TypeError, ValueError):
+            raise ValueError("jitter는 초 단위 정수여야 합니다")
+    elif not partial:
+        fields['jitter'] = SCAN_SCHEDULE_DEFAULT_JITTER
+    if 'enabled' in data:
+        fields['enabled'] = bool(data['enabled'])
+    elif not partial:
+        fields['enabled'] = True
+    if 'name' in data:
+        fields['name'] = str(data['name'])[:200]
+    return fields
+
+def create_schedule(db, data: Dict, owner: Optional[str] = None) -> Dict:
+    """
+    예약을 검증해 저장하고 저장된 문서를 반환합니다.
+    """
+    schedule = validate_schedule(data)
+    now = datetime.now(timezone.utc)
+    schedule.update({
+        '_id': str(uuid.uuid4()),
+        'name': schedule.get('name') or f"{schedule['mode']} {schedule['target']}",
+        'owner': owner,
+        'created_at': now,
+        'updated_at': now,
+        'last_run_at': None,
+        'last_scan_id': None,
+        'runs': 0,
+    })
+    schedule['scheduled_at'], schedule['next_run_at'] = compute_next_run(schedule, now)
+    db.scan_schedules.insert_one(schedule)
+    return schedule
+
+def update_schedule(db, schedule_id: str, data: Dict, query: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    예약을 수정합니다. 주기가 바뀌거나 다시 활성화되면 다음 실행 시각을 새로 계산합니다.
+    """
+    from pymongo import ReturnDocument
+    fields = validate_schedule(data, partial=True)
+    current = db.scan_schedules.find_one(dict(query or {}, _id=schedule_id))
+    if current is None:
+        return None
+    merged = dict(current, **fields)
+    check_custom_options(merged)
+    if {'interval', 'cron', 'jitter'} & set(fields) or (fields.get('enabled') and not current.get('enabled')):
+        fields['scheduled_at'], fields['next_run_at'] = compute_next_run(merged)
+    fields['updated_at'] = datetime.now(timezone.utc)
+    return db.scan_schedules.find_one_and_update(
+        {'_id': schedule_id}, {'$set': fields}, return_document=ReturnDocument.AFTER
+    )
+
+def count_active_scheduled_scans(db) -> int:
+    """
+    예약으로 시작되어 아직 대기/실행 중인 스캔 수(사용 중인 실행 자리 수)를 반환합니다.
+    """
+    slots = db.scan_schedule_slots.find_one({'_id': SCHEDULE_SLOTS_ID}, {'used': 1})
+    return slots['used'] if slots else 0
+
+def acquire_schedule_slot(db, holder: str, max_concurrent: int,
+                          lease: float = SCAN_SCHEDULE_SLOT_LEASE) -> Optional[str]:
+    """
+    사용 중인 실행 자리가 max_concurrent개 미만이면 자리 하나를 원자적으로 예약하고 토큰을 반환합니다.
+    한도에 도달했으면 None을 반환합니다.
+    """
+    from pymongo.errors import DuplicateKeyError
+    token = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    try:
+        # 세마포어 문서가 없으면 만들고, 사용 중인 수가 한도 미만일 때만 증가 (한도에 도달했으면 upsert가 중복 키로 실패)
+        result = db.scan_schedule_slots.update_one(
+            {'_id': SCHEDULE_SLOTS_ID, 'used': {'$lt': max_concurrent}},
+            {
+                '$inc': {'used': 1},
+                '$push': {'holders': {
+                    'token': token,
+                    'holder': holder,
+                    'schedule_id': None,
+                    'scan_id': None,
+                    'acquired_at': now,
+                    'lease_expires_at': now + timedelta(seconds=lease),
+                }},
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    return token if result.matched_count or result.upserted_id else None
+
+def bind_schedule_slot(db, token: str, schedule_id: str) -> bool:
+    """
+    예약한 실행 자리를 예약에 연결합니다. 같은 예약의 이전 실행이 아직 자리를 갖고 있으면 False를 반환합니다.
+    """
+    result = db.scan_schedule_slots.update_one(
+        {'_id': SCHEDULE_SLOTS_ID, 'holders.schedule_id': {'$ne': schedule_id}},
+        {'$set': {'holders.$[slot].schedule_id': schedule_id}},
+        array_filters=[{'slot.token': token}]
+    )
+    return result.modified_count > 0
+
+def renew_schedule_slot(db, token: str, scan_id: Optional[str] = None,
+                        lease: float = SCAN_SCHEDULE_SLOT_LEASE) -> bool:
+    """
+    실행 자리의 점유 시간을 연장합니다. 이미 회수된 자리면 False를 반환합니다.
+    """
+    fields = {'holders.$.lease_expires_at': datetime.now(timezone.utc) + timedelta(seconds=lease)}
+    if scan_id:
+        fields['holders.$.scan_id'] = scan_id
+    result = db.scan_schedule_slots.update_one(
+        {'_id': SCHEDULE_SLOTS_ID, 'holders.token': token}, {'$set': fields}
+    )
+    return result.matched_count > 0
+
+def release_schedule_slot(db, token: str):
+    """
+    실행 자리를 반환합니다. 이미 반환되거나 회수된 자리는 무시합니다.
+    """
+    db.scan_schedule_slots.update_one(
+        {'_id': SCHEDULE_SLOTS_ID, 'holders.token': token},
+        {'$inc': {'used': -1}, '$pull': {'holders': {'token': token}}}
+    )
+
+def reap_schedule_slots(db) -> int:
+    """
+    점유 시간이 지난 실행 자리(중단된 실행기가 가지고 있던 자리)를 회수하고 회수한 수를 반환합니다.
+    """
+    now = datetime.now(timezone.utc)
+    slots = db.scan_schedule_slots.find_one({'_id': SCHEDULE_SLOTS_ID}, {'holders': 1})
+    reaped = 0
+    for slot in (slots or {}).get('holders', []):
+        if _as_utc(slot['lease_expires_at']) >= now:
+            continue
+        # 확인한 뒤 연장되었으면 회수하지 않음
+        result = db.scan_schedule_slots.update_one(
+            {'_id': SCHEDULE_SLOTS_ID,
+             'holders': {'$elemMatch': {'token': slot['token'], 'lease_expires_at': {'$lt': now}}}},
+            {'$inc': {'used': -1}, '$pull': {'holders': {'token': slot['token']}}}
+        )
+        if result.modified_count:
+            reaped += 1
+            logger.warning(f"점유 시간이 지난 예약 스캔 실행 자리 회수 [예약: {slot.get('schedule_id')}, "
+                           f"스캔: {slot.get('scan_id')}, 실행기: {slot.get('holder')}]")
+    return reaped
+
+class ScanScheduleRunner:
+    """
+    실행 시각이 된 예약을 찾아 스캔을 시작하는 백그라운드 스레드.
+    예약 스캔의 동시 실행 수가 한도에 도달하면 새 예약을 가져가지 않고, 밀린 예약은
+    자리가 나는 대로 예정 시각 순서로 시작합니다.
+    """
+
+    def __init__(self, db, max_concurrent: int = SCAN_SCHEDULE_MAX_CONCURRENT,
+                 poll_interval: float = SCAN_SCHEDULE_POLL_INTERVAL, lease: float = SCAN_SCHEDULE_SLOT_LEASE):
+        self.db = db
+        self.max_concurrent = max(1, max_concurrent)
+        self.poll_interval = poll_interval
+        # 폴링 사이에 점유 시간이 끝나지 않도록 폴링 간격보다 충분히 길게 유지
+        self.lease = max(lease, poll_interval * 3)
+        self.holder = default_worker_id()
+        self._slots: Dict[str, str] = {}  # 이 실행기가 가진 실행 자리 토큰 -> 스캔 ID
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scan-schedule-runner')
+            self._thread.daemon = True
+            self._thread.start()
+            logger.info(f"예약 스캔 실행기 시작: 최대 동시 실행 {self.max_concurrent}개")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"예약 스캔 확인 실패: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def run_due(self) -> List[str]:
+        """
+        실행 시각이 된 예약을 동시 실행 한도까지 시작하고, 시작한 스캔 ID 목록을 반환합니다.
+        """
+        self._refresh_slots()
+        reap_schedule_slots(self.db)
+        started = []
+        while not self._stop.is_set() and self._has_due():
+            # 예약을 가져가기 전에 실행 자리를 먼저 확보 (한도에 도달했으면 예약은 다음 폴링까지 그대로 둠)
+            token = acquire_schedule_slot(self.db, self.holder, self.max_concurrent, self.lease)
+            if token is None:
+                break
+            schedule = self._claim_due()
+            if schedule is None:
+                release_schedule_slot(self.db, token)
+                break
+            scan_id = self._start(schedule, token)
+            if scan_id:
+                started.append(scan_id)
+        return started
+
+    def _has_due(self) -> bool:
+        return self.db.scan_schedules.find_one(
+            {'enabled': True, 'next_run_at': {'$lte': datetime.now(timezone.utc)}}, {'_id': 1}
+        ) is not None
+
+    def _scan_finished(self, scan_id: str) -> bool:
+        if SCAN_QUEUE_BACKEND == 'mongo':
+            job = self.db.scan_jobs.find_one({'_id': scan_id}, {'status': 1})
+            return job is None or is_scan_finished(job['status'])
+        # 메모리 저장소에서 제거되는 작업은 끝난 작업뿐이므로 없으면 끝난 것으로 봄
+        task = scan_tasks.get(scan_id)
+        return task is None or is_scan_finished(task['status'])
+
+    def _refresh_slots(self):
+        """
+        끝난 예약 스캔의 실행 자리를 반환하고, 아직 실행 중인 스캔의 자리는 점유 시간을 연장합니다.
+        """
+        for token, scan_id in list(self._slots.items()):
+            try:
+                if self._scan_finished(scan_id):
+                    release_schedule_slot(self.db, token)
+                    del self._slots[token]
+                elif not renew_schedule_slot(self.db, token, lease=self.lease):
+                    logger.warning(f"예약 스캔 실행 자리가 회수되었습니다 [스캔: {scan_id}]")
+                    del self._slots[token]
+            except Exception as e:
+                logger.error(f"예약 스캔 실행 자리 갱신 실패 [스캔: {scan_id}]: {str(e)}")
+
+    def _claim_due(self) -> Optional[Dict]:
+        """
+        가장 먼저 예정된 실행 시각이 된 예약 하나를 가져오고 다음 실행 시각으로 넘깁니다.
+        """
+        from pymongo import ReturnDocument
+        now = datetime.now(timezone.utc)
+        while True:
+            schedule = self.db.scan_schedules.find_one(
+                {'enabled': True, 'next_run_at': {'$lte': now}}, sort=[('next_run_at', 1)]
+            )
+            if schedule is None:
+                return None
+            # 다른 인스턴스가 먼저 가져갔으면 next_run_at이 바뀌어 있으므로 다음 예약을 확인
+            scheduled_at, next_run_at = compute_next_run(schedule, schedule.get('scheduled_at'))
+            claimed = self.db.scan_schedules.find_one_and_update(
+                {'_id': schedule['_id'], 'next_run_at': schedule['next_run_at']},
+                {'$set': {'scheduled_at': scheduled_at, 'next_run_at': next_run_at, 'last_run_at': now},
+                 '$inc': {'runs': 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if claimed:
+                return claimed
+
+    def _start(self, schedule: Dict, token: str) -> Optional[str]:
+        """
+        예약의 스캔을 시작하고 scans에 기록합니다. 시작하면 실행 자리(token)를 스캔이 끝날 때까지 유지하고,
+        시작하지 않으면 바로 반환합니다.
+        """
+        # 같은 예약의 이전 스캔이 아직 실행 자리를 갖고 있으면 이번 실행은 건너뜀
+        if not bind_schedule_slot(self.db, token, schedule['_id']):
+            logger.info(f"이전 예약 스캔이 실행 중이어서 건너뜀 [예약: {schedule['_id']}]")
+            release_schedule_slot(self.db, token)
+            return None
+
+        scan_id = str(uuid.uuid4())
+        mode, target = schedule['mode'], schedule['target']
+        options = dict(schedule.get('options') or {})
+        baseline = find_stored_baseline(target) if mode == ScanMode.DIFF else None
+        try:
+            if SCAN_QUEUE_BACKEND == 'mongo':
+                result = enqueue_scan_job(scan_id, mode, target, options,
+                                          baseline_scan_id=baseline.get('scan_id') if baseline else None)
+            elif baseline:
+                result = start_scan_task(scan_id, mode, target, baseline=baseline, **options)
+            else:
+                result = start_scan_task(scan_id, mode, target, **options)
+        except (ScanQueueFullError, ValueError) as e:
+            logger.warning(f"예약 스캔 시작 실패 [예약: {schedule['_id']}]: {str(e)}")
+            release_schedule_slot(self.db, token)
+            return None
+
+        # 이미 실행 중인 동일 스캔에 연결된 경우에도 그 스캔이 끝날 때까지 자리를 유지
+        if is_scan_finished(result['status']):
+            release_schedule_slot(self.db, token)
+        else:
+            renew_schedule_slot(self.db, token, result['scan_id'], self.lease)
+            self._slots[token] = result['scan_id']
+
+        if not result.get('coalesced'):
+            self.db.scans.update_one(
+                {'_id': scan_id},
+                {
+                    '$setOnInsert': {
+                        '_id': scan_id,
+                        'target': target,
+                        'target_key': normalize_target(target),
+                        'mode': mode,
+                        'status': result['status'],
+                        'created_at': datetime.now(timezone.utc),
+                        'options': options,
+                        'cached': result.get('cached', False),
+                        'baseline_scan_id': baseline.get('scan_id') if baseline else None,
+                    },
+                    '$set': {'owner': schedule.get('owner'), 'schedule_id': schedule['_id']},
+                },
+                upsert=True
+            )
+        self.db.scan_schedules.update_one({'_id': schedule['_id']}, {'$set': {'last_scan_id': result['scan_id']}})
+        logger.info(f"예약 스캔 시작 [예약: {schedule['_id']}, ID: {result['scan_id']}]: {target} ({mode})")
+        return result['scan_id']
+
+# 앱에서 사용하는 예약 실행기 (create_app에서 시작)
+schedule_runner = None
+
+def start_schedule_runner(db) -> Optional[ScanScheduleRunner]:
+    """
+    예약 스캔 실행기를 시작합니다. SCAN_SCHEDULES_ENABLED가 false면 시작하지 않습니다.
+    """
+    global schedule_runner
+    if not SCAN_SCHEDULES_ENABLED:
+        return None
+    if schedule_runner is None:
+        schedule_runner = ScanScheduleRunner(db)
+    schedule_runner.start()
+    return schedule_runner
@@ -0,0 +1,164 @@
+# scan_simulator.py
+"""
+부하 테스트용 시뮬레이션 스캔 엔진
+
+nmap이나 네트워크 없이 원하는 크기(호스트 수, 호스트당 열린 포트 수)의 스캔 결과를 만들고,
+지연 시간 프로필과 실패율에 따라 호스트를 하나씩 내보냅니다. 결과는 실제 스캔과 같은 HostRecord/PortRecord이므로
+스캔 워커 풀, 결과 저장, 상태 조회 API를 실제 스캔과 같은 경로로 측정할 수 있습니다.
+
+이 모듈은 스캔 계획만 만들며, 대기(취소 확인 포함)와 진행률 보고는 scan.simulated_scan()이 담당합니다.
+"""
+import ipaddress
+import math
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .scan_records import HostRecord, PortRecord
+from .vuln_db import match_service_vulns
+
+SCAN_SIMULATION_ENABLED = os.environ.get('SCAN_SIMULATION_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SCAN_SIMULATION_MAX_HOSTS = int(os.environ.get('SCAN_SIMULATION_MAX_HOSTS', 65536))  # 작업 하나가 만들 수 있는 최대 호스트 수
+SCAN_SIMULATION_MAX_PORTS = int(os.environ.get('SCAN_SIMULATION_MAX_PORTS', 1000))   # 호스트당 최대 열린 포트 수
+SCAN_SIMULATION_DEFAULT_HOSTS = 256  # hosts를 지정하지 않았을 때 대상 주소 수의 상한
+
+# 지연 시간 프로필
+#   startup:      스캔 시작까지의 지연 (nmap 프로세스 실행, 호스트 탐색 등)
+#   latency:      호스트 결과 사이 간격의 중앙값 (초)
+#   jitter:       간격의 로그 정규 분포 표준편차 (0이면 고정 간격)
+#   failure_rate: 스캔이 도중에 실패할 확률
+SIMULATION_PROFILES = {
+    'instant': {'startup': 0.0, 'latency': 0.0, 'jitter': 0.0, 'failure_rate': 0.0},
+    'lan': {'startup': 0.2, 'latency': 0.02, 'jitter': 0.5, 'failure_rate': 0.0},
+    'wan': {'startup': 0.5, 'latency': 0.25, 'jitter': 0.8, 'failure_rate': 0.01},
+    'slow': {'startup': 1.0, 'latency': 2.0, 'jitter': 1.0, 'failure_rate': 0.02},
+    'flaky': {'startup': 0.5, 'latency': 0.25, 'jitter': 1.2, 'failure_rate': 0.2},
+}
+DEFAULT_SIMULATION_PROFILE = 'lan'
+
+# 결과에 사용할 서비스 목록 (포트, 서비스, 제품, 버전). 취약점 색인과 맞물리도록 실제 제품 이름을 사용
+SIMULATED_SERVICES = [
+    (22, 'ssh', 'OpenSSH', '8.2p1'),
+    (80, 'http', 'nginx', '1.18.0'),
+    (443, 'https', 'nginx', '1.18.0'),
+    (21, 'ftp', 'vsftpd', '3.0.3'),
+    (25, 'smtp', 'Postfix smtpd', ''),
+    (53, 'domain', 'dnsmasq', '2.80'),
+    (139, 'netbios-ssn', 'Samba smbd', '4.6.2'),
+    (445, 'microsoft-ds', '', ''),
+    (3306, 'mysql', 'MySQL', '8.0.28'),
+    (3389, 'ms-wbt-server', '', ''),
+    (5432, 'postgresql', 'PostgreSQL DB', '12.9'),
+    (8080, 'http-proxy', 'Apache httpd', '2.4.41'),
+]
+
+class SimulatedScanError(Exception):
+    """시뮬레이션 프로필의 실패율에 따라 스캔이 실패할 때 발생합니다."""
+    pass
+
+def _number(options: Dict, key: str, default: float, low: float, high: float) -> float:
+    value = options.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise ValueError(f"simulation.{key}는 {low}~{high} 범위의 숫자여야 합니다")
+    return value
+
+def parse_simulation_options(data: Optional[Dict]) -> Dict[str, Any]:
+    """
+    요청의 simulation 옵션을 검증하고 프로필 기본값을 채운 옵션을 반환합니다.
+
+    지원 옵션: profile, hosts, ports, startup, latency, jitter, failure_rate, seed
+
+    Raises:
+        ValueError: 지원하지 않는 프로필이나 범위를 벗어난 값
+    """
+    data = {} if data is None else data
+    if not isinstance(data, dict):
+        raise ValueError("simulation은 객체여야 합니다")
+    profile = data.get('profile', DEFAULT_SIMULATION_PROFILE)
+    if profile not in SIMULATION_PROFILES:
+        raise ValueError(f"지원하지 않는 시뮬레이션 프로필: {profile}. 지원되는 프로필: {', '.join(SIMULATION_PROFILES)}")
+    defaults = SIMULATION_PROFILES[profile]
+
+    options = {'profile': profile}
+    if data.get('hosts') is not None:
+        options['hosts'] = int(_number(data, 'hosts', 0, 1, SCAN_SIMULATION_MAX_HOSTS))
+    options['ports'] = int(_number(data, 'ports', 3, 0, SCAN_SIMULATION_MAX_PORTS))
+    options['startup'] = float(_number(data, 'startup', defaults['startup'], 0, 3600))
+    options['latency'] = float(_number(data, 'latency', defaults['latency'], 0, 3600))
+    options['jitter'] = float(_number(data, 'jitter', defaults['jitter'], 0, 5))
+    options['failure_rate'] = float(_number(data, 'failure_rate', defaults['failure_rate'], 0, 1))
+    if data.get('seed') is not None:
+        options['seed'] = int(_number(data, 'seed', 0, -2 ** 63, 2 ** 63 - 1))
+    return options
+
+def simulated_addresses(target: str, count: Optional[int] = None) -> List[str]:
+    """
+    대상의 첫 주소부터 이어지는 IPv4 주소 목록을 만듭니다.
+    count가 없으면 대상에 포함된 주소 수(최대 SCAN_SIMULATION_DEFAULT_HOSTS)만큼 만들며, 도메인은 10.0.0.1부터 시작합니다.
+    """
+    first = target.split()[0] if target.split() else ''
+    try:
+        network = ipaddress.IPv4Network(first, strict=False)
+        start = int(network.network_address) + (1 if network.num_addresses > 2 else 0)
+        available = network.num_addresses - (2 if network.num_addresses > 2 else 0)
+    except ValueError:
+        start, available = int(ipaddress.IPv4Address('10.0.0.1')), 1
+    if count is None:
+        count = min(available, SCAN_SIMULATION_DEFAULT_HOSTS)
+    count = min(count, int(ipaddress.IPv4Address('255.255.255.255')) - start + 1)
+    return [str(ipaddress.IPv4Address(start + offset)) for offset in range(count)]
+
+def simulated_host(rng: random.Random, ip: str, port_count: int) -> HostRecord:
+    """
+    열린 포트 port_count개를 가진 호스트 결과를 만듭니다. 앞쪽은 SIMULATED_SERVICES에서, 나머지는 임의의 높은 포트로 채웁니다.
+    """
+    known = rng.sample(SIMULATED_SERVICES, min(port_count, len(SIMULATED_SERVICES)))
+    used = {service[0] for service in known}
+    extra = []
+    while len(known) + len(extra) < port_count:
+        port = rng.randint(1024, 65535)
+        if port not in used:
+            used.add(port)
+            extra.append((port, 'unknown', '', ''))
+    ports = [
+        PortRecord(port, 'tcp', 'open', service, product, version,
+                   vulns=match_service_vulns(product, version) if product else ())
+        for port, service, product, version in sorted(known + extra)
+    ]
+    return HostRecord(
+        hostname=f"sim-{ip.replace('.', '-')}",
+        state='up',
+        ip=ip,
+        ports=ports,
+        os={'name': 'Linux 5.x (simulated)', 'accuracy': 90, 'version': '5.x'},
+        lastScanTime=time.strftime('%Y-%m-%d %H:%M:%S'),
+    )
+
+def plan_simulated_scan(target: str, options: Dict) -> Tuple[float, int, Optional[int], Iterator[Tuple[float, HostRecord]]]:
+    """
+    시뮬레이션 스캔 계획을 만듭니다.
+
+    Returns:
+        (시작 지연(초), 호스트 수, 실패할 호스트 순번 또는 None, (대기 시간, 호스트 결과)를 차례로 내보내는 이터레이터)
+        이터레이터는 호스트를 필요할 때 하나씩 만들므로 큰 결과도 미리 메모리에 만들지 않습니다.
+    """
+    options = options if 'startup' in options else parse_simulation_options(options)
+    rng = random.Random(options.get('seed'))
+    addresses = simulated_addresses(target, options.get('hosts'))
+    fail_at = rng.randrange(len(addresses) + 1) if rng.random() < options['failure_rate'] else None
+
+    def delay(median: float) -> float:
+        if median <= 0:
+            return 0.0
+        if options['jitter'] <= 0:
+            return median
+        return rng.lognormvariate(math.log(median), options['jitter'])
+
+    def hosts() -> Iterator[Tuple[float, HostRecord]]:
+        for ip in addresses:
+            # 호스트마다 시드를 나누어 같은 seed면 지연 분포와 관계없이 같은 결과가 나오도록 함
+            host_rng = random.Random(f"{options.get('seed')}:{ip}") if 'seed' in options else rng
+            yield delay(options['latency']), simulated_host(host_rng, ip, options['ports'])
+
+    return delay(options['startup']), len(addresses), fail_at, hosts()
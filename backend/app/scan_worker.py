@@ -0,0 +1,249 @@
+# scan_worker.py
+"""
+MongoDB 공유 대기열(scan_jobs)의 스캔 작업을 실행하는 워커
+
+API 프로세스가 SCAN_QUEUE_BACKEND=mongo로 실행되면 스캔 요청은 scan_jobs 컬렉션에 등록만 되고,
+이 워커가 작업을 점유해 quick_scan/full_scan/custom_scan 등 기존 스캔 경로(start_scan_task)로 실행합니다.
+실행 중에는 점유 시간을 하트비트로 연장하면서 진행 상황을 scans 문서에 기록하므로
+어느 API 인스턴스에서든 같은 스캔의 상태를 조회할 수 있습니다.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from .scan import (
+    ScanMode, ScanStatus, SCAN_MAX_WORKERS, SCAN_JOB_LEASE, SCAN_JOB_POLL_INTERVAL, SCAN_JOB_MAX_ATTEMPTS,
+    start_scan_task, cancel_scan, get_scan_status, is_scan_finished, scan_tasks, scan_result_writer, scan_scheduler,
+    claim_scan_job, heartbeat_scan_job, finish_scan_job, release_scan_job, reap_cancelled_scan_jobs,
+    stored_result_projection, unpack_scan_result, record_scan_completion
+)
+
+logger = logging.getLogger('app.scan_worker')
+
+def default_worker_id() -> str:
+    """호스트 이름과 프로세스 ID로 워커 ID를 만듭니다."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class ScanWorker:
+    """
+    공유 대기열에서 작업을 점유해 실행하는 워커.
+    동시에 최대 capacity개의 작업을 이 프로세스의 스캔 워커 풀에서 실행합니다.
+    점유한 작업이 로컬 대기열에서 기다리는 동안 하트비트로 점유를 계속 연장하면 다른 워커가 가져갈 수 없으므로,
+    capacity는 워커 풀 크기(SCAN_MAX_WORKERS)를 넘지 않고 빈 워커가 있을 때만 새 작업을 점유합니다.
+    """
+
+    def __init__(self, db, worker_id: Optional[str] = None, capacity: int = SCAN_MAX_WORKERS,
+                 lease: float = SCAN_JOB_LEASE, poll_interval: float = SCAN_JOB_POLL_INTERVAL):
+        self.db = db
+        self.worker_id = worker_id or default_worker_id()
+        self.capacity = max(1, min(capacity, scan_scheduler.max_workers))
+        if capacity > self.capacity:
+            logger.warning(f"동시 실행 수 {capacity}개가 스캔 워커 풀 크기보다 커서 {self.capacity}개로 제한합니다 "
+                           f"(SCAN_MAX_WORKERS로 워커 풀 크기 지정)")
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._jobs: Dict[str, float] = {}  # 실행 중인 작업 ID -> 마지막 하트비트 시각
+        self._stop = threading.Event()
+
+    def stop(self):
+        """새 작업을 더 가져오지 않고 run()을 끝내도록 요청합니다."""
+        self._stop.set()
+
+    def run(self):
+        """
+        stop()이 호출될 때까지 작업을 점유, 실행, 하트비트, 정리하는 루프를 실행합니다.
+        종료 시 끝내지 못한 작업은 취소하지 않고 대기 상태로 되돌려 다른 워커가 이어서 실행하게 합니다.
+        """
+        logger.info(f"스캔 워커 시작 [{self.worker_id}]: 동시 실행 {self.capacity}개, 점유 시간 {self.lease}초")
+        try:
+            while not self._stop.is_set():
+                self._reap()
+                self._check_requests()
+                self._heartbeat()
+                self._reap_cancelled()
+                self._claim()
+                self._stop.wait(self.poll_interval)
+        finally:
+            self._shutdown()
+        logger.info(f"스캔 워커 종료 [{self.worker_id}]")
+
+    def _claim(self):
+        # 이 프로세스의 로컬 대기열에 들어가 기다릴 작업은 점유하지 않음
+        while len(self._jobs) < self.capacity and scan_scheduler.idle_slots() > 0 and not self._stop.is_set():
+            try:
+                job = claim_scan_job(self.worker_id, self.lease)
+            except Exception as e:
+                logger.error(f"작업 점유 실패: {str(e)}")
+                return
+            if job is None:
+                return
+            self._start(job)
+
+    def _start(self, job: Dict):
+        scan_id = job['_id']
+        if job['attempts'] > SCAN_JOB_MAX_ATTEMPTS:
+            # 여러 워커에서 반복해서 중단된 작업은 다시 시도하지 않음
+            self._fail(job, f"최대 시도 횟수({SCAN_JOB_MAX_ATTEMPTS}회)를 넘었습니다")
+            return
+        options = dict(job.get('options') or {})
+        if job['mode'] == ScanMode.DIFF and job.get('baseline_scan_id'):
+            options['baseline'] = self._load_baseline(job['baseline_scan_id'])
+        try:
+            # 같은 ID로 이전 시도의 작업이 메모리에 남아 있으면 새로 실행
+            if scan_id in scan_tasks:
+                del scan_tasks[scan_id]
+            start_scan_task(scan_id, job['mode'], job['target'], coalesce=False, **options)
+        except Exception as e:
+            logger.error(f"작업 실행 실패 [ID: {scan_id}]: {str(e)}")
+            self._fail(job, str(e))
+            return
+        self._jobs[scan_id] = 0
+        logger.info(f"작업 점유 [ID: {scan_id}]: {job['target']} ({job['mode']}, {job['attempts']}번째 시도)")
+
+    def _load_baseline(self, baseline_scan_id: str) -> Optional[Dict]:
+        try:
+            doc = self.db.scans.find_one({'_id': baseline_scan_id}, stored_result_projection(['scan_info', 'hosts']))
+            if doc:
+                return dict(unpack_scan_result(doc, ['scan_info', 'hosts']), scan_id=doc['_id'])
+        except Exception as e:
+            logger.error(f"증분 스캔 기준 결과 조회 실패 [ID: {baseline_scan_id}]: {str(e)}")
+        return None
+
+    def _fail(self, job: Dict, error: str):
+        now = time.time()
+        try:
+            record_scan_completion({
+                'id': job['_id'], 'target': job['target'], 'mode': job['mode'], 'status': ScanStatus.FAILED,
+                'start_time': job['enqueued_at'], 'end_time': now, 'result': None, 'error': error,
+            })
+        finally:
+            finish_scan_job(job['_id'], self.worker_id, ScanStatus.FAILED, error)
+
+    def _heartbeat(self):
+        now = time.time()
+        for scan_id, last in list(self._jobs.items()):
+            if now - last < self.lease / 3:
+                continue
+            task = scan_tasks.get(scan_id)
+            if task is None or is_scan_finished(task['status']):
+                continue
+            progress = {'status': task['status'], 'hosts_found': len(task.get('partial_hosts', []))}
+            if task.get('progress'):
+                progress['progress'] = dict(task['progress'])
+            try:
+                job = heartbeat_scan_job(scan_id, self.worker_id, progress, self.lease)
+            except Exception as e:
+                # 일시적인 DB 오류는 다음 주기에 다시 시도 (점유 시간 안에 복구되면 계속 실행)
+                logger.error(f"하트비트 실패 [ID: {scan_id}]: {str(e)}")
+                continue
+            self._jobs[scan_id] = now
+            if job is None:
+                logger.warning(f"다른 워커가 작업을 가져가 실행을 중단합니다 [ID: {scan_id}]")
+                self._jobs.pop(scan_id)
+                self._abandon(scan_id)
+            elif job.get('cancel_requested'):
+                logger.info(f"취소 요청된 작업 중단 [ID: {scan_id}]")
+                cancel_scan(scan_id, wait=1.0)
+
+    def _check_requests(self):
+        """
+        실행 중인 작업의 취소 요청과 점유 상실을 폴링 주기마다 확인합니다.
+        하트비트(점유 시간의 1/3마다)를 기다리지 않고 한 번의 조회로 모든 작업을 확인합니다.
+        """
+        if not self._jobs:
+            return
+        try:
+            jobs = list(self.db.scan_jobs.find(
+                {'_id': {'$in': list(self._jobs)},
+                 '$or': [{'cancel_requested': True}, {'lease_owner': {'$ne': self.worker_id}}]},
+                {'cancel_requested': 1, 'lease_owner': 1}
+            ))
+        except Exception as e:
+            logger.error(f"취소 요청 확인 실패: {str(e)}")
+            return
+        for job in jobs:
+            scan_id = job['_id']
+            if job.get('lease_owner') != self.worker_id:
+                logger.warning(f"다른 워커가 작업을 가져가 실행을 중단합니다 [ID: {scan_id}]")
+                self._jobs.pop(scan_id, None)
+                self._abandon(scan_id)
+            else:
+                task = scan_tasks.get(scan_id)
+                if task is not None and not is_scan_finished(task['status']):
+                    logger.info(f"취소 요청된 작업 중단 [ID: {scan_id}]")
+                    cancel_scan(scan_id, wait=1.0)
+
+    def _reap_cancelled(self):
+        try:
+            reap_cancelled_scan_jobs()
+        except Exception as e:
+            logger.error(f"취소 요청된 작업 정리 실패: {str(e)}")
+
+    def _finished_status(self, scan_id: str) -> Optional[Dict]:
+        """
+        끝난 작업의 최종 상태를 반환합니다. 메모리 저장소에서 이미 제거된 작업은
+        저장된 기록(get_scan_status)에서 확인하며, 최종 상태를 확인할 수 없으면 None을 반환합니다.
+        """
+        task = scan_tasks.get(scan_id)
+        if task is not None:
+            return {'status': task['status'], 'error': task.get('error')}
+        try:
+            stored = get_scan_status(scan_id, fields=[])
+        except ValueError:
+            return None
+        return stored if is_scan_finished(stored.get('status')) else None
+
+    def _reap(self):
+        finished = [
+            scan_id for scan_id in self._jobs
+            if scan_id not in scan_tasks or is_scan_finished(scan_tasks[scan_id]['status'])
+        ]
+        if not finished:
+            return
+        # 결과가 scans 문서에 기록된 뒤에 작업을 끝냄
+        scan_result_writer.flush()
+        for scan_id in finished:
+            self._jobs.pop(scan_id)
+            try:
+                outcome = self._finished_status(scan_id)
+                if outcome is None:
+                    # 결과를 잃어버린 작업은 완료로 기록하지 않고 실패 처리
+                    job = self.db.scan_jobs.find_one({'_id': scan_id})
+                    if job is not None:
+                        self._fail(job, "워커에서 작업 결과를 찾을 수 없습니다")
+                    logger.error(f"작업 결과를 찾을 수 없어 실패 처리 [ID: {scan_id}]")
+                    continue
+                finish_scan_job(scan_id, self.worker_id, outcome['status'], outcome.get('error'))
+            except Exception as e:
+                logger.error(f"작업 완료 기록 실패 [ID: {scan_id}]: {str(e)}")
+                continue
+            logger.info(f"작업 완료 [ID: {scan_id}]: {outcome['status']}")
+
+    def _shutdown(self):
+        self._reap()
+        for scan_id in list(self._jobs):
+            try:
+                release_scan_job(scan_id, self.worker_id)
+                self.db.scans.update_one(
+                    {'_id': scan_id, 'status': ScanStatus.RUNNING},
+                    {'$set': {'status': ScanStatus.QUEUED}, '$unset': {'worker': '', 'progress': ''}}
+                )
+            except Exception as e:
+                logger.error(f"작업 반환 실패 [ID: {scan_id}]: {str(e)}")
+            logger.info(f"끝내지 못한 작업을 대기열로 반환 [ID: {scan_id}]")
+            self._abandon(scan_id)
+        self._jobs.clear()
+
+    def _abandon(self, scan_id: str):
+        """
+        다른 워커가 이어서 실행할 작업을 이 프로세스에서 중단합니다.
+        중단된 부분 결과가 scans 문서를 덮어쓰지 않도록 저장된 것으로 표시합니다.
+        """
+        task = scan_tasks.get(scan_id)
+        if task is None or is_scan_finished(task['status']):
+            return
+        task['persisted'] = True
+        cancel_scan(scan_id, wait=1.0)
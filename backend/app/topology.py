@@ -0,0 +1,286 @@
+# topology.py
+"""
+스캔 결과로 네트워크 토폴로지 그래프를 만드는 모듈
+
+호스트, 서비스(열린 포트), 서브넷(/24), traceroute 경유 라우터를 Cytoscape.js의 elements 형식
+({'nodes': [{'data': {...}}], 'edges': [{'data': {...}}]})으로 만들어 브라우저가 원시 결과를 받아
+그래프를 다시 만들지 않도록 합니다.
+
+그래프는 스캔별로 캐시되며, 스캔 상태/발견 호스트 수로 만든 버전이 바뀌면 다시 만듭니다.
+끝난 스캔의 그래프는 MongoDB scan_topology 컬렉션에도 압축해 저장하므로 다른 인스턴스나 재시작 후에도 재사용됩니다.
+"""
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .scan import get_scan_database, get_scan_status, is_scan_finished
+from .vuln_db import SEVERITY_ORDER
+
+logger = logging.getLogger('app.topology')
+
+TOPOLOGY_CACHE_MAX_ENTRIES = int(os.environ.get('TOPOLOGY_CACHE_MAX_ENTRIES', 32))  # 메모리에 캐시할 최대 그래프 수
+TOPOLOGY_SUBNET_PREFIX = int(os.environ.get('TOPOLOGY_SUBNET_PREFIX', 24))          # 호스트를 묶을 서브넷 크기
+
+# 응답에 포함할 수 있는 계층: 계층 이름 -> (노드 type, 엣지 kind). 호스트 노드는 항상 포함
+TOPOLOGY_LAYERS = {
+    'subnets': ({'subnet'}, {'member'}),
+    'services': ({'service'}, {'service'}),
+    'routes': ({'router', 'scanner'}, {'route'}),
+}
+DEFAULT_TOPOLOGY_LAYERS = frozenset({'subnets', 'routes'})
+
+SCANNER_NODE_ID = 'scanner'
+
+def _compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """값이 없는 속성은 응답 크기를 줄이기 위해 뺍니다."""
+    return {key: value for key, value in data.items() if value not in (None, '', [], {})}
+
+def _subnet_of(ip: str) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_network(f"{ip}/{TOPOLOGY_SUBNET_PREFIX}", strict=False))
+    except ValueError:
+        return None
+
+def build_topology(hosts: Iterable) -> Dict[str, Any]:
+    """
+    호스트 결과 목록(HostRecord 또는 딕셔너리)으로 전체 그래프를 만듭니다.
+
+    Returns:
+        {'nodes': [...], 'edges': [...], 'stats': {...}} (Cytoscape elements 형식)
+    """
+    nodes: Dict[str, Dict] = OrderedDict()
+    edges: Dict[Tuple[str, str], Dict] = OrderedDict()
+    subnet_hosts: Dict[str, int] = {}
+    host_ids: Dict[str, str] = {}
+    traces = []
+
+    for host in hosts:
+        ip = host.get('ip')
+        if not ip:
+            continue
+        host_id = f"host:{ip}"
+        host_ids[ip] = host_id
+        open_ports = [port for port in host.get('ports') or [] if port.get('state') == 'open']
+        vulns = [vuln for port in open_ports for vuln in port.get('vulns') or ()]
+        max_severity = max((vuln.get('severity', '') for vuln in vulns),
+                           key=lambda severity: SEVERITY_ORDER.get(severity, -1), default=None)
+        os_info = host.get('os') or {}
+        nodes[host_id] = _compact({
+            'id': host_id,
+            'type': 'host',
+            'name': host.get('hostname') or ip,
+            'ip': ip,
+            'state': host.get('state'),
+            'os': os_info.get('name'),
+            'mac': host.get('mac'),
+            'macVendor': host.get('macVendor'),
+            'distance': host.get('distance'),
+            'openPorts': len(open_ports),
+            'vulns': len({vuln.get('id') for vuln in vulns}),
+            'maxSeverity': max_severity,
+        })
+
+        subnet = _subnet_of(ip)
+        if subnet:
+            subnet_id = f"subnet:{subnet}"
+            subnet_hosts[subnet_id] = subnet_hosts.get(subnet_id, 0) + 1
+            edges[(host_id, subnet_id)] = {'id': f"{host_id}>{subnet_id}", 'source': host_id,
+                                           'target': subnet_id, 'kind': 'member'}
+
+        for port in open_ports:
+            service_id = f"svc:{ip}:{port.get('protocol')}/{port.get('port')}"
+            nodes[service_id] = _compact({
+                'id': service_id,
+                'type': 'service',
+                'name': f"{port.get('port')}/{port.get('protocol')} {port.get('service') or ''}".strip(),
+                'parent_host': host_id,
+                'port': port.get('port'),
+                'protocol': port.get('protocol'),
+                'service': port.get('service'),
+                'product': port.get('product'),
+                'version': port.get('version'),
+                'cves': [vuln.get('id') for vuln in port.get('vulns') or ()],
+            })
+            edges[(host_id, service_id)] = {'id': f"{host_id}>{service_id}", 'source': host_id,
+                                            'target': service_id, 'kind': 'service'}
+
+        if host.get('trace'):
+            traces.append((host_id, host['trace']))
+
+    for subnet_id, count in subnet_hosts.items():
+        nodes[subnet_id] = {'id': subnet_id, 'type': 'subnet', 'name': subnet_id.split(':', 1)[1], 'hosts': count}
+
+    # traceroute 경로: 스캐너 -> 경유 라우터 ... -> 호스트. 같은 구간은 한 번만 추가
+    routers = 0
+    if traces:
+        nodes[SCANNER_NODE_ID] = {'id': SCANNER_NODE_ID, 'type': 'scanner', 'name': 'Scanner'}
+    for host_id, trace in traces:
+        previous = SCANNER_NODE_ID
+        for hop in sorted(trace, key=lambda hop: hop.get('ttl', 0)):
+            hop_ip = hop.get('ip')
+            if not hop_ip:
+                # 응답이 없는 홉은 건너뛰고 앞뒤 홉을 연결
+                continue
+            hop_id = host_ids.get(hop_ip) or f"router:{hop_ip}"
+            if hop_id not in nodes:
+                routers += 1
+                nodes[hop_id] = _compact({'id': hop_id, 'type': 'router', 'name': hop.get('host') or hop_ip,
+                                          'ip': hop_ip})
+            if hop_id != previous and (previous, hop_id) not in edges:
+                edges[(previous, hop_id)] = _compact({'id': f"{previous}>{hop_id}", 'source': previous,
+                                                      'target': hop_id, 'kind': 'route', 'rtt': hop.get('rtt')})
+            previous = hop_id
+        if previous != host_id and (previous, host_id) not in edges:
+            edges[(previous, host_id)] = {'id': f"{previous}>{host_id}", 'source': previous,
+                                          'target': host_id, 'kind': 'route'}
+
+    return {
+        'nodes': [{'data': data} for data in nodes.values()],
+        'edges': [{'data': data} for data in edges.values()],
+        'stats': {
+            'hosts': len(host_ids),
+            'subnets': len(subnet_hosts),
+            'services': sum(1 for data in nodes.values() if data['type'] == 'service'),
+            'routers': routers,
+            'edges': len(edges),
+        },
+    }
+
+def select_layers(graph: Dict[str, Any], layers: FrozenSet[str]) -> Dict[str, Any]:
+    """
+    전체 그래프에서 요청한 계층의 노드/엣지만 남깁니다. (호스트 노드는 항상 포함)
+    """
+    node_types, edge_kinds = {'host'}, set()
+    for layer in layers:
+        types, kinds = TOPOLOGY_LAYERS[layer]
+        node_types |= types
+        edge_kinds |= kinds
+    return {
+        'nodes': [node for node in graph['nodes'] if node['data']['type'] in node_types],
+        'edges': [edge for edge in graph['edges'] if edge['data']['kind'] in edge_kinds],
+        'stats': graph['stats'],
+    }
+
+def topology_version(status: Dict) -> str:
+    """
+    그래프가 바뀌었는지 판단할 버전. 끝난 스캔은 종료 시각으로, 실행 중인 스캔은 발견한 호스트 수로 정합니다.
+    """
+    raw = f"{status['status']}:{status.get('end_time')}:{status.get('hosts_found', '')}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+class TopologyCache:
+    """
+    스캔별 그래프 캐시. 항목은 (버전, 전체 그래프, 계층별 그래프)이며 가장 오래 사용하지 않은 항목부터 제거합니다.
+    """
+
+    def __init__(self, max_entries: int = TOPOLOGY_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scan_id: str, version: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(scan_id)
+            if entry is None or entry['version'] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(scan_id)
+            self.hits += 1
+            return entry
+
+    def put(self, scan_id: str, version: str, graph: Dict) -> Dict:
+        entry = {'version': version, 'graph': graph, 'layers': {}}
+        with self._lock:
+            self._entries[scan_id] = entry
+            self._entries.move_to_end(scan_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, scan_id: str):
+        with self._lock:
+            self._entries.pop(scan_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+# 전역 토폴로지 캐시
+topology_cache = TopologyCache()
+
+def _load_stored_topology(scan_id: str, version: str) -> Optional[Dict]:
+    db = get_scan_database()
+    if db is None:
+        return None
+    try:
+        doc = db.scan_topology.find_one({'_id': scan_id, 'version': version})
+        if doc:
+            return json.loads(zlib.decompress(doc['graph']))
+    except Exception as e:
+        logger.error(f"저장된 토폴로지 조회 실패 [ID: {scan_id}]: {str(e)}")
+    return None
+
+def _store_topology(scan_id: str, version: str, graph: Dict):
+    db = get_scan_database()
+    if db is None:
+        return
+    try:
+        blob = zlib.compress(json.dumps(graph, separators=(',', ':')).encode('utf-8'))
+        db.scan_topology.replace_one(
+            {'_id': scan_id}, {'_id': scan_id, 'version': version, 'graph': blob}, upsert=True
+        )
+    except Exception as e:
+        logger.error(f"토폴로지 저장 실패 (무시됨) [ID: {scan_id}]: {str(e)}")
+
+def get_scan_topology(scan_id: str, layers: FrozenSet[str] = DEFAULT_TOPOLOGY_LAYERS) -> Tuple[Dict, str, Dict]:
+    """
+    스캔의 토폴로지 그래프를 반환합니다. 캐시된 그래프의 버전이 현재 결과와 같으면 다시 만들지 않습니다.
+
+    Returns:
+        (계층을 고른 그래프, 버전, 상태 정보)
+
+    Raises:
+        ValueError: 존재하지 않는 스캔 ID
+    """
+    status = get_scan_status(scan_id, fields=[], raw=True)
+    version = topology_version(status)
+    entry = topology_cache.get(scan_id, version)
+    if entry is None:
+        finished = is_scan_finished(status['status'])
+        graph = _load_stored_topology(scan_id, version) if finished else None
+        if graph is None:
+            full = get_scan_status(scan_id, fields=['hosts'], raw=True)
+            hosts = (full.get('result') or full.get('partial_result') or {}).get('hosts') or []
+            graph = build_topology(hosts)
+            if finished:
+                _store_topology(scan_id, version, graph)
+        entry = topology_cache.put(scan_id, version, graph)
+
+    key = frozenset(layers)
+    selected = entry['layers'].get(key)
+    if selected is None:
+        selected = entry['layers'][key] = select_layers(entry['graph'], key)
+    return selected, version, status
+
+def parse_topology_layers(value: Optional[str]) -> FrozenSet[str]:
+    """
+    include 파라미터(쉼표 구분 계층 목록)를 검증합니다. 비어 있으면 기본 계층을 사용합니다.
+
+    Raises:
+        ValueError: 지원하지 않는 계층 이름
+    """
+    if value is None:
+        return DEFAULT_TOPOLOGY_LAYERS
+    layers = frozenset(layer.strip() for layer in value.split(',') if layer.strip())
+    unknown = layers - set(TOPOLOGY_LAYERS)
+    if unknown:
+        raise ValueError(f"지원하지 않는 계층: {', '.join(sorted(unknown))}. 지원되는 계층: {', '.join(TOPOLOGY_LAYERS)}")
+    return layers
@@ -0,0 +1,476 @@
+# vuln_db.py
+"""
+오프라인 취약점(CVE) 데이터베이스
+
+로컬 피드 파일(NVD JSON 1.1/2.0 또는 간단한 자체 형식, .gz 가능)을 읽어 제품별 버전 구간 색인을 만들고,
+스캔 결과의 서비스(CPE 또는 nmap 제품 이름 + 버전)에 해당하는 CVE를 네트워크 없이 찾습니다.
+
+색인 구조:
+    제품 키("vendor:product")마다 피드에 나온 모든 버전 경계를 정렬해 두고, 경계 사이 구간과 경계 지점마다
+    해당하는 CVE 목록을 미리 계산합니다. 조회는 버전 경계에 대한 이진 탐색 한 번이므로
+    한 제품의 CVE 수와 관계없이 O(log n)이며, 같은 (제품, 버전) 조회는 캐시됩니다.
+    만든 색인은 피드 옆에 JSON으로 저장해 다음 실행부터는 피드를 다시 파싱하지 않습니다.
+    (색인 파일을 바꿔 코드가 실행되지 않도록 pickle은 사용하지 않음)
+
+자체 피드 형식 (JSON 목록):
+    [{"id": "CVE-2018-15473", "vendor": "openbsd", "product": "openssh", "severity": "MEDIUM", "cvss": 5.3,
+      "versions": [{"end": "7.7", "end_inclusive": true}]}, ...]
+    versions의 각 항목은 "version"(정확한 버전) 또는 start/end(+ start_inclusive/end_inclusive, 기본값 true/false)이며,
+    비어 있으면 모든 버전이 해당됩니다. "aliases"로 nmap 제품 이름을 추가로 지정할 수 있습니다.
+"""
+import bisect
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger('app.vuln_db')
+
+VULN_DB_ENABLED = os.environ.get('VULN_DB_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+VULN_DB_PATH = os.environ.get(
+    'VULN_DB_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'vuln_feed.json')
+)
+VULN_DB_LOOKUP_CACHE = int(os.environ.get('VULN_DB_LOOKUP_CACHE', 8192))  # (제품, 버전) 조회 결과 캐시 크기
+
+# 색인 파일 형식이 바뀌면 올려서 이전 색인을 다시 만들도록 함
+INDEX_FORMAT_VERSION = 2
+
+# nmap 제품 이름(소문자) -> CPE vendor:product (CPE가 없는 서비스 조회용)
+PRODUCT_ALIASES = {
+    'apache httpd': 'apache:http_server',
+    'apache tomcat': 'apache:tomcat',
+    'apache tomcat/coyote jsp engine': 'apache:tomcat',
+    'nginx': 'f5:nginx',
+    'openssh': 'openbsd:openssh',
+    'dropbear sshd': 'dropbear_ssh_project:dropbear_ssh',
+    'vsftpd': 'vsftpd_project:vsftpd',
+    'proftpd': 'proftpd:proftpd',
+    'pure-ftpd': 'pureftpd:pure-ftpd',
+    'microsoft iis httpd': 'microsoft:internet_information_services',
+    'microsoft ftpd': 'microsoft:internet_information_services',
+    'isc bind': 'isc:bind',
+    'dnsmasq': 'thekelleys:dnsmasq',
+    'mysql': 'oracle:mysql',
+    'mariadb': 'mariadb:mariadb',
+    'postgresql db': 'postgresql:postgresql',
+    'redis key-value store': 'redis:redis',
+    'mongodb': 'mongodb:mongodb',
+    'samba smbd': 'samba:samba',
+    'exim smtpd': 'exim:exim',
+    'postfix smtpd': 'postfix:postfix',
+    'lighttpd': 'lighttpd:lighttpd',
+    'squid http proxy': 'squid-cache:squid',
+    'openssl': 'openssl:openssl',
+    'elasticsearch rest api': 'elastic:elasticsearch',
+    'jetty': 'eclipse:jetty',
+}
+
+SEVERITY_ORDER = {'NONE': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'CRITICAL': 4}
+
+VERSION_TOKEN_REGEX = re.compile(r'\d+|[a-z]+')
+SERVICE_VERSION_REGEX = re.compile(r'\d+(?:\.\d+)*(?:[a-z]+\d*)?', re.IGNORECASE)
+
+def version_key(version: str) -> Tuple:
+    """
+    버전 문자열을 비교 가능한 튜플로 변환합니다. (예: '7.4p1' -> ((7, ''), (4, ''), (-1, 'p'), (1, '')))
+    숫자는 숫자로 비교하고, 문자는 같은 위치의 숫자보다 작게 취급합니다.
+    """
+    return tuple(
+        (int(token), '') if token.isdigit() else (-1, token)
+        for token in VERSION_TOKEN_REGEX.findall(version.lower())
+    )
+
+def product_key(vendor: str, product: str) -> str:
+    """CPE vendor/product를 색인 키로 정규화합니다."""
+    return f"{(vendor or '*').lower()}:{product.lower()}"
+
+def normalize_product_name(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+def severity_from_cvss(score: Optional[float]) -> str:
+    """CVSS v3 기준 점수로 심각도를 정합니다."""
+    if score is None:
+        return 'UNKNOWN'
+    if score >= 9.0:
+        return 'CRITICAL'
+    if score >= 7.0:
+        return 'HIGH'
+    if score >= 4.0:
+        return 'MEDIUM'
+    if score > 0:
+        return 'LOW'
+    return 'NONE'
+
+def parse_cpe(cpe: str) -> Optional[Tuple[str, str, str, str]]:
+    """
+    CPE 2.2 URI(cpe:/a:vendor:product:version) 또는 CPE 2.3 문자열을 (part, vendor, product, version)으로 분리합니다.
+    """
+    if not cpe:
+        return None
+    if cpe.startswith('cpe:2.3:'):
+        fields = cpe[8:].split(':')
+    elif cpe.startswith('cpe:/'):
+        fields = cpe[5:].split(':')
+    else:
+        return None
+    if len(fields) < 3:
+        return None
+    version = fields[3] if len(fields) > 3 else '*'
+    return fields[0], fields[1].replace('\\', ''), fields[2].replace('\\', ''), version.replace('\\', '') or '*'
+
+# 피드 파싱: (vendor:product 키, CVE 정보, 버전 구간 목록, 별칭) 생성
+
+def _open_feed(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+def _nvd_range(match: Dict, version: str) -> Optional[Dict]:
+    """NVD cpe_match 항목의 버전 조건을 버전 구간으로 변환합니다. (버전 구분이 불가능하면 None)"""
+    interval = {}
+    if match.get('versionStartIncluding'):
+        interval.update(start=match['versionStartIncluding'], start_inclusive=True)
+    elif match.get('versionStartExcluding'):
+        interval.update(start=match['versionStartExcluding'], start_inclusive=False)
+    if match.get('versionEndIncluding'):
+        interval.update(end=match['versionEndIncluding'], end_inclusive=True)
+    elif match.get('versionEndExcluding'):
+        interval.update(end=match['versionEndExcluding'], end_inclusive=False)
+    if interval:
+        return interval
+    if version == '-':
+        # 버전 개념이 없는 항목은 버전으로 구분할 수 없으므로 제외
+        return None
+    if version == '*':
+        return {}
+    return {'version': version}
+
+def _walk_nvd_nodes(nodes: List[Dict], match_key: str, uri_key: str) -> Iterator[Tuple[str, Dict]]:
+    for node in nodes or []:
+        for match in node.get(match_key, []):
+            if not match.get('vulnerable', True):
+                continue
+            cpe = parse_cpe(match.get(uri_key, ''))
+            # 포트의 서비스와 비교하므로 응용 프로그램(a) CPE만 색인 (OS/하드웨어는 버전 구간이 많아 색인만 커짐)
+            if not cpe or cpe[0] != 'a':
+                continue
+            interval = _nvd_range(match, cpe[3])
+            if interval is not None:
+                yield product_key(cpe[1], cpe[2]), interval
+        yield from _walk_nvd_nodes(node.get('children', []), match_key, uri_key)
+
+def _nvd11_entries(items: List[Dict]) -> Iterator[Tuple[str, Dict, Dict]]:
+    """NVD JSON 1.1 피드(CVE_Items)의 항목을 읽습니다."""
+    for item in items:
+        cve_id = item.get('cve', {}).get('CVE_data_meta', {}).get('ID')
+        if not cve_id:
+            continue
+        impact = item.get('impact', {})
+        v3 = impact.get('baseMetricV3', {}).get('cvssV3', {})
+        v2 = impact.get('baseMetricV2', {})
+        score = v3.get('baseScore', v2.get('cvssV2', {}).get('baseScore'))
+        severity = v3.get('baseSeverity') or v2.get('severity') or severity_from_cvss(score)
+        info = {'id': cve_id, 'severity': severity.upper(), 'cvss': score}
+        for key, interval in _walk_nvd_nodes(item.get('configurations', {}).get('nodes', []), 'cpe_match', 'cpe23Uri'):
+            yield key, info, interval
+
+def _nvd20_entries(vulnerabilities: List[Dict]) -> Iterator[Tuple[str, Dict, Dict]]:
+    """NVD API 2.0 형식(vulnerabilities)의 항목을 읽습니다."""
+    for entry in vulnerabilities:
+        cve = entry.get('cve', entry)
+        cve_id = cve.get('id')
+        if not cve_id:
+            continue
+        score, severity = None, None
+        metrics = cve.get('metrics', {})
+        for name in ('cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2'):
+            if metrics.get(name):
+                metric = metrics[name][0]
+                score = metric.get('cvssData', {}).get('baseScore')
+                severity = metric.get('cvssData', {}).get('baseSeverity') or metric.get('baseSeverity')
+                break
+        info = {'id': cve_id, 'severity': (severity or severity_from_cvss(score)).upper(), 'cvss': score}
+        for configuration in cve.get('configurations', []):
+            for key, interval in _walk_nvd_nodes(configuration.get('nodes', []), 'cpeMatch', 'criteria'):
+                yield key, info, interval
+
+def _simple_entries(entries: List[Dict], aliases: Dict[str, str]) -> Iterator[Tuple[str, Dict, Dict]]:
+    """자체 피드 형식의 항목을 읽습니다."""
+    for entry in entries:
+        if not entry.get('id') or not entry.get('product'):
+            continue
+        vendor, _, product = entry['product'].rpartition(':')
+        key = product_key(entry.get('vendor') or vendor, product)
+        for alias in entry.get('aliases', []):
+            aliases[normalize_product_name(alias)] = key
+        score = entry.get('cvss')
+        info = {
+            'id': entry['id'],
+            'severity': (entry.get('severity') or severity_from_cvss(score)).upper(),
+            'cvss': score,
+        }
+        for interval in entry.get('versions') or [{}]:
+            yield key, info, interval
+
+def read_feed(path: str) -> Tuple[Iterator[Tuple[str, Dict, Dict]], Dict[str, str]]:
+    """
+    피드 파일 형식을 판별해 (제품 키, CVE 정보, 버전 구간) 항목과 피드에 정의된 별칭을 반환합니다.
+    """
+    with _open_feed(path) as f:
+        data = json.load(f)
+    aliases = {}
+    if isinstance(data, list):
+        return _simple_entries(data, aliases), aliases
+    if 'CVE_Items' in data:
+        return _nvd11_entries(data['CVE_Items']), aliases
+    if 'vulnerabilities' in data:
+        return _nvd20_entries(data['vulnerabilities']), aliases
+    if 'entries' in data:
+        return _simple_entries(data['entries'], aliases), aliases
+    raise ValueError(f"알 수 없는 취약점 피드 형식: {path}")
+
+# 색인
+
+def _build_product_index(intervals: List[Tuple[Dict, Optional[Tuple], bool, Optional[Tuple], bool]]):
+    """
+    한 제품의 (CVE, 시작, 시작 포함, 끝, 끝 포함) 구간 목록으로 (경계 목록, 구간별 CVE 튜플)을 만듭니다.
+
+    경계 b0 < b1 < ... < b(n-1)에 대해 구간 번호는 (-inf, b0) = 0, b0 = 1, (b0, b1) = 2, ..., b(n-1) = 2n-1,
+    (b(n-1), inf) = 2n입니다.
+    각 CVE 구간이 덮는 구간 번호 범위에 추가/제거 이벤트를 기록하고 한 번 훑어서 구간별 목록을 계산합니다.
+    """
+    boundaries = sorted({key for _, start, _, end, _ in intervals for key in (start, end) if key is not None})
+    position = {key: i for i, key in enumerate(boundaries)}
+    count = 2 * len(boundaries) + 1
+    added = [[] for _ in range(count + 1)]
+    removed = [[] for _ in range(count + 1)]
+    for info, start, start_inclusive, end, end_inclusive in intervals:
+        low = 0 if start is None else 2 * position[start] + (1 if start_inclusive else 2)
+        high = count - 1 if end is None else 2 * position[end] + (1 if end_inclusive else 0)
+        if low > high:
+            continue
+        added[low].append(info)
+        removed[high + 1].append(info)
+
+    segments = []
+    active: Dict[str, List] = {}
+    current: Tuple = ()
+    for index in range(count):
+        if added[index] or removed[index]:
+            for info in removed[index]:
+                active[info['id']][1] -= 1
+                if not active[info['id']][1]:
+                    del active[info['id']]
+            for info in added[index]:
+                active.setdefault(info['id'], [info, 0])[1] += 1
+            # 심각한 순서로 정렬, 변경이 없는 구간은 같은 튜플을 공유
+            current = tuple(sorted(
+                (entry[0] for entry in active.values()),
+                key=lambda info: (-(info['cvss'] or 0), info['id'])
+            ))
+        segments.append(current)
+    return boundaries, segments
+
+class VulnDatabase:
+    """
+    제품별 버전 구간 색인. lookup()으로 서비스의 CVE 목록을 조회합니다.
+    """
+
+    def __init__(self, products: Optional[Dict] = None, names: Optional[Dict[str, str]] = None,
+                 source: Optional[str] = None, cves: int = 0):
+        self.products = products or {}    # 제품 키 -> (버전 경계 목록, 구간별 CVE 튜플)
+        self.names = names or {}          # nmap 제품 이름 -> 제품 키
+        self.source = source
+        self.cves = cves
+        self.loaded_at = time.time()
+        self._lookup = lru_cache(maxsize=VULN_DB_LOOKUP_CACHE)(self._lookup_uncached)
+
+    @classmethod
+    def build(cls, entries, aliases: Optional[Dict[str, str]] = None, source: Optional[str] = None) -> 'VulnDatabase':
+        """피드 항목으로 색인을 만듭니다."""
+        by_product: Dict[str, List] = {}
+        infos: Dict[str, Dict] = {}
+        for key, info, interval in entries:
+            # 같은 CVE는 제품이 여러 개여도 정보 객체 하나를 공유
+            info = infos.setdefault(info['id'], info)
+            if 'version' in interval:
+                version = version_key(interval['version'])
+                spec = (info, version, True, version, True)
+            else:
+                start = version_key(interval['start']) if interval.get('start') else None
+                end = version_key(interval['end']) if interval.get('end') else None
+                spec = (info, start, interval.get('start_inclusive', True), end, interval.get('end_inclusive', False))
+            by_product.setdefault(key, []).append(spec)
+
+        products = {key: _build_product_index(intervals) for key, intervals in by_product.items()}
+        names = {}
+        # 제품 이름만으로 찾을 수 있도록 vendor가 하나뿐인 제품 이름을 등록
+        product_vendors: Dict[str, List[str]] = {}
+        for key in products:
+            product_vendors.setdefault(key.split(':', 1)[1].replace('_', ' '), []).append(key)
+        for name, keys in product_vendors.items():
+            if len(keys) == 1:
+                names[name] = keys[0]
+        for name, key in dict(PRODUCT_ALIASES, **(aliases or {})).items():
+            if key in products:
+                names[name] = key
+        return cls(products, names, source, len(infos))
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self._lookup.cache_info()
+        return {
+            'source': self.source,
+            'cves': self.cves,
+            'products': len(self.products),
+            'loaded_at': self.loaded_at,
+            'lookup_cache': {'hits': cache.hits, 'misses': cache.misses, 'size': cache.currsize},
+        }
+
+    def resolve(self, product: str = '', cpe: str = '') -> Optional[str]:
+        """CPE 또는 nmap 제품 이름으로 색인의 제품 키를 찾습니다."""
+        parsed = parse_cpe(cpe)
+        if parsed:
+            key = product_key(parsed[1], parsed[2])
+            if key in self.products:
+                return key
+        if product and normalize_product_name(product) in self.names:
+            return self.names[normalize_product_name(product)]
+        # nmap의 CPE는 vendor 이름이 NVD와 다른 경우가 있으므로(igor_sysoev:nginx 등) 제품 이름으로 다시 찾음
+        if parsed:
+            return self.names.get(parsed[2].replace('_', ' '))
+        return None
+
+    def lookup(self, product: str = '', version: str = '', cpe: str = '') -> Tuple[Dict, ...]:
+        """
+        서비스의 제품/버전(또는 CPE)에 해당하는 CVE 정보({'id', 'severity', 'cvss'}) 튜플을 반환합니다.
+        버전을 알 수 없으면 빈 튜플을 반환합니다. (모든 버전에 해당하는 CVE를 보고하면 오탐이 많기 때문)
+        """
+        if not self.products or not (product or cpe):
+            return ()
+        return self._lookup(product, version, cpe)
+
+    def _lookup_uncached(self, product: str, version: str, cpe: str) -> Tuple[Dict, ...]:
+        key = self.resolve(product, cpe)
+        if key is None:
+            return ()
+        # nmap 버전 문자열은 '7.4p1 Debian 10+deb9u7', '8.0.36-0ubuntu0.22.04.1'처럼 배포판 정보가 붙으므로 앞의 버전만 사용
+        match = SERVICE_VERSION_REGEX.match(version.strip()) if version else None
+        if match is None:
+            parsed = parse_cpe(cpe)
+            if not parsed or parsed[3] in ('*', '-', ''):
+                return ()
+            raw_version = parsed[3]
+        else:
+            raw_version = match.group(0)
+        boundaries, segments = self.products[key]
+        target = version_key(raw_version)
+        index = bisect.bisect_left(boundaries, target)
+        if index < len(boundaries) and boundaries[index] == target:
+            return segments[2 * index + 1]
+        return segments[2 * index]
+
+def _index_path(path: str) -> str:
+    return path + '.index'
+
+def _encode_index(db: VulnDatabase, signature: Tuple) -> Dict[str, Any]:
+    """
+    색인을 JSON으로 저장할 수 있는 형태로 변환합니다.
+    구간별 CVE 튜플은 CVE 정보 목록의 번호 목록으로 저장합니다.
+    """
+    numbers: Dict[str, int] = {}
+    infos: List[Dict] = []
+    products = {}
+    for key, (boundaries, segments) in db.products.items():
+        encoded = []
+        for segment in segments:
+            for info in segment:
+                if info['id'] not in numbers:
+                    numbers[info['id']] = len(infos)
+                    infos.append(info)
+            encoded.append([numbers[info['id']] for info in segment])
+        products[key] = [boundaries, encoded]
+    return {'signature': signature, 'products': products, 'names': db.names, 'cves': db.cves, 'infos': infos}
+
+def _decode_index(cached: Dict[str, Any], source: str) -> VulnDatabase:
+    """
+    _encode_index()로 저장한 색인을 복원합니다. 버전 경계는 비교할 수 있도록 튜플로 되돌리고,
+    같은 CVE 목록이 이어지는 구간은 만들 때처럼 같은 튜플을 공유합니다.
+    """
+    infos = cached['infos']
+    products = {}
+    for key, (boundaries, encoded) in cached['products'].items():
+        segments = []
+        previous, current = None, ()
+        for numbers in encoded:
+            if numbers != previous:
+                previous, current = numbers, tuple(infos[number] for number in numbers)
+            segments.append(current)
+        products[key] = ([tuple(tuple(token) for token in boundary) for boundary in boundaries], segments)
+    return VulnDatabase(products, cached['names'], source, cached['cves'])
+
+def load_vuln_db(path: str = VULN_DB_PATH) -> VulnDatabase:
+    """
+    피드 파일로 색인을 만듭니다. 같은 피드로 만든 JSON 색인이 있으면 그것을 읽습니다.
+    피드가 없으면 빈 데이터베이스를 반환합니다.
+    """
+    if not os.path.exists(path):
+        logger.info(f"취약점 피드가 없어 CVE 매칭을 사용하지 않습니다: {path}")
+        return VulnDatabase(source=path)
+
+    stat = os.stat(path)
+    signature = [INDEX_FORMAT_VERSION, stat.st_size, stat.st_mtime]
+    index_path = _index_path(path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('signature') == signature:
+            db = _decode_index(cached, path)
+            logger.info(f"취약점 색인 로드: CVE {db.cves}개, 제품 {len(db.products)}개 ({index_path})")
+            return db
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"취약점 색인을 읽지 못해 다시 만듭니다: {str(e)}")
+
+    start = time.time()
+    entries, aliases = read_feed(path)
+    db = VulnDatabase.build(entries, aliases, source=path)
+    logger.info(f"취약점 색인 생성: CVE {db.cves}개, 제품 {len(db.products)}개 ({time.time() - start:.1f}초)")
+    try:
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(_encode_index(db, signature), f, separators=(',', ':'))
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"취약점 색인 저장 실패 (무시됨): {str(e)}")
+    return db
+
+# 전역 취약점 데이터베이스 (처음 사용할 때 로드)
+_vuln_db: Optional[VulnDatabase] = None
+_vuln_db_lock = threading.Lock()
+
+def get_vuln_db() -> VulnDatabase:
+    global _vuln_db
+    if _vuln_db is None:
+        with _vuln_db_lock:
+            if _vuln_db is None:
+                try:
+                    _vuln_db = load_vuln_db() if VULN_DB_ENABLED else VulnDatabase()
+                except Exception as e:
+                    logger.error(f"취약점 데이터베이스 로드 실패: {str(e)}")
+                    _vuln_db = VulnDatabase(source=VULN_DB_PATH)
+    return _vuln_db
+
+def reload_vuln_db() -> VulnDatabase:
+    """피드 파일이 바뀌었을 때 색인을 다시 읽습니다."""
+    global _vuln_db
+    with _vuln_db_lock:
+        _vuln_db = None
+    return get_vuln_db()
+
+def match_service_vulns(product: str = '', version: str = '', cpe: str = '') -> Tuple[Dict, ...]:
+    """서비스의 CVE 정보 튜플을 반환합니다. (피드가 없으면 빈 튜플)"""
+    return get_vuln_db().lookup(product, version, cpe)
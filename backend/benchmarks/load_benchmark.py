@@ -0,0 +1,158 @@
+"""
+스캔 파이프라인 부하 벤치마크
+
+nmap 없이 시뮬레이션 스캔(ScanMode.SIMULATED) 작업을 한꺼번에 등록하고, 실행되는 동안 상태 조회를 반복해
+스캔 워커 풀(대기열), 작업 저장소, 결과 저장, 상태 조회 경로의 처리량과 지연 시간을 측정합니다.
+
+측정 항목:
+    submit    start_scan_task() 등록 속도 (jobs/s)
+    drain     모든 작업이 끝날 때까지 걸린 시간과 처리량, 대기 시간(wait_time) 분포
+    status    실행 중 get_scan_status() + JSON 변환 지연 시간 분포 (--readers개 스레드)
+    memory    최대 RSS, 작업 저장소 크기
+
+시뮬레이션 작업은 실제 스캔처럼 끝날 때까지 워커 스레드 하나를 점유하며 대기하므로, 동시에 실행되는 작업은
+--workers개이고 나머지는 대기열에서 기다립니다. 즉 --jobs개를 동시에 실행하는 것이 아니라
+--workers개 스레드 풀이 --jobs개 작업을 처리하는 성능을 측정합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.load_benchmark
+    python -m benchmarks.load_benchmark --jobs 10000 --workers 256 --profile lan --hosts 16
+    python -m benchmarks.load_benchmark --profile flaky --mongo-uri mongodb://localhost:27017/ --json load.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='시뮬레이션 스캔으로 스캔 파이프라인 부하 측정')
+    parser.add_argument('--jobs', type=int, default=10000, help='등록할 작업 수 (기본값: 10000)')
+    parser.add_argument('--workers', type=int,
+                        help='스캔 워커 스레드 수 (기본값: 환경 변수 SCAN_MAX_WORKERS, 없으면 256)')
+    parser.add_argument('--profile', default='lan', help='지연 시간 프로필 (instant, lan, wan, slow, flaky)')
+    parser.add_argument('--hosts', type=int, default=16, help='작업당 호스트 수 (기본값: 16)')
+    parser.add_argument('--ports', type=int, default=3, help='호스트당 열린 포트 수 (기본값: 3)')
+    parser.add_argument('--readers', type=int, default=4, help='상태 조회 스레드 수 (기본값: 4)')
+    parser.add_argument('--seed', type=int, default=1, help='결과와 지연 분포의 시드')
+    parser.add_argument('--mongo-uri', help='지정하면 끝난 작업을 MongoDB에 저장하는 경로까지 측정')
+    parser.add_argument('--database', default='portsookhee_bench', help='--mongo-uri 사용 시 데이터베이스 이름')
+    parser.add_argument('--json', dest='json_path', help='결과를 저장할 JSON 파일 경로')
+    return parser.parse_args()
+
+def percentiles(values, points=(50, 95, 99)):
+    if not values:
+        return {f'p{p}': None for p in points}
+    values = sorted(values)
+    return {f'p{p}': values[min(len(values) - 1, int(len(values) * p / 100))] for p in points}
+
+def main():
+    args = parse_args()
+    # 스캔 모듈의 설정은 import 시점에 읽으므로 먼저 지정
+    # --workers를 지정하지 않으면 환경 변수 SCAN_MAX_WORKERS를 덮어쓰지 않음
+    if args.workers is not None:
+        os.environ['SCAN_MAX_WORKERS'] = str(args.workers)
+    os.environ.setdefault('SCAN_MAX_WORKERS', '256')
+    os.environ.setdefault('SCAN_QUEUE_MAX_SIZE', str(args.jobs))
+    os.environ.setdefault('SCAN_TASK_MAX_ENTRIES', str(args.jobs))
+
+    from app.scan import (  # noqa: E402
+        ScanMode, ScanStatus, start_scan_task, get_scan_status, get_scan_queue_stats, is_scan_finished,
+        scan_tasks, scan_scheduler, scan_result_writer, set_scan_database, to_json_shape
+    )
+    from app.scan_simulator import parse_simulation_options  # noqa: E402
+    args.workers = scan_scheduler.max_workers  # 결과의 config에 실제 워커 수 기록
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        from app import setup_database
+        db = MongoClient(args.mongo_uri)[args.database]
+        setup_database(db)
+        set_scan_database(db)
+
+    simulation = parse_simulation_options({'profile': args.profile, 'hosts': args.hosts, 'ports': args.ports})
+    scan_ids = [f'bench-{index}' for index in range(args.jobs)]
+
+    # 1) 등록
+    started = time.perf_counter()
+    for index, scan_id in enumerate(scan_ids):
+        target = f'10.{(index >> 8) & 255}.{index & 255}.0/28'
+        start_scan_task(scan_id, ScanMode.SIMULATED, target,
+                        simulation=dict(simulation, seed=args.seed + index))
+    submit_time = time.perf_counter() - started
+
+    # 2) 실행 중 상태 조회
+    stop = threading.Event()
+    status_times = []
+    status_lock = threading.Lock()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        local = []
+        while not stop.is_set():
+            scan_id = rng.choice(scan_ids)
+            began = time.perf_counter()
+            to_json_shape(get_scan_status(scan_id, raw=True))
+            local.append(time.perf_counter() - began)
+        with status_lock:
+            status_times.extend(local)
+
+    readers = [threading.Thread(target=reader, args=(args.seed + n,), daemon=True) for n in range(args.readers)]
+    for thread in readers:
+        thread.start()
+
+    # 3) 모든 작업이 끝날 때까지 대기
+    pending = scan_ids
+    while pending:
+        time.sleep(0.2)
+        pending = [scan_id for scan_id in pending if not is_scan_finished(scan_tasks[scan_id]['status'])]
+    drain_time = time.perf_counter() - started
+    stop.set()
+    for thread in readers:
+        thread.join()
+    if args.mongo_uri:
+        scan_result_writer.flush()
+
+    tasks = [scan_tasks.get(scan_id) for scan_id in scan_ids]
+    tasks = [task for task in tasks if task]
+    by_status = {}
+    for task in tasks:
+        by_status[task['status']] = by_status.get(task['status'], 0) + 1
+    waits = [task['wait_time'] for task in tasks if 'wait_time' in task]
+    runs = [task['end_time'] - task['started_at'] for task in tasks if task.get('started_at') and task.get('end_time')]
+    queue_stats = get_scan_queue_stats()
+
+    report = {
+        'config': vars(args),
+        'submit': {'seconds': submit_time, 'jobs_per_second': args.jobs / submit_time if submit_time else None},
+        'drain': {
+            'seconds': drain_time,
+            'jobs_per_second': args.jobs / drain_time,
+            'hosts_per_second': args.jobs * args.hosts / drain_time,
+            'statuses': by_status,
+            'wait_time': dict(percentiles(waits), max=max(waits, default=None)),
+            'run_time': percentiles(runs),
+        },
+        'status': dict({key: value * 1000 if value is not None else None
+                        for key, value in percentiles(status_times).items()},
+                       requests=len(status_times), unit='ms'),
+        'memory': {
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'task_store': queue_stats['tasks'],
+        },
+        'persistence': queue_stats['persistence'],
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    if by_status.get(ScanStatus.COMPLETED, 0) + by_status.get(ScanStatus.FAILED, 0) != args.jobs:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
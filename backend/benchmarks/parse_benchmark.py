@@ -0,0 +1,200 @@
+"""
+nmap XML 파싱 벤치마크
+
+기록된 nmap XML 샘플(fixtures/)의 호스트를 복제해 1/256/4096/65536개 호스트 규모의 결과를 만들고,
+네트워크 없이 스캔 결과 파싱 경로의 처리량과 메모리 사용량을 측정합니다.
+
+측정 대상:
+    stream           parse_nmap_xml_stream() - 기본 경로 (SCAN_STREAM_RESULTS=true)
+    python-nmap      PortScanner.analyse_nmap_xml_scan() + process_scan_result() (python-nmap 설치 시)
+    parse_nmap_data  미리 파싱된 호스트에 대한 parse_nmap_data()만
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.parse_benchmark
+    python -m benchmarks.parse_benchmark --sizes 1,256 --shapes quick --json result.json
+    python -m benchmarks.parse_benchmark --baseline result.json --tolerance 0.2
+"""
+import argparse
+import gc
+import ipaddress
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scan import (  # noqa: E402
+    NMAP_AVAILABLE, parse_nmap_xml_stream, parse_nmap_data, parse_host_element, process_scan_result
+)
+
+if NMAP_AVAILABLE:
+    import nmap
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SHAPES = {
+    'quick': ('quick_sample.xml', '10.0.0.0'),   # -F -sS: 포트/서비스 이름만
+    'full': ('full_sample.xml', '10.64.0.0'),    # -sV -O -A: 버전, NSE 스크립트, OS, traceroute
+}
+DEFAULT_SIZES = [1, 256, 4096, 65536]
+METHODS = ['stream', 'python-nmap', 'parse_nmap_data']
+
+HOST_REGEX = re.compile(r'<host[ >].*?</host>\n?', re.DOTALL)
+IPV4_ADDR_REGEX = re.compile(r'addr="[^"]+" addrtype="ipv4"')
+
+def build_fixture(shape: str, size: int, directory: str) -> str:
+    """
+    샘플 XML의 호스트를 IPv4 주소만 바꿔 가며 size개로 복제한 XML 파일을 만들고 경로를 반환합니다.
+    """
+    path = os.path.join(directory, f'{shape}_{size}.xml')
+    if os.path.exists(path):
+        return path
+    filename, base = SHAPES[shape]
+    with open(os.path.join(FIXTURES_DIR, filename), encoding='utf-8') as f:
+        text = f.read()
+    hosts = HOST_REGEX.findall(text)
+    header = text[:text.index(hosts[0])]
+    footer = text[text.rindex(hosts[-1]) + len(hosts[-1]):]
+    base_addr = ipaddress.IPv4Address(base)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        for i in range(size):
+            f.write(IPV4_ADDR_REGEX.sub(f'addr="{base_addr + i}" addrtype="ipv4"', hosts[i % len(hosts)], count=1))
+        f.write(footer)
+    return path
+
+def run_stream(path: str):
+    with open(path, 'rb') as f:
+        return parse_nmap_xml_stream(f)
+
+def run_python_nmap(path: str):
+    with open(path, encoding='utf-8') as f:
+        xml_output = f.read()
+    # PortScanner()는 생성 시 nmap 실행 파일을 찾으므로, 파싱만 하도록 생성자를 건너뜀
+    nm = nmap.PortScanner.__new__(nmap.PortScanner)
+    nm.analyse_nmap_xml_scan(nmap_xml_output=xml_output)
+    return process_scan_result(nm, '')
+
+def load_host_elements(path: str):
+    """parse_nmap_data()만 측정하기 위해 호스트를 미리 NmapXmlHost로 파싱합니다."""
+    hosts = []
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag == 'host':
+            hosts.append(parse_host_element(elem))
+            elem.clear()
+    return hosts
+
+def run_parse_nmap_data(hosts):
+    return [parse_nmap_data(host) for host in hosts]
+
+def measure(method: str, path: str, repeat: int):
+    """
+    한 가지 방법으로 파싱한 처리 시간(최솟값)과 tracemalloc 기준 메모리 사용량을 측정합니다.
+    """
+    if method == 'parse_nmap_data':
+        hosts = load_host_elements(path)
+        run = lambda: run_parse_nmap_data(hosts)  # noqa: E731
+    elif method == 'python-nmap':
+        run = lambda: run_python_nmap(path)  # noqa: E731
+    else:
+        run = lambda: run_stream(path)  # noqa: E731
+
+    # 처리량: tracemalloc 없이 repeat번 실행한 최소 시간
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    # 메모리: 실행 중 최대 사용량과 실행 후 결과가 차지하는 메모리 블록 수
+    gc.collect()
+    tracemalloc.start()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained_blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    host_count = len(result) if isinstance(result, list) else len(result['hosts'])
+    del result, snapshot
+    return {
+        'hosts': host_count,
+        'seconds': best,
+        'hosts_per_sec': host_count / best if best > 0 else None,
+        'peak_bytes': peak,
+        'peak_bytes_per_host': peak / host_count if host_count else None,
+        'blocks_per_host': retained_blocks / host_count if host_count else None,
+    }
+
+def compare(results, baseline_path: str, tolerance: float):
+    """
+    이전 측정 결과와 비교해 처리량이 줄었거나 최대 메모리가 tolerance 비율 이상 늘어난 항목을 반환합니다.
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['shape'], r['size'], r['method']): r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        old = baseline.get((r['shape'], r['size'], r['method']))
+        if not old:
+            continue
+        if old['hosts_per_sec'] and r['hosts_per_sec'] < old['hosts_per_sec'] * (1 - tolerance):
+            regressions.append(f"{r['shape']}/{r['size']}/{r['method']}: 처리량 "
+                               f"{old['hosts_per_sec']:.0f} -> {r['hosts_per_sec']:.0f} hosts/s")
+        if old['peak_bytes'] and r['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+            regressions.append(f"{r['shape']}/{r['size']}/{r['method']}: 최대 메모리 "
+                               f"{old['peak_bytes'] / 1024:.0f} -> {r['peak_bytes'] / 1024:.0f} KiB")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='nmap XML 파싱 벤치마크')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='호스트 수 목록 (쉼표 구분)')
+    parser.add_argument('--shapes', default=','.join(SHAPES), help='결과 형태: quick, full')
+    parser.add_argument('--methods', default=','.join(METHODS), help='측정할 방법: ' + ', '.join(METHODS))
+    parser.add_argument('--repeat', type=int, default=3, help='처리 시간 측정 반복 횟수 (최솟값 사용)')
+    parser.add_argument('--fixture-dir', help='복제한 XML을 보관할 디렉터리 (기본값: 임시 디렉터리)')
+    parser.add_argument('--json', dest='json_path', help='측정 결과를 저장할 JSON 파일')
+    parser.add_argument('--baseline', help='비교할 이전 측정 결과 JSON 파일')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='회귀로 판단할 변화 비율 (기본값: 0.2)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    shapes = args.shapes.split(',')
+    methods = args.methods.split(',')
+    if 'python-nmap' in methods and not NMAP_AVAILABLE:
+        print('python-nmap이 설치되어 있지 않아 python-nmap 측정은 건너뜁니다.', file=sys.stderr)
+        methods.remove('python-nmap')
+
+    fixture_dir = args.fixture_dir or tempfile.mkdtemp(prefix='nmap-bench-')
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    results = []
+    print(f"{'shape':<6} {'hosts':>6} {'method':<16} {'seconds':>9} {'hosts/s':>10} "
+          f"{'peak KiB':>10} {'B/host':>9} {'blocks/host':>11}")
+    for shape in shapes:
+        for size in sizes:
+            path = build_fixture(shape, size, fixture_dir)
+            for method in methods:
+                r = measure(method, path, args.repeat)
+                r.update(shape=shape, size=size, method=method, xml_bytes=os.path.getsize(path))
+                results.append(r)
+                print(f"{shape:<6} {size:>6} {method:<16} {r['seconds']:>9.4f} {r['hosts_per_sec']:>10.0f} "
+                      f"{r['peak_bytes'] / 1024:>10.0f} {r['peak_bytes_per_host']:>9.0f} {r['blocks_per_host']:>11.1f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'created_at': time.time(), 'results': results}, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f'회귀: {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+PortSookhee 스캔 워커 실행 스크립트
+MongoDB 공유 대기열(scan_jobs)의 스캔 작업을 가져와 실행합니다. (API 서버는 SCAN_QUEUE_BACKEND=mongo로 실행)
+사용법: python worker.py [--id WORKER_ID] [--concurrency N] [--debug]
+"""
+
+import argparse
+import logging
+import signal
+import sys
+
+from pymongo import MongoClient
+
+from app import MONGO_URI, DATABASE_NAME, setup_database
+from app.scan import SCAN_MAX_WORKERS, set_scan_database, init_scanner_capabilities
+from app.scan_worker import ScanWorker
+from app.vuln_db import get_vuln_db
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PortSookhee 스캔 워커')
+    parser.add_argument('--id', dest='worker_id', help='워커 ID (기본값: 호스트 이름:프로세스 ID)')
+    parser.add_argument('--concurrency', type=int, default=SCAN_MAX_WORKERS,
+                        help=f'동시에 실행할 최대 스캔 수 (기본값/최댓값: SCAN_MAX_WORKERS={SCAN_MAX_WORKERS})')
+    parser.add_argument('--debug', '-d', action='store_true', help='디버그 로그 출력')
+    args = parser.parse_args()
+
+    # app 패키지를 import할 때 이미 basicConfig가 호출되었으므로 force로 다시 설정
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        force=True
+    )
+
+    # MongoDB 연결 (워커는 결과를 반드시 저장해야 하므로 연결 실패 시 종료)
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command('ping')
+    except Exception as e:
+        print(f"MongoDB 연결 실패: {e}", file=sys.stderr)
+        sys.exit(1)
+    db = client[DATABASE_NAME]
+    setup_database(db)
+    set_scan_database(db)
+    init_scanner_capabilities()
+    get_vuln_db()
+
+    worker = ScanWorker(db, worker_id=args.worker_id, capacity=args.concurrency)
+
+    # 종료 신호를 받으면 실행 중인 작업을 대기열로 반환하고 종료
+    def handle_signal(signum, frame):
+        logging.getLogger('app.scan_worker').info(f"종료 신호 수신 ({signum})")
+        worker.stop()
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    worker.run()
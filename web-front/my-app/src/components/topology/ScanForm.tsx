@@ -363,8 +363,8 @@ const ScanForm: React.FC<ScanFormProps> = ({ onScanComplete, onNodeSelect: propN
         console.log('스캔 상태 응답:', response.data);
         setScanStatus(response.data);
         
-        // 완료 또는 실패 시 폴링 중지
-        if (['completed', 'failed'].includes(response.data.status)) {
+        // 완료, 실패 또는 취소 시 폴링 중지
+        if (['completed', 'failed', 'cancelled'].includes(response.data.status)) {
           console.log(`스캔 ${id} ${response.data.status} 상태로 폴링 종료`);
           clearInterval(interval);
           setIsLoading(false);
@@ -569,7 +569,7 @@ const ScanForm: React.FC<ScanFormProps> = ({ onScanComplete, onNodeSelect: propN
                 </div>
               )}
               
-              {['completed', 'failed'].includes(scanStatus.status) && (
+              {['completed', 'failed', 'cancelled'].includes(scanStatus.status) && (
                 <button 
                   className="new-scan-button" 
                   onClick={() => {
@@ -737,9 +737,11 @@ const ScanForm: React.FC<ScanFormProps> = ({ onScanComplete, onNodeSelect: propN
 function getStatusLabel(status: string): string {
   switch (status) {
     case 'pending': return '대기 중';
+    case 'queued': return '대기열';
     case 'running': return '실행 중';
     case 'completed': return '완료됨';
     case 'failed': return '실패';
+    case 'cancelled': return '취소됨';
     default: return status;
   }
 }